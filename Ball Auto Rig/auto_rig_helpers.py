@@ -1,7 +1,31 @@
+import os
+import sys
+import json
+import time
+import contextlib
+
 import maya.cmds as cmds
+import maya.api.OpenMaya as om2
 
 class AutoRigHelpers(object):
     
+    NAMESPACE_SCENE_MESSAGES = [
+        om2.MSceneMessage.kAfterNew,
+        om2.MSceneMessage.kAfterOpen
+    ]
+    
+    # Lambert shaders shared by their parameters, (color, transparency) -> (shader UUID, shading group UUID)
+    shader_pool = {}
+    
+    # Next index to try of namespaces made by get_unique_namespace, namespace name -> index.
+    # Cleared when a new scene is made or opened, its namespaces are not the ones counted
+    namespace_indices = {}
+    namespace_callbacks = []
+    
+    # Profiles being recorded, maya.cmds is only wrapped while one is active
+    cmds_profiles = []
+    cmds_originals = {}
+    
     @classmethod
     def get_attr(cls, node, attr):
         return cmds.getAttr("{0}.{1}".format(node, attr))
@@ -49,17 +73,86 @@ class AutoRigHelpers(object):
             
         return display_layer
         
+    # Create a lambert shader and assign it to shape nodes. Shaders with a color are pooled, a shader
+    # of the same color and transparency is reused from earlier calls or found in the scene, so shapes that
+    # look the same share one shading group. Without a color a new shader is created, e.g. to connect a texture to
+    #
+    # @param name - Name of the shader when a new one is created
+    # @param shape_node - Shape node or list of shape nodes, all assigned with one call
+    # @param color - (r, g, b) color of the shader
+    # @param transparency - (r, g, b) transparency of the shader, only used with a color
+    # @return - The shader
+    #
+    @classmethod
+    def create_assign_lambert_shader(cls, name, shape_node=None, color=None, transparency=(0, 0, 0)):
+        if color != None:
+            shader, shader_sg = cls.get_pooled_lambert_shader(name, color, transparency)
+        else:
+            shader, shader_sg = cls.create_lambert_shader(name)
+            
+        # Assign shader to shape node
+        if shape_node:
+            cmds.sets(shape_node if isinstance(shape_node, list) else [shape_node], e=True, forceElement=shader_sg)
+            
+        return shader
+        
     @classmethod
-    def create_assign_lambert_shader(cls, name, shape_node):
+    def create_lambert_shader(cls, name, color=None, transparency=None):
         # Create shader
         shader = cmds.shadingNode("lambert", name=name, asShader=True)
         shader_sg = cmds.sets(name="{0}SG".format(shader), renderable=True, noSurfaceShader=True, empty=True)
         cls.connect_attr(shader, "outColor", shader_sg, "surfaceShader")
         
-        # Assign shader to shape node
-        cmds.sets([shape_node], e=True, forceElement=shader_sg)
+        if color != None:
+            cls.set_attr(shader, "color", color, "double3")
+            cls.set_attr(shader, "transparency", transparency, "double3")
+            
+        return shader, shader_sg
         
-        return shader
+    @classmethod
+    def get_pooled_lambert_shader(cls, name, color, transparency):
+        key = (cls.get_shader_key(color), cls.get_shader_key(transparency))
+        
+        # Pooled nodes are kept by UUID, they are gone after a new scene is opened or when they were deleted
+        if key in cls.shader_pool:
+            shader_uuid, shader_sg_uuid = cls.shader_pool[key]
+            shader, shader_sg = cmds.ls(shader_uuid), cmds.ls(shader_sg_uuid)
+            if shader and shader_sg:
+                return shader[0], shader_sg[0]
+                
+        # Pooled shaders are shared by every rig, keep them out of the rig's namespace so removing it does not remove them
+        with cls.namespace_context(":"):
+            shader, shader_sg = cls.find_lambert_shader(key) or cls.create_lambert_shader(name, color, transparency)
+        cls.shader_pool[key] = (cmds.ls(shader, uuid=True)[0], cmds.ls(shader_sg, uuid=True)[0])
+        return shader, shader_sg
+        
+    @classmethod
+    def find_lambert_shader(cls, key):
+        # Match lamberts in the root namespace without input connections, e.g. textures, that are the surface shader of a shading group
+        for shader in cmds.ls(exactType="lambert"):
+            if shader == "lambert1" or ":" in shader or cmds.listConnections(shader, source=True, destination=False):
+                continue
+            if (cls.get_shader_key(cmds.getAttr(f"{shader}.color")[0]), cls.get_shader_key(cmds.getAttr(f"{shader}.transparency")[0])) != key:
+                continue
+                
+            shader_sgs = cmds.listConnections(f"{shader}.outColor", source=False, destination=True, type="shadingEngine")
+            if shader_sgs:
+                return shader, shader_sgs[0]
+        return None
+        
+    @classmethod
+    def get_shader_key(cls, values) -> tuple:
+        return tuple(round(float(value), 4) for value in values)
+        
+    @classmethod
+    def clear_shader_pool(cls):
+        cls.shader_pool = {}
+        
+    @classmethod
+    def assign_shader(cls, shader, shape_nodes):
+        # Assign every shape node to the shader's shading group with one call
+        shader_sg = cmds.listConnections("{0}.outColor".format(shader), source=False, destination=True, type="shadingEngine")[0]
+        cmds.sets(shape_nodes, e=True, forceElement=shader_sg)
     
     @classmethod
     def get_shape_from_transform(cls, transform_node):
@@ -80,4 +173,198 @@ class AutoRigHelpers(object):
     @classmethod
     def uuid_to_full_path(cls, uuid) -> str:
         return cmds.ls(uuid, long=True)[0]
-        
\ No newline at end of file
+        
+    # Get a namespace no node is in yet, e.g. ball, ball1, ball2. The next free index of every name is
+    # remembered, so making many namespaces of the same name does not check every taken one again
+    #
+    # @param name - Name of the namespace
+    # @return - Absolute namespace, e.g. ":ball1"
+    #
+    @classmethod
+    def get_unique_namespace(cls, name) -> str:
+        cls.register_namespace_callbacks()
+        name = name.strip(":")
+        index = cls.namespace_indices.get(name, 0)
+        
+        namespace = f":{name}{index or ''}"
+        while cmds.namespace(exists=namespace):
+            index += 1
+            namespace = f":{name}{index}"
+            
+        cls.namespace_indices[name] = index + 1
+        return namespace
+        
+    @classmethod
+    def register_namespace_callbacks(cls):
+        if cls.namespace_callbacks:
+            return
+            
+        for message in cls.NAMESPACE_SCENE_MESSAGES:
+            cls.namespace_callbacks.append(om2.MSceneMessage.addCallback(message, cls.on_scene_changed))
+            
+    @classmethod
+    def remove_namespace_callbacks(cls):
+        if cls.namespace_callbacks:
+            om2.MMessage.removeCallbacks(cls.namespace_callbacks)
+            cls.namespace_callbacks = []
+            
+    @classmethod
+    def on_scene_changed(cls, client_data=None):
+        cls.namespace_indices = {}
+        
+    # Create the nodes made inside the block in a namespace, the current namespace is restored afterwards
+    #
+    # @param namespace - Absolute namespace, created when it does not exist. ":" is the root namespace
+    #
+    @classmethod
+    @contextlib.contextmanager
+    def namespace_context(cls, namespace):
+        current_namespace = cmds.namespaceInfo(currentNamespace=True, absoluteName=True)
+        if not cmds.namespace(exists=namespace):
+            cmds.namespace(add=namespace.lstrip(":"), parent=":")
+            
+        cmds.namespace(setNamespace=namespace)
+        try:
+            yield namespace
+        finally:
+            cmds.namespace(setNamespace=current_namespace)
+        
+    # Record every maya.cmds call made inside the block, by the tools or any other module. Profiles
+    # can be nested, each one records the calls made inside it
+    #
+    #   with AutoRigHelpers.profile_cmds("construct_rig") as profile:
+    #       BallAutoRig().construct_rig()
+    #   profile.dump()
+    #
+    # @param name - Name of the profiled operation
+    # @return - The CmdsProfile, its wall time is set once the block exits
+    #
+    @classmethod
+    @contextlib.contextmanager
+    def profile_cmds(cls, name="operation"):
+        profile = CmdsProfile(name)
+        if not cls.cmds_profiles:
+            cls.wrap_cmds()
+        cls.cmds_profiles.append(profile)
+        
+        start = time.perf_counter()
+        try:
+            yield profile
+        finally:
+            profile.wall_time = time.perf_counter() - start
+            cls.cmds_profiles.remove(profile)
+            if not cls.cmds_profiles:
+                cls.unwrap_cmds()
+                
+    @classmethod
+    def wrap_cmds(cls):
+        # The tools look commands up on the module at every call, so replacing the module's
+        # functions profiles direct cmds calls as well as the ones made through the helpers
+        for command in dir(cmds):
+            function = getattr(cmds, command)
+            if command.startswith("_") or not callable(function):
+                continue
+            cls.cmds_originals[command] = function
+            setattr(cmds, command, cls.create_profiled_command(command, function))
+            
+    @classmethod
+    def unwrap_cmds(cls):
+        for command, function in cls.cmds_originals.items():
+            setattr(cmds, command, function)
+        cls.cmds_originals = {}
+        
+    @classmethod
+    def create_profiled_command(cls, command, function):
+        def profiled_command(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                call_site = cls.get_call_site()
+                for profile in cls.cmds_profiles:
+                    profile.record(command, elapsed, call_site)
+        return profiled_command
+        
+    @classmethod
+    def get_call_site(cls) -> str:
+        # Skip this frame and the profiled command, then the helpers the command was called through
+        frame = sys._getframe(2)
+        helper = None
+        while frame and frame.f_globals.get("__name__") == __name__:
+            helper = helper or frame.f_code.co_name
+            frame = frame.f_back
+            
+        if frame == None:
+            return f"AutoRigHelpers.{helper}"
+        call_site = f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        return f"{call_site} > AutoRigHelpers.{helper}" if helper else call_site
+        
+class CmdsProfile(object):
+    
+    # Counts and times the maya.cmds calls of one tool operation
+    #
+    # @param name - Name of the profiled operation, e.g. "construct_rig"
+    #
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        
+        # Command -> [calls, seconds], command -> {call site -> calls}
+        self.commands = {}
+        self.call_sites = {}
+        
+    def record(self, command, elapsed, call_site):
+        command_stats = self.commands.setdefault(command, [0, 0.0])
+        command_stats[0] += 1
+        command_stats[1] += elapsed
+        
+        call_sites = self.call_sites.setdefault(command, {})
+        call_sites[call_site] = call_sites.get(call_site, 0) + 1
+        
+    @property
+    def call_count(self) -> int:
+        return sum(calls for calls, seconds in self.commands.values())
+        
+    @property
+    def cmds_time(self) -> float:
+        return sum(seconds for calls, seconds in self.commands.values())
+        
+    def get_report(self) -> dict:
+        # The most expensive commands and their busiest call sites first
+        commands = sorted(self.commands.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "name": self.name,
+            "wall_time": self.wall_time,
+            "cmds_time": self.cmds_time,
+            "calls": self.call_count,
+            "commands": [{
+                "command": command,
+                "calls": calls,
+                "time": seconds,
+                "call_sites": dict(sorted(self.call_sites[command].items(), key=lambda item: item[1], reverse=True))
+            } for command, (calls, seconds) in commands]
+        }
+        
+    def format_report(self, call_site_limit=3) -> str:
+        report = self.get_report()
+        lines = [f"{self.name}: {report['calls']} maya.cmds calls, {report['cmds_time']*1000:.2f} ms of {report['wall_time']*1000:.2f} ms",
+                 f"{'command':<32}{'calls':>8}{'ms':>12}{'ms/call':>10}"]
+                 
+        for command in report["commands"]:
+            lines.append(f"{command['command']:<32}{command['calls']:>8}{command['time']*1000:>12.3f}{command['time']*1000/command['calls']:>10.3f}")
+            for call_site, calls in list(command["call_sites"].items())[:call_site_limit]:
+                lines.append(f"    {calls:>6}  {call_site}")
+                
+        return "\n".join(lines)
+        
+    # Print the report to the script editor, or write it as JSON
+    #
+    # @param file_path - JSON file to write the report to, printed when not given
+    #
+    def dump(self, file_path=None):
+        if file_path:
+            with open(file_path, 'w') as report_file:
+                json.dump(self.get_report(), report_file, indent=4)
+        else:
+            print(self.format_report())
\ No newline at end of file
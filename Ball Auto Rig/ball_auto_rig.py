@@ -6,40 +6,116 @@ from auto_rig_helpers import AutoRigHelpers
         
 class BallAutoRig(object):
     
+    UNDO_CHUNK_NAME = "constructBallRigs"
+    
     def __init__(self):
         self.primary_color = [0.0, 0.0, 1.0]
         self.secondary_color = [1.0, 1.0, 1.0]
         
+        # Shading networks and ball geometry shared by the rigs of a batch, None outside of a batch
+        self.ball_shaders = None
+        self.disc_shader = None
+        self.shader_assignments = None
+        self.display_layer_members = None
+        
+        # Full paths of the nodes of the last rig that was constructed by role, and its namespace
+        self.rig_nodes = {}
+        self.rig_namespace = None
+        
     def set_colors(self, primary, secondary):
         self.primary_color = primary
         self.secondary_color = secondary
         
         
-    # Construct ball rig
-    def construct_rig(self, name="ball"):
-        cmds.select(clear=True)
-        
-        # Create groups 
-        root_grp = cmds.group(name=name, empty=True, world=True)
-        anim_ctrls_grp = cmds.group(name="anim_controls", empty=True, parent=root_grp)
-        geometry_grp = cmds.group(name="geometry_DoNotTouch", empty=True, parent=root_grp)
-        
-        # Create ball geometry and control
-        ball_geo = self.create_ball("ball_geo", geometry_grp)
-        ball_ctrl = self.create_ball_ctrl("ball_ctrl", parent=anim_ctrls_grp)
-        
-        # Create squash control
-        squash_grp = cmds.group(name="squash_grp", empty=True, parent=anim_ctrls_grp)
-        squash_ctrl = self.create_squash_ctrl(name="squash_ctrl", parent=squash_grp)
-        cmds.pointConstraint(ball_ctrl, squash_grp, offset=[0,0,0], weight=1)
-        
-        # Constraint: Ball Geo -> Ball Ctrl
-        cmds.parentConstraint(ball_ctrl, ball_geo, maintainOffset=True, weight=1)
-        
-        self.create_squash_deformer(ball_geo, squash_ctrl)
-        
-        # Create display layer to make ball geo a reference (Not selectable)
-        AutoRigHelpers.create_display_layer("ball_geometry", [ball_geo], True)
+    # Construct ball rig. Every rig is built in its own namespace, so its nodes keep the names they
+    # are created with however many rigs the scene has, and are only ever referred to by the names
+    # the commands that created them returned
+    #
+    # @param name - Name of the rig's root group and of its namespace
+    # @param namespace - Namespace to build the rig in, a new namespace named after the rig when not given
+    # @return - Full path of the rig's root group
+    #
+    def construct_rig(self, name="ball", namespace=None):
+        namespace = namespace or AutoRigHelpers.get_unique_namespace(name)
+        with AutoRigHelpers.namespace_context(namespace):
+            cmds.select(clear=True)
+            
+            # Create groups
+            root_grp = cmds.group(name=name, empty=True, world=True)
+            anim_ctrls_grp = cmds.group(name="anim_controls", empty=True, parent=root_grp)
+            geometry_grp = cmds.group(name="geometry_DoNotTouch", empty=True, parent=root_grp)
+            
+            # Create ball geometry and control
+            ball_geo = self.create_ball("ball_geo", geometry_grp)
+            ball_ctrl = self.create_ball_ctrl("ball_ctrl", parent=anim_ctrls_grp)
+            
+            # Create squash control
+            squash_grp = cmds.group(name="squash_grp", empty=True, parent=anim_ctrls_grp)
+            squash_ctrl = self.create_squash_ctrl(name="squash_ctrl", parent=squash_grp)
+            cmds.pointConstraint(ball_ctrl, squash_grp, offset=[0,0,0], weight=1)
+            
+            # Constraint: Ball Geo -> Ball Ctrl
+            cmds.parentConstraint(ball_ctrl, ball_geo, maintainOffset=True, weight=1)
+            
+            self.create_squash_deformer(ball_geo, squash_ctrl)
+            
+            rig_nodes = {"root": root_grp, "ball_geo": ball_geo, "ball_ctrl": ball_ctrl, "squash_ctrl": squash_ctrl}
+            self.rig_nodes = {role: cmds.ls(node, long=True)[0] for role, node in rig_nodes.items()}
+            self.rig_namespace = namespace
+            
+            # Create display layer to make ball geo a reference (Not selectable), a batch puts every ball in one layer
+            if self.display_layer_members != None:
+                self.display_layer_members.append(self.rig_nodes["ball_geo"])
+            else:
+                AutoRigHelpers.create_display_layer("ball_geometry", [ball_geo], True)
+                
+        return self.rig_nodes["root"]
+        
+    # Construct many ball rigs as one undoable action. Balls of the same colors share one shading
+    # network, every squash control shares one disc shader and every ball is put in one display layer
+    #
+    # @param specs - List of (name, (primary color, secondary color), transform). The transform is a dict of
+    #                cmds.xform flags for the rig's root group, e.g. {"translation": (0, 0, 5)}, or None
+    # @param suspend_refresh - Suspend viewport refresh while the rigs are built
+    # @return - List of the rigs' root groups, in the order of the specs
+    #
+    def construct_rigs(self, specs, suspend_refresh=True) -> list:
+        colors = (self.primary_color, self.secondary_color)
+        root_grps = []
+        
+        cmds.undoInfo(openChunk=True, chunkName=self.UNDO_CHUNK_NAME)
+        if suspend_refresh:
+            cmds.refresh(suspend=True)
+        try:
+            self.ball_shaders = {}
+            self.disc_shader = CurveLibrary.create_disc_shader()
+            self.shader_assignments = {}
+            self.display_layer_members = []
+            
+            for name, (primary, secondary), transform in specs:
+                self.set_colors(primary, secondary)
+                root_grp = self.construct_rig(name)
+                if transform:
+                    cmds.xform(root_grp, **transform)
+                root_grps.append(root_grp)
+                
+            # Assign the shared ball and disc shaders, all shapes of a shader with one call
+            for shader, shape_nodes in self.shader_assignments.items():
+                AutoRigHelpers.assign_shader(shader, shape_nodes)
+            if self.display_layer_members:
+                AutoRigHelpers.create_display_layer("ball_geometry", self.display_layer_members, True)
+        finally:
+            self.set_colors(*colors)
+            self.ball_shaders = None
+            self.disc_shader = None
+            self.shader_assignments = None
+            self.display_layer_members = None
+            
+            if suspend_refresh:
+                cmds.refresh(suspend=False)
+            cmds.undoInfo(closeChunk=True)
+            
+        return root_grps
         
     # Create ball geometry
     def create_ball(self, name, parent=None):
@@ -70,6 +146,19 @@ class BallAutoRig(object):
         
     def create_ball_shader(self, ball_geo):
         ball_shape = AutoRigHelpers.get_shape_from_transform(ball_geo)
+        
+        # A batch creates one shading network per color pair and assigns the balls when it is done
+        if self.ball_shaders != None:
+            colors = (tuple(self.primary_color), tuple(self.secondary_color))
+            if colors not in self.ball_shaders:
+                # Shared networks are kept out of the rigs' namespaces, removing a rig's namespace must not remove them
+                with AutoRigHelpers.namespace_context(":"):
+                    self.ball_shaders[colors] = self.create_ball_shading_network()
+            self.shader_assignments.setdefault(self.ball_shaders[colors], []).append(ball_shape)
+        else:
+            self.create_ball_shading_network(ball_shape)
+            
+    def create_ball_shading_network(self, ball_shape=None) -> str:
         ball_shader = AutoRigHelpers.create_assign_lambert_shader("ballShader", ball_shape)
         
         # Create Ramp Node & place2DTexture
@@ -88,10 +177,15 @@ class BallAutoRig(object):
         AutoRigHelpers.set_attr(place2dTexture, "repeatU", 1)
         AutoRigHelpers.set_attr(place2dTexture, "repeatV", 3)
         
+        return ball_shader
+        
     def create_squash_ctrl(self, name, parent=None):
-        squash_ctrl = CurveLibrary.disc(radius=1.6, name=name)
+        # A batch assigns the disc shader to every squash control at once when it is done
+        squash_ctrl = CurveLibrary.disc(radius=1.6, name=name, assign_shader=self.shader_assignments == None)
         if parent:
             squash_ctrl = cmds.parent(squash_ctrl, parent)[0]
+        if self.shader_assignments != None:
+            self.shader_assignments.setdefault(self.disc_shader, []).append(AutoRigHelpers.get_shape_from_transform(squash_ctrl))
         
         AutoRigHelpers.lock_hide_attrs(squash_ctrl, ["sx", "sy", "sz", "v"])
         AutoRigHelpers.add_attr(squash_ctrl, "squashStretch", "double", 0, keyable=True)
@@ -0,0 +1,210 @@
+import os
+
+import maya.cmds as cmds
+
+from auto_rig_helpers import AutoRigHelpers
+from ball_auto_rig import BallAutoRig
+
+class BallRigTemplate(object):
+    
+    # Increase whenever BallAutoRig builds a different rig, so rigs are not made from an outdated template file
+    TEMPLATE_VERSION = 2
+    TEMPLATE_NAME = "ballRigTemplate"
+    UNDO_CHUNK_NAME = "createBallRigsFromTemplate"
+    
+    # The canonical rig is built once and kept hidden in the scene. New rigs are duplicated from it,
+    # or imported from the template file that is exported from it
+    template_uuid = None
+    template_colors = None
+    
+    # Path of the ball geometry below the rig's root group, without namespaces
+    ball_geo_path = None
+    
+    # Ball shading networks of duplicated rigs, (primary color, secondary color) -> shader
+    ball_shaders = {}
+    
+    # Create a ball rig from the template instead of constructing it
+    #
+    # @param name - Name of the rig's root group
+    # @param primary_color - Primary color of the ball, the template's color when not given
+    # @param secondary_color - Secondary color of the ball, the template's color when not given
+    # @param mode - "duplicate" copies the template rig in the scene, "import" imports the template file
+    # @param namespace - Namespace of the rig, a new namespace named after the rig when not given
+    # @return - Full path of the rig's root group
+    #
+    @classmethod
+    def create_rig(cls, name="ball", primary_color=None, secondary_color=None, mode="duplicate", namespace=None) -> str:
+        template_root = cls.get_scene_template()
+        colors = (tuple(primary_color or cls.template_colors[0]), tuple(secondary_color or cls.template_colors[1]))
+        namespace = namespace or AutoRigHelpers.get_unique_namespace(name)
+        
+        if mode == "import":
+            root_grp = cls.import_template(namespace, colors)
+        else:
+            root_grp = cls.duplicate_template(template_root, namespace, colors)
+            
+        root_grp = cmds.ls(cmds.rename(root_grp, f"{namespace}:{name}"), long=True)[0]
+        AutoRigHelpers.set_attr(root_grp, "visibility", True)
+        
+        return root_grp
+        
+    # Create many ball rigs from the template as one undoable action
+    #
+    # @param specs - List of (name, (primary color, secondary color), transform), see BallAutoRig.construct_rigs
+    # @param mode - "duplicate" or "import", see create_rig
+    # @param suspend_refresh - Suspend viewport refresh while the rigs are created
+    # @return - List of the rigs' root groups, in the order of the specs
+    #
+    @classmethod
+    def create_rigs(cls, specs, mode="duplicate", suspend_refresh=True) -> list:
+        root_grps = []
+        
+        cmds.undoInfo(openChunk=True, chunkName=cls.UNDO_CHUNK_NAME)
+        if suspend_refresh:
+            cmds.refresh(suspend=True)
+        try:
+            for name, (primary, secondary), transform in specs:
+                root_grp = cls.create_rig(name, primary, secondary, mode)
+                if transform:
+                    cmds.xform(root_grp, **transform)
+                root_grps.append(root_grp)
+        finally:
+            if suspend_refresh:
+                cmds.refresh(suspend=False)
+            cmds.undoInfo(closeChunk=True)
+            
+        return root_grps
+        
+    @classmethod
+    def get_scene_template(cls) -> str:
+        # Rebuild the template when it is not in the scene, e.g. after a new scene was opened
+        if cls.template_uuid:
+            template_root = cmds.ls(cls.template_uuid, long=True)
+            if template_root:
+                return template_root[0]
+                
+        ball_auto_rig = BallAutoRig()
+        ball_auto_rig.construct_rig(cls.TEMPLATE_NAME)
+        template_root = ball_auto_rig.rig_nodes["root"]
+        AutoRigHelpers.set_attr(template_root, "visibility", False)
+        
+        cls.template_uuid = cmds.ls(template_root, uuid=True)[0]
+        cls.template_colors = (tuple(ball_auto_rig.primary_color), tuple(ball_auto_rig.secondary_color))
+        cls.ball_geo_path = cls.strip_namespaces(ball_auto_rig.rig_nodes["ball_geo"][len(template_root)+1:])
+        cls.ball_shaders = {}
+        
+        return template_root
+        
+    @classmethod
+    def duplicate_template(cls, template_root, namespace, colors) -> str:
+        # Upstream nodes are the constraints, the squash deformer and the ball's history. The copies are moved
+        # into the rig's namespace children first, so the paths of the nodes that are left to rename stay valid
+        with AutoRigHelpers.namespace_context(namespace):
+            new_nodes = cmds.duplicate(template_root, upstreamNodes=True)
+            new_nodes = [cmds.rename(node, f"{namespace}:{cls.strip_namespaces(node.split('|')[-1])}") for node in reversed(new_nodes)]
+        root_grp = cmds.ls(new_nodes[-1], long=True)[0]
+        
+        # Duplicates share the template's shading network, they get one per color pair instead
+        if colors != cls.template_colors:
+            ball_shape = AutoRigHelpers.get_shape_from_transform(cls.qualify_path(cls.ball_geo_path, namespace, root_grp))
+            AutoRigHelpers.assign_shader(cls.get_ball_shader(colors), [ball_shape])
+            
+        return root_grp
+        
+    @classmethod
+    def import_template(cls, namespace, colors) -> str:
+        file_path = cls.get_template_file_path()
+        if not os.path.exists(file_path):
+            cls.export_template(file_path)
+            
+        new_nodes = cmds.file(file_path, i=True, type="mayaAscii", namespace=namespace.lstrip(":"), mergeNamespacesOnClash=True,
+                              returnNewNodes=True)
+                              
+        # The imported rig has its own ball shading network, plain lamberts such as the disc shader are shared
+        if colors != cls.template_colors:
+            cls.set_ramp_colors(cmds.ls(new_nodes, type="ramp"), colors)
+        cls.pool_imported_shaders(new_nodes)
+            
+        # The file's nodes keep the template's namespace, move them up into the rig's namespace
+        root_name = cmds.ls(new_nodes, assemblies=True)[0]
+        template_namespace = root_name.rpartition(":")[0]
+        if template_namespace != namespace.lstrip(":"):
+            cmds.namespace(moveNamespace=[f":{template_namespace}", namespace], force=True)
+            cmds.namespace(removeNamespace=f":{template_namespace}")
+            
+        return f"|{namespace.lstrip(':')}:{cls.strip_namespaces(root_name)}"
+        
+    # Move the shapes of imported lamberts without input connections to the pooled lambert of the same
+    # color and transparency, then delete the imported copies
+    #
+    # @param new_nodes - Nodes the template file import returned
+    #
+    @classmethod
+    def pool_imported_shaders(cls, new_nodes):
+        for shader in cmds.ls(new_nodes, exactType="lambert"):
+            if cmds.listConnections(shader, source=True, destination=False):
+                continue
+                
+            shader_sgs = cmds.listConnections(f"{shader}.outColor", source=False, destination=True, type="shadingEngine") or []
+            color = cmds.getAttr(f"{shader}.color")[0]
+            transparency = cmds.getAttr(f"{shader}.transparency")[0]
+            pooled_shader, pooled_shader_sg = AutoRigHelpers.get_pooled_lambert_shader(cls.strip_namespaces(shader), color, transparency)
+            
+            shape_nodes = [shape_node for shader_sg in shader_sgs for shape_node in cmds.sets(shader_sg, query=True) or []]
+            if shape_nodes:
+                cmds.sets(shape_nodes, e=True, forceElement=pooled_shader_sg)
+            cmds.delete([shader] + shader_sgs)
+            
+    @classmethod
+    def export_template(cls, file_path):
+        template_root = cls.get_scene_template()
+        
+        # Export the rig with its history, constraints, shaders and display layer
+        descendants = cmds.listRelatives(template_root, allDescendents=True, fullPath=True) or []
+        display_layers = list(set(cmds.listConnections(descendants, type="displayLayer") or []))
+        
+        if not os.path.exists(os.path.dirname(file_path)):
+            os.makedirs(os.path.dirname(file_path))
+            
+        cmds.select([template_root] + display_layers, replace=True, noExpand=True)
+        cmds.file(file_path, exportSelected=True, type="mayaAscii", force=True, constructionHistory=True, channels=True,
+                  constraints=True, expressions=True, shader=True, preserveReferences=False)
+        cmds.select(clear=True)
+        
+    @classmethod
+    def get_template_file_path(cls) -> str:
+        return os.path.join(cmds.internalVar(userAppDir=True), "BallAutoRig", f"{cls.TEMPLATE_NAME}_v{cls.TEMPLATE_VERSION}.ma")
+        
+    @classmethod
+    def get_ball_shader(cls, colors) -> str:
+        ball_shader = cls.ball_shaders.get(colors)
+        if ball_shader and cmds.objExists(ball_shader):
+            return ball_shader
+            
+        ball_auto_rig = BallAutoRig()
+        ball_auto_rig.set_colors(*colors)
+        cls.ball_shaders[colors] = ball_auto_rig.create_ball_shading_network()
+        return cls.ball_shaders[colors]
+        
+    @classmethod
+    def strip_namespaces(cls, path) -> str:
+        return "|".join(part.rpartition(":")[2] for part in path.split("|"))
+        
+    @classmethod
+    def qualify_path(cls, relative_path, namespace, root_grp) -> str:
+        # Path of a node below the root group, with every node of the path in the namespace
+        return "|".join([root_grp] + [f"{namespace.lstrip(':')}:{part}" for part in relative_path.split("|")])
+        
+    @classmethod
+    def set_ramp_colors(cls, ramps, colors):
+        for ramp in ramps:
+            AutoRigHelpers.set_attr(ramp, "colorEntryList[0].color", colors[0], "double3")
+            AutoRigHelpers.set_attr(ramp, "colorEntryList[1].color", colors[1], "double3")
+            
+    @classmethod
+    def clear(cls):
+        # Forget the scene template, the template file stays on disk
+        cls.template_uuid = None
+        cls.template_colors = None
+        cls.ball_geo_path = None
+        cls.ball_shaders = {}
\ No newline at end of file
@@ -1,39 +1,143 @@
+import os
+import json
+
 import maya.cmds as cmds
+import maya.api.OpenMaya as om2
 
 from auto_rig_helpers import AutoRigHelpers
 
 class CurveLibrary(object):
     
+    SHAPES_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "curve_shapes.json")
+    SURFACE_FORMS = {
+        om2.MFnNurbsSurface.kOpen: "open",
+        om2.MFnNurbsSurface.kClosed: "closed",
+        om2.MFnNurbsSurface.kPeriodic: "periodic"
+    }
+    
+    # Shapes of the shapes file, shape name -> {"degree", "periodic", "points", "knots"}. Loaded on first use
+    shapes = None
+    
+    # Points of the shapes at a scale, (shape name, scale) -> list of points
+    scaled_points = {}
+    
+    # Surfaces lofted between curves, (shape name, radius) -> surface data. The first loft computes them
+    surfaces = {}
+    
+    @classmethod
+    def load_shapes(cls) -> dict:
+        if cls.shapes == None:
+            with open(cls.SHAPES_FILE_PATH, 'r') as shapes_file:
+                cls.shapes = json.load(shapes_file)
+        return cls.shapes
+        
+    @classmethod
+    def get_shape(cls, shape_name) -> dict:
+        return cls.load_shapes()[shape_name]
+        
+    # Add a shape to the library for this session, e.g. one read from a curve in the scene
+    #
+    # @param shape_name - Name of the shape
+    # @param degree - Degree of the curve
+    # @param points - List of (x, y, z) CVs, periodic curves repeat their first degree CVs at the end
+    # @param knots - Knot vector of the curve
+    # @param periodic - Whether the curve is closed
+    #
+    @classmethod
+    def add_shape(cls, shape_name, degree, points, knots, periodic=False):
+        cls.load_shapes()[shape_name] = {"degree": degree, "periodic": periodic, "points": points, "knots": knots}
+        
+        # Forget the points of a shape of the same name
+        cls.scaled_points = {key: scaled_points for key, scaled_points in cls.scaled_points.items() if key[0] != shape_name}
+        
+    @classmethod
+    def get_scaled_points(cls, shape_name, scale=1) -> list:
+        key = (shape_name, scale)
+        if key not in cls.scaled_points:
+            cls.scaled_points[key] = [tuple(value * scale for value in point) for point in cls.get_shape(shape_name)["points"]]
+        return cls.scaled_points[key]
+        
+    # Create a curve of one of the library's shapes
+    #
+    # @param shape_name - Name of the shape, e.g. "circle"
+    # @param name - Name of the curve
+    # @param scale - Uniform scale of the shape
+    # @return - The curve's transform
+    #
+    @classmethod
+    def create_curve(cls, shape_name, name=None, scale=1) -> str:
+        shape = cls.get_shape(shape_name)
+        return cmds.curve(degree=shape["degree"], periodic=shape["periodic"], point=cls.get_scaled_points(shape_name, scale),
+                          knot=shape["knots"], name=name or f"{shape_name}_crv")
+                          
+    # Create many curves of the library's shapes at once
+    #
+    # @param specs - List of (shape name, name, scale)
+    # @return - List of the curves' transforms, in the order of the specs
+    #
+    @classmethod
+    def create_curves(cls, specs) -> list:
+        return [cls.create_curve(shape_name, name, scale) for shape_name, name, scale in specs]
+        
     @classmethod
     def circle(cls, radius=1, name="circle_curve"):
-        return cmds.circle(center=(0,0,0), normal=(0,1,0), radius=radius, name=name)[0]
+        return cls.create_curve("circle", name, radius)
         
     @classmethod
     def two_way_arrow(cls, name="two_way_arrow_crv"):
-        return cmds.curve(degree=1,
-                          point=[(-1,0,-2),(-2,0,-2),(0,0,-4),(2,0,-2),(1,0,-2),(1,0,2),(2,0,2),(0,0,4),(-2,0,2),(-1,0,2),(-1,0,-2)],
-                          knot=[0,1,2,3,4,5,6,7,8,9,10],
-                          name=name)
-                          
+        return cls.create_curve("two_way_arrow", name)
+        
+    # @param assign_shader - Assign the disc shader, callers that assign many discs at once pass False
+    #
     @classmethod
-    def disc(cls, radius=2, name="disc"):
+    def disc(cls, radius=2, name="disc", assign_shader=True):
         # Create inner/outer circle and mark as unselectable
-        outer_circle = cls.circle(radius=radius, name="outer_circle_crv")
+        outer_circle, inner_circle = cls.create_curves([("circle", "outer_circle_crv", radius), ("circle", "inner_circle_crv", radius*0.1)])
         AutoRigHelpers.make_unselectable(outer_circle)
-        inner_circle = cls.circle(radius=radius*0.1, name="inner_circle_crv")
-        AutoRigHelpers.make_unselectable(inner_circle)      
-    
-        disc_geo = cmds.loft(outer_circle, inner_circle, uniform=True, ar=True, po=False, rsn=True, name=name)[0]
-        outer_circle, inner_circle = cmds.parent(outer_circle, inner_circle, disc_geo)
+        AutoRigHelpers.make_unselectable(inner_circle)
         
-        # Delete construction history
-        cmds.delete(outer_circle, inner_circle, disc_geo, ch=True)
+        # Only the first disc of a radius lofts the circles, later discs are created from its surface
+        surface = cls.surfaces.get(("disc", radius))
+        if surface:
+            disc_geo = cls.create_surface(surface, name)
+        else:
+            disc_geo = cmds.loft(outer_circle, inner_circle, uniform=True, ar=True, po=False, rsn=True, name=name)[0]
+            
+            # Delete construction history
+            cmds.delete(disc_geo, ch=True)
+            cls.surfaces[("disc", radius)] = cls.get_surface_data(disc_geo)
+            
+        outer_circle, inner_circle = cmds.parent(outer_circle, inner_circle, disc_geo)
         
         # Create and assign disc shader
-        disc_geo_shape = AutoRigHelpers.get_shape_from_transform(disc_geo)
-        disc_shader = AutoRigHelpers.create_assign_lambert_shader("dischader", disc_geo_shape)
-        AutoRigHelpers.set_attr(disc_shader, "color", [0.6, 0.6, 0.6], value_type="double3")
-        AutoRigHelpers.set_attr(disc_shader, "transparency", [0.75, 0.75, 0.75], value_type="double3")
-        
+        if assign_shader:
+            cls.create_disc_shader(AutoRigHelpers.get_shape_from_transform(disc_geo))
+            
         # Parent circles to disc_geo
-        return disc_geo
\ No newline at end of file
+        return disc_geo
+        
+    @classmethod
+    def create_disc_shader(cls, shape_node=None) -> str:
+        # Every disc shares the pooled shader of this color
+        return AutoRigHelpers.create_assign_lambert_shader("dischader", shape_node, color=[0.6, 0.6, 0.6], transparency=[0.75, 0.75, 0.75])
+        
+    @classmethod
+    def get_surface_data(cls, surface) -> dict:
+        shape_node = AutoRigHelpers.get_shape_from_transform(surface)
+        surface_fn = om2.MFnNurbsSurface(om2.MSelectionList().add(shape_node).getDagPath(0))
+        
+        # CVs are listed U by U, with all CVs along V of each U
+        return {
+            "degree_u": surface_fn.degreeInU,
+            "degree_v": surface_fn.degreeInV,
+            "form_u": cls.SURFACE_FORMS[surface_fn.formInU],
+            "form_v": cls.SURFACE_FORMS[surface_fn.formInV],
+            "knots_u": list(surface_fn.knotsInU()),
+            "knots_v": list(surface_fn.knotsInV()),
+            "points": [(point.x, point.y, point.z) for point in surface_fn.cvPositions(om2.MSpace.kObject)]
+        }
+        
+    @classmethod
+    def create_surface(cls, surface, name) -> str:
+        return cmds.surface(degreeU=surface["degree_u"], degreeV=surface["degree_v"], formU=surface["form_u"], formV=surface["form_v"],
+                            knotU=surface["knots_u"], knotV=surface["knots_v"], point=surface["points"], name=name)
\ No newline at end of file
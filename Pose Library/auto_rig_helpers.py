@@ -1,7 +1,60 @@
+import os
+import sys
+import json
+import time
+import contextlib
+
 import maya.cmds as cmds
+import maya.api.OpenMaya as om2
 
 class AutoRigHelpers(object):
     
+    NAMESPACE_SCENE_MESSAGES = [
+        om2.MSceneMessage.kAfterNew,
+        om2.MSceneMessage.kAfterOpen
+    ]
+    
+    # Scene and reference messages after which the settable and DAG path caches are cleared
+    SCENE_RESET_MESSAGES = [
+        om2.MSceneMessage.kAfterNew,
+        om2.MSceneMessage.kAfterOpen,
+        om2.MSceneMessage.kAfterImport,
+        om2.MSceneMessage.kAfterCreateReference,
+        om2.MSceneMessage.kAfterLoadReference,
+        om2.MSceneMessage.kAfterUnloadReference,
+        om2.MSceneMessage.kAfterRemoveReference
+    ]
+    
+    # State of plugs, node UUID -> {node path -> {attr -> (list of (attr, settable), locked, connected)}}.
+    # Referenced copies of a rig share UUIDs, so every node path of a UUID has its own states
+    settable_cache = {}
+    settable_cache_hits = 0
+    settable_cache_misses = 0
+    settable_cache_callbacks = []
+    
+    # Attribute changed callbacks of the cached nodes, (node UUID, node path) -> callback id
+    settable_cache_node_callbacks = {}
+    
+    # Current full path of control nodes, (UUID, namespace) -> full path. Cleared when any
+    # node is renamed, reparented or removed, since that can change the paths of its children
+    dag_path_cache = {}
+    dag_path_cache_callbacks = []
+    
+    # Increased whenever the DAG paths may have changed, so other caches of paths know to rebuild
+    dag_path_generation = 0
+    
+    # Lambert shaders shared by their parameters, (color, transparency) -> (shader UUID, shading group UUID)
+    shader_pool = {}
+    
+    # Next index to try of namespaces made by get_unique_namespace, namespace name -> index.
+    # Cleared when a new scene is made or opened, its namespaces are not the ones counted
+    namespace_indices = {}
+    namespace_callbacks = []
+    
+    # Profiles being recorded, maya.cmds is only wrapped while one is active
+    cmds_profiles = []
+    cmds_originals = {}
+    
     @classmethod
     def get_attr(cls, node, attr):
         return cmds.getAttr("{0}.{1}".format(node, attr))
@@ -33,29 +86,391 @@ class AutoRigHelpers(object):
         for attr in attrs:
             full_reference = "{0}.{1}".format(node, attr)
             cmds.setAttr(full_reference, lock=lock, keyable=keyable, channelBox=channelBox)
+            
+        # Locking changes which of the node's plugs are settable
+        cls.invalidate_settable_cache(node)
     
     @classmethod
     def can_set_attr(cls, node, attr) -> bool:
-        locked = cls.is_attr_locked(node, attr)
-        connected = cls.is_attr_connected(node, attr)
-        return locked == False and connected == False
+        plug_state = cls.get_plug_states([f"{node}.{attr}"])[f"{node}.{attr}"]
+        return len(plug_state) > 0 and all(settable for child_attr, settable in plug_state)
         
     @classmethod
     def is_attr_connected(cls, node, attr) -> bool:
-        connections = cmds.listConnections(f"{node}.{attr}", connections=True)
-        
-        if connections == None:
-            return False
-            
-        for connection in connections:
-            if f"{node}.{attr}" == connection and cmds.connectionInfo(connection, isDestination=True):
-                return True
-        return False
+        return cls.get_plug_states([f"{node}.{attr}"], flags=True)[f"{node}.{attr}"][2]
     
     @classmethod
     def is_attr_locked(cls, node, attr) -> bool:
-        return cmds.getAttr(f"{node}.{attr}", lock=True)
+        return cls.get_plug_states([f"{node}.{attr}"], flags=True)[f"{node}.{attr}"][1]
     
+    # Query whether many plugs can be set in one pass through the API instead of
+    # a getAttr/listConnections/connectionInfo round trip per plug. Results are cached
+    # per node and attribute until the scene, a reference, a connection or a lock changes
+    #
+    # @param plugs - List of "node.attr" plugs
+    # @param flags - Also return whether the plugs themselves are locked and connected
+    # @return - Dict of plug -> list of (attr, settable) for each child of a compound plug,
+    #           or a single (attr, settable) for a simple plug. Plugs that do not exist map to an empty list.
+    #           With flags, plug -> (list of (attr, settable), locked, connected)
+    #
+    @classmethod
+    def get_plug_states(cls, plugs, flags=False) -> dict:
+        cls.register_settable_cache_callbacks()
+        plug_states = {}
+        
+        for plug_name in plugs:
+            try:
+                plug = om2.MSelectionList().add(plug_name).getPlug(0)
+            except RuntimeError:
+                plug_states[plug_name] = ([], False, False) if flags else []
+                continue
+                
+            node_states = cls.get_node_states(plug.node())
+            attr = plug.partialName(useLongNames=True)
+            
+            if attr in node_states:
+                cls.settable_cache_hits += 1
+            else:
+                cls.settable_cache_misses += 1
+                node_states[attr] = (cls.query_plug_state(plug), plug.isLocked, plug.isDestination)
+                
+            plug_states[plug_name] = node_states[attr] if flags else node_states[attr][0]
+            
+        return plug_states
+        
+    @classmethod
+    def get_node_states(cls, node) -> dict:
+        node_uuid = om2.MFnDependencyNode(node).uuid().asString()
+        node_path = cls.get_node_path(node)
+        
+        uuid_states = cls.settable_cache.setdefault(node_uuid, {})
+        if node_path not in uuid_states:
+            uuid_states[node_path] = {}
+            
+            # Locking or unlocking a plug, e.g. in the Channel Box, changes which plugs are settable
+            if (node_uuid, node_path) not in cls.settable_cache_node_callbacks:
+                cls.settable_cache_node_callbacks[(node_uuid, node_path)] = om2.MNodeMessage.addAttributeChangedCallback(node, cls.on_attribute_changed)
+        return uuid_states[node_path]
+        
+    @classmethod
+    def get_node_path(cls, node) -> str:
+        if node.hasFn(om2.MFn.kDagNode):
+            return om2.MDagPath.getAPathTo(node).fullPathName()
+        return om2.MFnDependencyNode(node).name()
+        
+    @classmethod
+    def query_plug_state(cls, plug) -> list:
+        parent_settable = not plug.isLocked and not cls.is_plug_driven(plug)
+        
+        if plug.isCompound:
+            children = [plug.child(c) for c in range(plug.numChildren())]
+        else:
+            children = [plug]
+            
+        return [(child.partialName(useLongNames=True), parent_settable and not child.isLocked and not cls.is_plug_driven(child)) for child in children]
+        
+    @classmethod
+    def is_plug_driven(cls, plug) -> bool:
+        # Animated plugs are connected to an animCurve but can still be set and keyed
+        if not plug.isDestination:
+            return False
+            
+        source = plug.source()
+        return source.isNull or not source.node().hasFn(om2.MFn.kAnimCurve)
+        
+    # Read many plugs in one pass through the API, in the same units getAttr returns
+    #
+    # @param plugs - List of "node.attr" plugs
+    # @return - Dict of plug -> tuple of values, one per child of a compound plug. Plugs that do not exist map to None
+    #
+    @classmethod
+    def get_plug_values(cls, plugs) -> dict:
+        plug_values = {}
+        
+        for plug_name in plugs:
+            try:
+                plug = om2.MSelectionList().add(plug_name).getPlug(0)
+            except RuntimeError:
+                plug_values[plug_name] = None
+                continue
+                
+            if plug.isCompound:
+                children = [plug.child(c) for c in range(plug.numChildren())]
+            else:
+                children = [plug]
+                
+            plug_values[plug_name] = tuple(cls.get_plug_ui_value(child) for child in children)
+            
+        return plug_values
+        
+    @classmethod
+    def get_plug_ui_value(cls, plug) -> float:
+        # Plugs store angles and distances in internal units, convert them to the UI units
+        attribute = plug.attribute()
+        if attribute.hasFn(om2.MFn.kUnitAttribute):
+            unit_type = om2.MFnUnitAttribute(attribute).unitType()
+            if unit_type == om2.MFnUnitAttribute.kAngle:
+                return plug.asMAngle().asUnits(om2.MAngle.uiUnit())
+            if unit_type == om2.MFnUnitAttribute.kDistance:
+                return plug.asMDistance().asUnits(om2.MDistance.uiUnit())
+        return plug.asDouble()
+        
+    @classmethod
+    def set_plug_ui_value(cls, plug, value):
+        # Write a value given in UI units, the same way setAttr takes it. Not undoable
+        attribute = plug.attribute()
+        if attribute.hasFn(om2.MFn.kUnitAttribute):
+            unit_type = om2.MFnUnitAttribute(attribute).unitType()
+            if unit_type == om2.MFnUnitAttribute.kAngle:
+                plug.setMAngle(om2.MAngle(value, om2.MAngle.uiUnit()))
+                return
+            if unit_type == om2.MFnUnitAttribute.kDistance:
+                plug.setMDistance(om2.MDistance(value, om2.MDistance.uiUnit()))
+                return
+        plug.setDouble(value)
+        
+    # Add a value given in UI units to a modifier, the same way setAttr takes it
+    @classmethod
+    def add_plug_ui_value(cls, modifier, plug, value):
+        attribute = plug.attribute()
+        if attribute.hasFn(om2.MFn.kUnitAttribute):
+            unit_type = om2.MFnUnitAttribute(attribute).unitType()
+            if unit_type == om2.MFnUnitAttribute.kAngle:
+                modifier.newPlugValueMAngle(plug, om2.MAngle(value, om2.MAngle.uiUnit()))
+                return
+            if unit_type == om2.MFnUnitAttribute.kDistance:
+                modifier.newPlugValueMDistance(plug, om2.MDistance(value, om2.MDistance.uiUnit()))
+                return
+        modifier.newPlugValueDouble(plug, value)
+        
+    # Get the MPlugs of the children of a plug, or the plug itself if it is not a compound
+    #
+    # @param plug_name - "node.attr" plug
+    # @return - List of MPlugs, empty when the plug does not exist
+    #
+    @classmethod
+    def get_child_plugs(cls, plug_name) -> list:
+        try:
+            plug = om2.MSelectionList().add(plug_name).getPlug(0)
+        except RuntimeError:
+            return []
+            
+        if plug.isCompound:
+            return [plug.child(c) for c in range(plug.numChildren())]
+        return [plug]
+        
+    @classmethod
+    def get_plug_uuid(cls, plug) -> str:
+        return om2.MFnDependencyNode(plug.node()).uuid().asString()
+        
+    # Read every keyable, unlocked attribute of many nodes in one pass through the API
+    #
+    # @param uuids - List of node UUIDs
+    # @return - Dict of UUID -> (short name, full path, {attr -> value}). Compound attributes whose children
+    #           are all keyable are stored as a tuple, e.g. translate, other attributes as a single value
+    #
+    @classmethod
+    def get_keyable_attr_values(cls, uuids) -> dict:
+        node_values = {}
+        
+        for uuid in uuids:
+            try:
+                dag_path = om2.MSelectionList().add(uuid).getDagPath(0)
+            except (RuntimeError, TypeError):
+                continue
+                
+            node = dag_path.node()
+            node_fn = om2.MFnDependencyNode(node)
+            attr_values = {}
+            
+            for a in range(node_fn.attributeCount()):
+                attribute = node_fn.attribute(a)
+                
+                # Children are read through their compound, array attributes can not be keyed as a whole
+                if not om2.MFnAttribute(attribute).parent.isNull():
+                    continue
+                plug = om2.MPlug(node, attribute)
+                if plug.isArray or plug.isLocked:
+                    continue
+                    
+                if plug.isCompound:
+                    children = [plug.child(c) for c in range(plug.numChildren())]
+                    keyable_children = [child for child in children if child.isKeyable and not child.isLocked]
+                    if keyable_children and len(keyable_children) == len(children):
+                        attr_values[plug.partialName(useLongNames=True)] = tuple(cls.get_plug_ui_value(child) for child in children)
+                    else:
+                        for child in keyable_children:
+                            attr_values[child.partialName(useLongNames=True)] = cls.get_plug_ui_value(child)
+                elif plug.isKeyable:
+                    attr_values[plug.partialName(useLongNames=True)] = cls.get_plug_ui_value(plug)
+                    
+            node_values[uuid] = (dag_path.partialPathName(), dag_path.fullPathName(), attr_values)
+            
+        return node_values
+        
+    @classmethod
+    def invalidate_settable_cache(cls, node):
+        if not cls.settable_cache:
+            return
+            
+        try:
+            node_uuid = om2.MFnDependencyNode(om2.MSelectionList().add(node).getDependNode(0)).uuid().asString()
+        except RuntimeError:
+            return
+        cls.settable_cache.pop(node_uuid, None)
+        
+    @classmethod
+    def clear_settable_cache(cls):
+        cls.settable_cache = {}
+        
+        # Callbacks of nodes that were deleted are already gone
+        for callback_id in cls.settable_cache_node_callbacks.values():
+            try:
+                om2.MMessage.removeCallback(callback_id)
+            except RuntimeError:
+                pass
+        cls.settable_cache_node_callbacks = {}
+        
+    @classmethod
+    def get_settable_cache_stats(cls) -> dict:
+        return {
+            "hits": cls.settable_cache_hits,
+            "misses": cls.settable_cache_misses,
+            "nodes": sum(len(uuid_states) for uuid_states in cls.settable_cache.values()),
+            "plugs": sum(len(node_states) for uuid_states in cls.settable_cache.values() for node_states in uuid_states.values())
+        }
+        
+    @classmethod
+    def register_settable_cache_callbacks(cls):
+        if cls.settable_cache_callbacks:
+            return
+            
+        # Any scene or reference change can add, remove, lock or connect plugs
+        for message in cls.SCENE_RESET_MESSAGES:
+            cls.settable_cache_callbacks.append(om2.MSceneMessage.addCallback(message, cls.on_scene_changed))
+        cls.settable_cache_callbacks.append(om2.MDGMessage.addConnectionCallback(cls.on_connection_changed))
+        
+    @classmethod
+    def remove_settable_cache_callbacks(cls):
+        if cls.settable_cache_callbacks:
+            om2.MMessage.removeCallbacks(cls.settable_cache_callbacks)
+            cls.settable_cache_callbacks = []
+            
+    # Is called by the settable cache's and the namespace scene messages
+    @classmethod
+    def on_scene_changed(cls, client_data=None):
+        cls.clear_settable_cache()
+        cls.namespace_indices = {}
+        
+    @classmethod
+    def on_connection_changed(cls, src_plug, dest_plug, made, client_data=None):
+        # Only the destination plug's settable state changes
+        if cls.settable_cache:
+            cls.settable_cache.pop(cls.get_plug_uuid(dest_plug), None)
+            
+    @classmethod
+    def on_attribute_changed(cls, message, plug, other_plug, client_data=None):
+        if message & (om2.MNodeMessage.kAttributeLocked | om2.MNodeMessage.kAttributeUnlocked) and cls.settable_cache:
+            cls.settable_cache.pop(cls.get_plug_uuid(plug), None)
+            
+    # Resolve saved control nodes to their current full paths. Nodes are looked up by UUID with one
+    # ls for the whole batch, nodes whose UUID does not exist, e.g. a referenced rig in a new scene,
+    # are matched by name in any namespace with a second ls
+    #
+    # @param nodes - List of (uuid, name, full_path) of the control nodes as they were saved
+    # @param namespace - Namespace to prefer when a node matches more than one node in the scene
+    # @return - Dict of uuid -> current full path, nodes that were not found are left out
+    #
+    @classmethod
+    def resolve_dag_paths(cls, nodes, namespace=None) -> dict:
+        cls.register_dag_path_cache_callbacks()
+        dag_paths = {}
+        
+        unresolved = []
+        for uuid, name, full_path in nodes:
+            dag_path = cls.dag_path_cache.get((uuid, namespace))
+            if dag_path:
+                dag_paths[uuid] = dag_path
+            else:
+                unresolved.append((uuid, name, full_path))
+        if not unresolved:
+            return dag_paths
+            
+        # Look up the UUIDs, referenced rigs can share UUIDs so a UUID may match several nodes
+        uuid_matches = {}
+        for match in cmds.ls([uuid for uuid, name, full_path in unresolved], long=True) or []:
+            uuid_matches.setdefault(cls.get_node_uuid(match), []).append(match)
+            
+        # Fall back to the name without its namespace
+        unmatched = [node for node in unresolved if node[0] not in uuid_matches]
+        name_matches = {}
+        if unmatched:
+            leaf_names = {cls.strip_namespaces(name.split("|")[-1]) for uuid, name, full_path in unmatched}
+            for match in cmds.ls(list(leaf_names), long=True, recursive=True) or []:
+                name_matches.setdefault(cls.strip_namespaces(match.split("|")[-1]), []).append(match)
+                
+        for uuid, name, full_path in unresolved:
+            matches = uuid_matches.get(uuid) or name_matches.get(cls.strip_namespaces(name.split("|")[-1]))
+            if matches:
+                dag_paths[uuid] = cls.pick_dag_path(matches, full_path, namespace)
+                cls.dag_path_cache[(uuid, namespace)] = dag_paths[uuid]
+                
+        return dag_paths
+        
+    @classmethod
+    def pick_dag_path(cls, matches, full_path, namespace=None) -> str:
+        if len(matches) > 1 and namespace:
+            in_namespace = [match for match in matches if match.split("|")[-1].rpartition(":")[0] == namespace.strip(":")]
+            matches = in_namespace or matches
+            
+        # Prefer the node the pose was saved from, then a node that sits under the same hierarchy
+        if len(matches) > 1:
+            if full_path in matches:
+                return full_path
+                
+            saved_path = cls.strip_namespaces(full_path)
+            for match in matches:
+                if cls.strip_namespaces(match) == saved_path:
+                    return match
+        return matches[0]
+        
+    @classmethod
+    def strip_namespaces(cls, path) -> str:
+        return "|".join(part.rpartition(":")[2] for part in path.split("|"))
+        
+    @classmethod
+    def get_node_uuid(cls, node) -> str:
+        return om2.MFnDependencyNode(om2.MSelectionList().add(node).getDependNode(0)).uuid().asString()
+        
+    @classmethod
+    def clear_dag_path_cache(cls):
+        cls.dag_path_cache = {}
+        
+    @classmethod
+    def register_dag_path_cache_callbacks(cls):
+        if cls.dag_path_cache_callbacks:
+            return
+            
+        for message in cls.SCENE_RESET_MESSAGES:
+            cls.dag_path_cache_callbacks.append(om2.MSceneMessage.addCallback(message, cls.on_dag_path_changed))
+        cls.dag_path_cache_callbacks.append(om2.MNodeMessage.addNameChangedCallback(om2.MObject(), cls.on_dag_path_changed))
+        cls.dag_path_cache_callbacks.append(om2.MDagMessage.addParentAddedCallback(cls.on_dag_path_changed))
+        cls.dag_path_cache_callbacks.append(om2.MDagMessage.addParentRemovedCallback(cls.on_dag_path_changed))
+        cls.dag_path_cache_callbacks.append(om2.MDGMessage.addNodeRemovedCallback(cls.on_dag_path_changed, "dagNode"))
+        
+    @classmethod
+    def remove_dag_path_cache_callbacks(cls):
+        if cls.dag_path_cache_callbacks:
+            om2.MMessage.removeCallbacks(cls.dag_path_cache_callbacks)
+            cls.dag_path_cache_callbacks = []
+            
+    # Is called by every scene, rename, parent and node removed message, their arguments are not needed
+    @classmethod
+    def on_dag_path_changed(cls, *args):
+        cls.dag_path_generation += 1
+        if cls.dag_path_cache:
+            cls.clear_dag_path_cache()
+            
     @classmethod
     def is_attr_keyable(cls, node, attr) -> bool:
         return cmds.getAttr(f"{node}.{attr}", keyable=True)
@@ -75,17 +490,86 @@ class AutoRigHelpers(object):
             
         return display_layer
         
+    # Create a lambert shader and assign it to shape nodes. Shaders with a color are pooled, a shader
+    # of the same color and transparency is reused from earlier calls or found in the scene, so shapes that
+    # look the same share one shading group. Without a color a new shader is created, e.g. to connect a texture to
+    #
+    # @param name - Name of the shader when a new one is created
+    # @param shape_node - Shape node or list of shape nodes, all assigned with one call
+    # @param color - (r, g, b) color of the shader
+    # @param transparency - (r, g, b) transparency of the shader, only used with a color
+    # @return - The shader
+    #
     @classmethod
-    def create_assign_lambert_shader(cls, name, shape_node):
+    def create_assign_lambert_shader(cls, name, shape_node=None, color=None, transparency=(0, 0, 0)):
+        if color != None:
+            shader, shader_sg = cls.get_pooled_lambert_shader(name, color, transparency)
+        else:
+            shader, shader_sg = cls.create_lambert_shader(name)
+            
+        # Assign shader to shape node
+        if shape_node:
+            cmds.sets(shape_node if isinstance(shape_node, list) else [shape_node], e=True, forceElement=shader_sg)
+            
+        return shader
+        
+    @classmethod
+    def create_lambert_shader(cls, name, color=None, transparency=None):
         # Create shader
         shader = cmds.shadingNode("lambert", name=name, asShader=True)
         shader_sg = cmds.sets(name="{0}SG".format(shader), renderable=True, noSurfaceShader=True, empty=True)
         cls.connect_attr(shader, "outColor", shader_sg, "surfaceShader")
         
-        # Assign shader to shape node
-        cmds.sets([shape_node], e=True, forceElement=shader_sg)
+        if color != None:
+            cls.set_attr(shader, "color", color, "double3")
+            cls.set_attr(shader, "transparency", transparency, "double3")
+            
+        return shader, shader_sg
         
-        return shader
+    @classmethod
+    def get_pooled_lambert_shader(cls, name, color, transparency):
+        key = (cls.get_shader_key(color), cls.get_shader_key(transparency))
+        
+        # Pooled nodes are kept by UUID, they are gone after a new scene is opened or when they were deleted
+        if key in cls.shader_pool:
+            shader_uuid, shader_sg_uuid = cls.shader_pool[key]
+            shader, shader_sg = cmds.ls(shader_uuid), cmds.ls(shader_sg_uuid)
+            if shader and shader_sg:
+                return shader[0], shader_sg[0]
+                
+        # Pooled shaders are shared by every rig, keep them out of the rig's namespace so removing it does not remove them
+        with cls.namespace_context(":"):
+            shader, shader_sg = cls.find_lambert_shader(key) or cls.create_lambert_shader(name, color, transparency)
+        cls.shader_pool[key] = (cmds.ls(shader, uuid=True)[0], cmds.ls(shader_sg, uuid=True)[0])
+        return shader, shader_sg
+        
+    @classmethod
+    def find_lambert_shader(cls, key):
+        # Match lamberts in the root namespace without input connections, e.g. textures, that are the surface shader of a shading group
+        for shader in cmds.ls(exactType="lambert"):
+            if shader == "lambert1" or ":" in shader or cmds.listConnections(shader, source=True, destination=False):
+                continue
+            if (cls.get_shader_key(cmds.getAttr(f"{shader}.color")[0]), cls.get_shader_key(cmds.getAttr(f"{shader}.transparency")[0])) != key:
+                continue
+                
+            shader_sgs = cmds.listConnections(f"{shader}.outColor", source=False, destination=True, type="shadingEngine")
+            if shader_sgs:
+                return shader, shader_sgs[0]
+        return None
+        
+    @classmethod
+    def get_shader_key(cls, values) -> tuple:
+        return tuple(round(float(value), 4) for value in values)
+        
+    @classmethod
+    def clear_shader_pool(cls):
+        cls.shader_pool = {}
+        
+    @classmethod
+    def assign_shader(cls, shader, shape_nodes):
+        # Assign every shape node to the shader's shading group with one call
+        shader_sg = cmds.listConnections("{0}.outColor".format(shader), source=False, destination=True, type="shadingEngine")[0]
+        cmds.sets(shape_nodes, e=True, forceElement=shader_sg)
     
     @classmethod
     def get_shape_from_transform(cls, transform_node):
@@ -106,4 +590,194 @@ class AutoRigHelpers(object):
     @classmethod
     def uuid_to_full_path(cls, uuid) -> str:
         return cmds.ls(uuid, long=True)[0]
-        
\ No newline at end of file
+        
+    # Get a namespace no node is in yet, e.g. ball, ball1, ball2. The next free index of every name is
+    # remembered, so making many namespaces of the same name does not check every taken one again
+    #
+    # @param name - Name of the namespace
+    # @return - Absolute namespace, e.g. ":ball1"
+    #
+    @classmethod
+    def get_unique_namespace(cls, name) -> str:
+        cls.register_namespace_callbacks()
+        name = name.strip(":")
+        index = cls.namespace_indices.get(name, 0)
+        
+        namespace = f":{name}{index or ''}"
+        while cmds.namespace(exists=namespace):
+            index += 1
+            namespace = f":{name}{index}"
+            
+        cls.namespace_indices[name] = index + 1
+        return namespace
+        
+    @classmethod
+    def register_namespace_callbacks(cls):
+        if cls.namespace_callbacks:
+            return
+            
+        for message in cls.NAMESPACE_SCENE_MESSAGES:
+            cls.namespace_callbacks.append(om2.MSceneMessage.addCallback(message, cls.on_scene_changed))
+            
+    @classmethod
+    def remove_namespace_callbacks(cls):
+        if cls.namespace_callbacks:
+            om2.MMessage.removeCallbacks(cls.namespace_callbacks)
+            cls.namespace_callbacks = []
+            
+    # Create the nodes made inside the block in a namespace, the current namespace is restored afterwards
+    #
+    # @param namespace - Absolute namespace, created when it does not exist. ":" is the root namespace
+    #
+    @classmethod
+    @contextlib.contextmanager
+    def namespace_context(cls, namespace):
+        current_namespace = cmds.namespaceInfo(currentNamespace=True, absoluteName=True)
+        if not cmds.namespace(exists=namespace):
+            cmds.namespace(add=namespace.lstrip(":"), parent=":")
+            
+        cmds.namespace(setNamespace=namespace)
+        try:
+            yield namespace
+        finally:
+            cmds.namespace(setNamespace=current_namespace)
+        
+    # Record every maya.cmds call made inside the block, by the tools or any other module. Profiles
+    # can be nested, each one records the calls made inside it
+    #
+    #   with AutoRigHelpers.profile_cmds("construct_rig") as profile:
+    #       BallAutoRig().construct_rig()
+    #   profile.dump()
+    #
+    # @param name - Name of the profiled operation
+    # @return - The CmdsProfile, its wall time is set once the block exits
+    #
+    @classmethod
+    @contextlib.contextmanager
+    def profile_cmds(cls, name="operation"):
+        profile = CmdsProfile(name)
+        if not cls.cmds_profiles:
+            cls.wrap_cmds()
+        cls.cmds_profiles.append(profile)
+        
+        start = time.perf_counter()
+        try:
+            yield profile
+        finally:
+            profile.wall_time = time.perf_counter() - start
+            cls.cmds_profiles.remove(profile)
+            if not cls.cmds_profiles:
+                cls.unwrap_cmds()
+                
+    @classmethod
+    def wrap_cmds(cls):
+        # The tools look commands up on the module at every call, so replacing the module's
+        # functions profiles direct cmds calls as well as the ones made through the helpers
+        for command in dir(cmds):
+            function = getattr(cmds, command)
+            if command.startswith("_") or not callable(function):
+                continue
+            cls.cmds_originals[command] = function
+            setattr(cmds, command, cls.create_profiled_command(command, function))
+            
+    @classmethod
+    def unwrap_cmds(cls):
+        for command, function in cls.cmds_originals.items():
+            setattr(cmds, command, function)
+        cls.cmds_originals = {}
+        
+    @classmethod
+    def create_profiled_command(cls, command, function):
+        def profiled_command(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                call_site = cls.get_call_site()
+                for profile in cls.cmds_profiles:
+                    profile.record(command, elapsed, call_site)
+        return profiled_command
+        
+    @classmethod
+    def get_call_site(cls) -> str:
+        # Skip this frame and the profiled command, then the helpers the command was called through
+        frame = sys._getframe(2)
+        helper = None
+        while frame and frame.f_globals.get("__name__") == __name__:
+            helper = helper or frame.f_code.co_name
+            frame = frame.f_back
+            
+        if frame == None:
+            return f"AutoRigHelpers.{helper}"
+        call_site = f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        return f"{call_site} > AutoRigHelpers.{helper}" if helper else call_site
+        
+class CmdsProfile(object):
+    
+    # Counts and times the maya.cmds calls of one tool operation
+    #
+    # @param name - Name of the profiled operation, e.g. "construct_rig"
+    #
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        
+        # Command -> [calls, seconds], command -> {call site -> calls}
+        self.commands = {}
+        self.call_sites = {}
+        
+    def record(self, command, elapsed, call_site):
+        command_stats = self.commands.setdefault(command, [0, 0.0])
+        command_stats[0] += 1
+        command_stats[1] += elapsed
+        
+        call_sites = self.call_sites.setdefault(command, {})
+        call_sites[call_site] = call_sites.get(call_site, 0) + 1
+        
+    @property
+    def call_count(self) -> int:
+        return sum(calls for calls, seconds in self.commands.values())
+        
+    @property
+    def cmds_time(self) -> float:
+        return sum(seconds for calls, seconds in self.commands.values())
+        
+    def get_report(self) -> dict:
+        # The most expensive commands and their busiest call sites first
+        commands = sorted(self.commands.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "name": self.name,
+            "wall_time": self.wall_time,
+            "cmds_time": self.cmds_time,
+            "calls": self.call_count,
+            "commands": [{
+                "command": command,
+                "calls": calls,
+                "time": seconds,
+                "call_sites": dict(sorted(self.call_sites[command].items(), key=lambda item: item[1], reverse=True))
+            } for command, (calls, seconds) in commands]
+        }
+        
+    def format_report(self, call_site_limit=3) -> str:
+        report = self.get_report()
+        lines = [f"{self.name}: {report['calls']} maya.cmds calls, {report['cmds_time']*1000:.2f} ms of {report['wall_time']*1000:.2f} ms",
+                 f"{'command':<32}{'calls':>8}{'ms':>12}{'ms/call':>10}"]
+                 
+        for command in report["commands"]:
+            lines.append(f"{command['command']:<32}{command['calls']:>8}{command['time']*1000:>12.3f}{command['time']*1000/command['calls']:>10.3f}")
+            for call_site, calls in list(command["call_sites"].items())[:call_site_limit]:
+                lines.append(f"    {calls:>6}  {call_site}")
+                
+        return "\n".join(lines)
+        
+    # Print the report to the script editor, or write it as JSON
+    #
+    # @param file_path - JSON file to write the report to, printed when not given
+    #
+    def dump(self, file_path=None):
+        if file_path:
+            with open(file_path, 'w') as report_file:
+                json.dump(self.get_report(), report_file, indent=4)
+        else:
+            print(self.format_report())
\ No newline at end of file
@@ -0,0 +1,31 @@
+from PySide6 import QtCore
+from PySide6 import QtGui
+
+from pose_library import PoseLibrary
+from pose_library_thumbnails import ThumbnailLoader
+from pose_library_content_view import PoseContentModel
+
+class ContentRefreshBenchmark(object):
+    
+    # Poses a content view of the default size shows without scrolling
+    VISIBLE_POSE_COUNT = 12
+    
+    # Runs what PoseLibraryWindow.refresh_content_layout runs when a folder is selected, without a window
+    def __init__(self, thumbnail_width=250, thumbnail_height=200, thumbnail_scalar=0.5):
+        # Pixmaps need a GUI application, the offscreen platform does not need a display
+        self.application = QtGui.QGuiApplication.instance() or QtGui.QGuiApplication(["benchmark", "-platform", "offscreen"])
+        
+        self.thumbnail_loader = ThumbnailLoader(thumbnail_width, thumbnail_height)
+        self.content_model = PoseContentModel(self.thumbnail_loader, thumbnail_scalar)
+        
+    def refresh(self, folder_id):
+        PoseLibrary.update_selected_folder(folder_id)
+        self.content_model.set_poses(PoseLibrary.poses, reset=True)
+        
+        # The view only asks for the data of the visible poses
+        for row in range(min(self.VISIBLE_POSE_COUNT, self.content_model.rowCount())):
+            index = self.content_model.index(row)
+            self.content_model.data(index, QtCore.Qt.DisplayRole)
+            self.content_model.data(index, QtCore.Qt.DecorationRole)
+            
+        self.thumbnail_loader.cancel_pending()
\ No newline at end of file
@@ -0,0 +1,403 @@
+import sys
+import time
+import types
+
+from collections import Counter
+
+class CallCounter(object):
+    
+    # Counts the maya.cmds calls and API lookups of a benchmark, every command call
+    # busy-waits for the simulated latency of a round trip through Maya's command engine
+    #
+    # @param latency - Simulated seconds per maya.cmds call
+    #
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.commands = Counter()
+        self.api_lookups = 0
+        
+    def reset(self):
+        self.commands = Counter()
+        self.api_lookups = 0
+        
+    def call(self, command):
+        self.commands[command] += 1
+        
+        # time.sleep is too coarse for microsecond latencies
+        if self.latency > 0:
+            end = time.perf_counter() + self.latency
+            while time.perf_counter() < end:
+                pass
+                
+class FakeAttribute(object):
+    
+    # @param name - Long name of the attribute
+    # @param parent - Parent FakeAttribute of a compound's child, None otherwise
+    # @param children - Child FakeAttributes of a compound attribute
+    #
+    def __init__(self, name, parent=None, children=None, keyable=True, locked=False):
+        self.name = name
+        self.parent = parent
+        self.children = children or []
+        self.keyable = keyable
+        self.locked = locked
+        
+class FakeNode(object):
+    
+    # Compound attributes every control has, plus one scalar custom attribute
+    COMPOUND_ATTRIBUTES = {"translate": "XYZ", "rotate": "XYZ", "scale": "XYZ"}
+    SCALAR_ATTRIBUTES = ["visibility", "squashStretch"]
+    
+    def __init__(self, full_path, uuid):
+        self.full_path = full_path
+        self.uuid = uuid
+        self.attributes = []
+        self.values = {}
+        
+        for name, axes in self.COMPOUND_ATTRIBUTES.items():
+            attribute = FakeAttribute(name)
+            attribute.children = [FakeAttribute(name + axis, parent=attribute) for axis in axes]
+            self.attributes.append(attribute)
+            self.attributes.extend(attribute.children)
+            for child in attribute.children:
+                self.values[child.name] = 1.0 if name == "scale" else 0.0
+        for name in self.SCALAR_ATTRIBUTES:
+            self.attributes.append(FakeAttribute(name))
+            self.values[name] = 1.0
+            
+        self.attribute_names = {attribute.name: attribute for attribute in self.attributes}
+        
+    @property
+    def leaf_name(self):
+        return self.full_path.split("|")[-1]
+        
+class FakeScene(object):
+    
+    # A scene of rig control nodes that the fake maya.cmds and OpenMaya modules work on
+    def __init__(self, workspace=""):
+        self.workspace = workspace
+        self.reset()
+        
+    def reset(self):
+        self.nodes = {}
+        self.uuids = {}
+        self.selection = []
+        
+    def create_rig(self, control_count, namespace="") -> list:
+        # Control nodes are parented under one rig group, returns their UUIDs
+        prefix = f"{namespace}:" if namespace else ""
+        uuids = []
+        for c in range(control_count):
+            node = FakeNode(f"|{prefix}rig|{prefix}ctl_{c:04d}", f"{namespace or 'rig'}-UUID-{c:08d}")
+            self.nodes[node.full_path] = node
+            self.uuids[node.uuid] = node
+            uuids.append(node.uuid)
+        return uuids
+        
+    def find_nodes(self, name, recursive=False) -> list:
+        if name in self.uuids:
+            return [self.uuids[name]]
+        if name in self.nodes:
+            return [self.nodes[name]]
+            
+        # Match short names, in any namespace below the given one when recursive
+        namespace, separator, leaf_name = name.rpartition(":")
+        matches = []
+        for node in self.nodes.values():
+            node_namespace, separator, node_leaf_name = node.leaf_name.rpartition(":")
+            if node_leaf_name != leaf_name:
+                continue
+            if node_namespace == namespace or (recursive and (not namespace or node_namespace.startswith(namespace + ":"))):
+                matches.append(node)
+        return matches
+        
+    def find_plug(self, plug_name):
+        node_name, separator, attr = plug_name.rpartition(".")
+        nodes = self.find_nodes(node_name)
+        if not nodes or attr not in nodes[0].attribute_names:
+            raise RuntimeError(f"No object matches name: {plug_name}")
+        return nodes[0], nodes[0].attribute_names[attr]
+        
+    def get_values(self, node, attribute) -> list:
+        if attribute.children:
+            return [node.values[child.name] for child in attribute.children]
+        return [node.values[attribute.name]]
+        
+    def set_values(self, node, attribute, values):
+        for child, value in zip(attribute.children or [attribute], values):
+            node.values[child.name] = float(value)
+            
+def create_cmds_module(scene, counter):
+    cmds = types.ModuleType("maya.cmds")
+    
+    def ls(*args, selection=False, long=False, uuid=False, recursive=False, **kwargs):
+        counter.call("ls")
+        names = []
+        for arg in args:
+            names.extend([arg] if isinstance(arg, str) else arg)
+            
+        nodes = list(scene.selection) if selection else []
+        for name in names:
+            nodes.extend(scene.find_nodes(name, recursive))
+        return [node.uuid if uuid else (node.full_path if long else node.leaf_name) for node in nodes]
+        
+    def setAttr(plug_name, *values, **kwargs):
+        counter.call("setAttr")
+        node, attribute = scene.find_plug(plug_name)
+        if values:
+            scene.set_values(node, attribute, values)
+            
+    def getAttr(plug_name, **kwargs):
+        counter.call("getAttr")
+        node, attribute = scene.find_plug(plug_name)
+        values = scene.get_values(node, attribute)
+        return [tuple(values)] if attribute.children else values[0]
+        
+    def workspace(*args, **kwargs):
+        counter.call("workspace")
+        return scene.workspace
+        
+    def currentTime(*args, **kwargs):
+        counter.call("currentTime")
+        return 1.0
+        
+    cmds.ls = ls
+    cmds.setAttr = setAttr
+    cmds.getAttr = getAttr
+    cmds.workspace = workspace
+    cmds.currentTime = currentTime
+    
+    # Every other command only counts its call, e.g. undoInfo, setKeyframe and refresh
+    def __getattr__(command):
+        def fake_command(*args, **kwargs):
+            counter.call(command)
+        return fake_command
+    cmds.__getattr__ = __getattr__
+    
+    return cmds
+    
+def create_open_maya_module(scene, counter):
+    om2 = types.ModuleType("maya.api.OpenMaya")
+    
+    class MObject(object):
+        def __init__(self, node=None, attribute=None):
+            self.node = node
+            self.attribute = attribute
+            
+        def isNull(self):
+            return self.node is None and self.attribute is None
+            
+        def hasFn(self, fn):
+            return False
+            
+    class MUuid(object):
+        def __init__(self, uuid):
+            self.uuid = uuid
+            
+        def asString(self):
+            return self.uuid
+            
+    class MPlug(object):
+        def __init__(self, node_object, attribute_object):
+            self.node_object = node_object
+            self.fake_node = node_object.node
+            self.fake_attribute = attribute_object.attribute
+            
+        @property
+        def isArray(self):
+            return False
+            
+        @property
+        def isLocked(self):
+            return self.fake_attribute.locked
+            
+        @property
+        def isDestination(self):
+            return False
+            
+        @property
+        def isCompound(self):
+            return bool(self.fake_attribute.children)
+            
+        @property
+        def isKeyable(self):
+            return self.fake_attribute.keyable
+            
+        def numChildren(self):
+            return len(self.fake_attribute.children)
+            
+        def child(self, index):
+            return MPlug(self.node_object, MObject(attribute=self.fake_attribute.children[index]))
+            
+        def node(self):
+            return self.node_object
+            
+        def attribute(self):
+            return MObject(attribute=self.fake_attribute)
+            
+        def partialName(self, useLongNames=False):
+            return self.fake_attribute.name
+            
+        def asDouble(self):
+            return self.fake_node.values[self.fake_attribute.name]
+            
+    class MDagPath(object):
+        def __init__(self, fake_node):
+            self.fake_node = fake_node
+            
+        def node(self):
+            return MObject(self.fake_node)
+            
+        def fullPathName(self):
+            return self.fake_node.full_path
+            
+        def partialPathName(self):
+            return self.fake_node.leaf_name
+            
+    class MSelectionList(object):
+        def __init__(self):
+            self.items = []
+            
+        def add(self, name):
+            counter.api_lookups += 1
+            if "." in name.split("|")[-1]:
+                node, attribute = scene.find_plug(name)
+                self.items.append(MPlug(MObject(node), MObject(attribute=attribute)))
+            else:
+                nodes = scene.find_nodes(name)
+                if not nodes:
+                    raise RuntimeError(f"No object matches name: {name}")
+                self.items.append(MDagPath(nodes[0]))
+            return self
+            
+        def getPlug(self, index):
+            if not isinstance(self.items[index], MPlug):
+                raise TypeError("item is not a plug")
+            return self.items[index]
+            
+        def getDagPath(self, index):
+            if not isinstance(self.items[index], MDagPath):
+                raise TypeError("item is not a DAG path")
+            return self.items[index]
+            
+        def getDependNode(self, index):
+            item = self.items[index]
+            return item.node_object if isinstance(item, MPlug) else item.node()
+            
+    class MFnDependencyNode(object):
+        def __init__(self, node_object):
+            self.fake_node = node_object.node
+            
+        def uuid(self):
+            return MUuid(self.fake_node.uuid)
+            
+        def name(self):
+            return self.fake_node.full_path
+            
+        def attributeCount(self):
+            return len(self.fake_node.attributes)
+            
+        def attribute(self, index):
+            return MObject(attribute=self.fake_node.attributes[index])
+            
+    class MFnAttribute(object):
+        def __init__(self, attribute_object):
+            self.parent = MObject(attribute=attribute_object.attribute.parent)
+            
+    class MFn(object):
+        kUnitAttribute = 1
+        kDagNode = 2
+        
+    class MDGModifier(object):
+        def __init__(self):
+            self.plug_values = []
+            self.old_values = []
+            
+        def newPlugValueDouble(self, plug, value):
+            self.plug_values.append((plug, float(value)))
+            
+        def doIt(self):
+            self.old_values = [(plug, plug.asDouble()) for plug, value in self.plug_values]
+            for plug, value in self.plug_values:
+                plug.fake_node.values[plug.fake_attribute.name] = value
+                
+        def undoIt(self):
+            for plug, value in reversed(self.old_values):
+                plug.fake_node.values[plug.fake_attribute.name] = value
+                
+    class MGlobal(object):
+        @staticmethod
+        def displayWarning(message):
+            pass
+            
+    class MMessage(object):
+        @staticmethod
+        def removeCallback(callback_id):
+            pass
+            
+        @staticmethod
+        def removeCallbacks(callback_ids):
+            pass
+            
+    class MSceneMessage(MMessage):
+        kAfterNew, kAfterOpen, kAfterImport, kAfterCreateReference, kAfterLoadReference, kAfterUnloadReference, kAfterRemoveReference = range(7)
+        
+        @staticmethod
+        def addCallback(message, function):
+            return 0
+            
+    # The fake scene never sends messages, callbacks are accepted and ignored
+    class MDGMessage(MMessage):
+        @staticmethod
+        def addConnectionCallback(function):
+            return 0
+            
+        @staticmethod
+        def addNodeRemovedCallback(function, node_type=""):
+            return 0
+            
+    class MNodeMessage(MMessage):
+        kAttributeLocked = 1 << 0
+        kAttributeUnlocked = 1 << 1
+        
+        @staticmethod
+        def addNameChangedCallback(node, function):
+            return 0
+            
+        @staticmethod
+        def addAttributeChangedCallback(node, function):
+            return 0
+            
+    class MDagMessage(MMessage):
+        @staticmethod
+        def addParentAddedCallback(function):
+            return 0
+            
+        @staticmethod
+        def addParentRemovedCallback(function):
+            return 0
+            
+    for api_class in [MObject, MUuid, MPlug, MDagPath, MSelectionList, MFnDependencyNode, MFnAttribute, MFn, MDGModifier, MGlobal,
+                      MMessage, MSceneMessage, MDGMessage, MNodeMessage, MDagMessage]:
+        setattr(om2, api_class.__name__, api_class)
+        
+    return om2
+    
+# Install the fake modules as 'maya', 'maya.cmds' and 'maya.api.OpenMaya'. Must be called
+# before any pose library module is imported
+#
+# @param scene - The FakeScene the modules work on
+# @param counter - The CallCounter that counts the calls
+#
+def install(scene, counter):
+    maya = types.ModuleType("maya")
+    maya_api = types.ModuleType("maya.api")
+    
+    maya.cmds = create_cmds_module(scene, counter)
+    maya.api = maya_api
+    maya_api.OpenMaya = create_open_maya_module(scene, counter)
+    
+    sys.modules["maya"] = maya
+    sys.modules["maya.cmds"] = maya.cmds
+    sys.modules["maya.api"] = maya_api
+    sys.modules["maya.api.OpenMaya"] = maya_api.OpenMaya
\ No newline at end of file
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+# The pose library modules import maya.cmds, install the fake maya modules before importing them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_maya
+
+scene = fake_maya.FakeScene()
+counter = fake_maya.CallCounter()
+fake_maya.install(scene, counter)
+
+from auto_rig_helpers import AutoRigHelpers
+
+from pose_library import PoseLibrary
+from pose_library_io_utility import PoseLibraryIOUtility
+from pose_library_index import PoseLibraryIndex
+from pose_library_cache import PoseDataCache
+from pose_library_crawler import PoseLibraryCrawler
+from pose_library_folders import PoseLibraryFolders
+from pose_library_retarget import PoseRetarget
+from pose_library_data import PoseData
+
+class PoseLibraryBenchmark(object):
+    
+    # Benchmarks the hot paths of the pose library on synthetic libraries
+    #
+    # @param latency - Simulated seconds per maya.cmds call
+    # @param sample_count - Number of poses that are captured and applied, capturing and applying
+    #                       every pose of a large library would take too long
+    # @param measure_memory - Trace peak memory of every operation, this slows the operations down
+    #
+    def __init__(self, latency=0.0, sample_count=10, measure_memory=True):
+        counter.latency = latency
+        self.sample_count = sample_count
+        self.measure_memory = measure_memory
+        self.results = []
+        
+    def run(self, pose_counts, control_counts) -> dict:
+        for pose_count in pose_counts:
+            for control_count in control_counts:
+                with tempfile.TemporaryDirectory() as library_path:
+                    self.run_library(library_path, pose_count, control_count)
+                    
+        return {
+            "config": {
+                "latency_us": counter.latency * 1e6,
+                "sample_count": self.sample_count,
+                "measure_memory": self.measure_memory,
+                "python": sys.version.split()[0]
+            },
+            "results": self.results
+        }
+        
+    def run_library(self, library_path, pose_count, control_count):
+        self.reset(library_path)
+        selection = scene.create_rig(control_count)
+        scene.selection = [scene.uuids[uuid] for uuid in selection]
+        sample_count = min(self.sample_count, pose_count)
+        
+        folder_path = os.path.join(library_path, "Poses")
+        PoseLibraryIOUtility.create_folder(folder_path)
+        sizes = (pose_count, control_count)
+        
+        # Capture poses from the rig
+        pose_datas = self.measure("capture_pose", sizes, sample_count, lambda: [PoseData(selection) for p in range(sample_count)])
+        
+        # Write the whole library from the captured poses
+        self.measure("save_pose_data", sizes, pose_count, lambda: [
+            PoseLibraryIOUtility.save_pose_data(pose_datas[p % sample_count], folder_path, f"pose_{p:05d}") for p in range(pose_count)])
+            
+        # Browse the folder with an empty index, then with the index built
+        PoseLibraryCrawler.clear()
+        self.measure("get_poses_at_path_cold", sizes, pose_count, lambda: PoseLibraryIndex.get_poses_at_path(folder_path))
+        self.measure("get_poses_at_path_warm", sizes, pose_count, lambda: PoseLibraryIndex.get_poses_at_path(folder_path))
+        
+        pose_paths = [os.path.join(folder_path, f"pose_{p:05d}.pose") for p in range(pose_count)]
+        self.measure("load_pose_data", sizes, pose_count, lambda: [PoseLibraryIOUtility.load_pose_data(pose_path) for pose_path in pose_paths])
+        
+        # Apply poses to the rig, the first pose resolves the control nodes and their settable states
+        loaded_poses = [PoseLibraryIOUtility.load_pose_data(pose_path) for pose_path in pose_paths[:sample_count]]
+        self.measure("load_pose_to_rig", sizes, sample_count, lambda: [PoseLibrary.load_pose_to_rig(pose_data) for pose_data in loaded_poses])
+        
+        self.measure_content_refresh(folder_path, sizes)
+        
+    def measure_content_refresh(self, folder_path, sizes):
+        try:
+            from benchmark_content import ContentRefreshBenchmark
+        except ImportError as error:
+            self.results.append({"operation": "refresh_content_layout", "poses": sizes[0], "controls": sizes[1], "skipped": str(error)})
+            return
+            
+        content_refresh = ContentRefreshBenchmark()
+        folder_node = PoseLibraryFolders.add_folder(folder_path, parent=PoseLibraryFolders.root)
+        self.measure("refresh_content_layout", sizes, sizes[0], lambda: content_refresh.refresh(folder_node.id))
+        
+    # Run an operation and record its wall time, peak memory and maya.cmds calls
+    #
+    # @param operation - Name of the operation
+    # @param sizes - (pose count, control count) of the library
+    # @param item_count - Number of items the operation processes, e.g. poses saved
+    # @param function - Runs the operation
+    # @return - What the function returned
+    #
+    def measure(self, operation, sizes, item_count, function):
+        counter.reset()
+        if self.measure_memory:
+            tracemalloc.start()
+            
+        start = time.perf_counter()
+        result = function()
+        wall_time = time.perf_counter() - start
+        
+        peak_memory = None
+        if self.measure_memory:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            
+        self.results.append({
+            "operation": operation,
+            "poses": sizes[0],
+            "controls": sizes[1],
+            "items": item_count,
+            "wall_time": wall_time,
+            "wall_time_per_item": wall_time / item_count if item_count else 0.0,
+            "peak_memory": peak_memory,
+            "cmds_calls": sum(counter.commands.values()),
+            "cmds_calls_by_command": dict(counter.commands),
+            "api_lookups": counter.api_lookups
+        })
+        return result
+        
+    def reset(self, library_path):
+        # Every library starts from an empty scene and empty caches
+        scene.reset()
+        scene.workspace = library_path
+        
+        PoseLibraryIOUtility.root_folder_path = library_path
+        PoseLibraryIndex.load(library_path)
+        PoseDataCache.clear()
+        PoseLibraryCrawler.clear()
+        PoseLibraryFolders.set_root_folder(library_path)
+        PoseRetarget.clear()
+        AutoRigHelpers.clear_settable_cache()
+        AutoRigHelpers.clear_dag_path_cache()
+        
+def parse_counts(text) -> list:
+    return [int(count) for count in text.split(",") if count.strip()]
+    
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pose library against a fake maya.cmds backend")
+    parser.add_argument("--poses", default="10,100", help="Comma separated pose counts per library, e.g. 10,1000,10000")
+    parser.add_argument("--controls", default="10,100", help="Comma separated control counts per pose, e.g. 10,1000")
+    parser.add_argument("--latency-us", type=float, default=20.0, help="Simulated microseconds per maya.cmds call")
+    parser.add_argument("--sample", type=int, default=10, help="Poses captured and applied per library")
+    parser.add_argument("--no-memory", action="store_true", help="Do not trace memory, tracing slows every operation down")
+    parser.add_argument("--output", default="", help="Write the JSON results to this file instead of stdout")
+    args = parser.parse_args(args)
+    
+    benchmark = PoseLibraryBenchmark(args.latency_us * 1e-6, args.sample, not args.no_memory)
+    results = benchmark.run(parse_counts(args.poses), parse_counts(args.controls))
+    
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,45 +1,79 @@
-import maya.cmds as cmds
-import ast
-
-from pose_library_io_utility import PoseLibraryIOUtility
-
-from pose_library_data import PoseData
-from pose_library_data import ControlNodeData
-
-from auto_rig_helpers import AutoRigHelpers
+from pose_library_index import PoseLibraryIndex
+from pose_library_folders import PoseLibraryFolders
+from pose_library_cache import PoseHandle
+from pose_library_apply import PoseApplyEngine
+from pose_library_math import PoseBlend
+from pose_library_retarget import PoseRetarget
+from pose_library_batch import PoseBatchApply
 
 class PoseLibrary(object):
     
-    selected_folder = ""
+    # Id of the selected folder's FolderNode
+    selected_folder = None
     poses = {}
+    pose_blend = None
     
     @classmethod
-    def update_selected_folder(cls, new_folder):
-        cls.selected_folder = new_folder
+    def update_selected_folder(cls, folder_id):
+        cls.selected_folder = folder_id
+        
+        # Only the library index is read, pose files are parsed when a pose is applied
+        cls.close_poses()
+        for pose_name, pose_entry in PoseLibraryIndex.get_poses_at_path(cls.get_selected_folder_path()).items():
+            cls.poses[pose_name] = PoseHandle(pose_name,
+                                              PoseLibraryIndex.get_pose_path(pose_entry),
+                                              PoseLibraryIndex.get_thumbnail_path(pose_entry),
+                                              pose_entry["control_count"],
+                                              pose_entry["hash"],
+                                              pose_entry["thumbnail_mtime"])
+                                              
+    # Close the maps of the selected folder's poses, e.g. before their files are replaced
+    @classmethod
+    def close_poses(cls):
+        for pose_handle in cls.poses.values():
+            pose_handle.close()
+        cls.poses = {}
         
-        folder_path = PoseLibraryIOUtility.folders[new_folder]
-        cls.poses = PoseLibraryIOUtility.get_poses_at_path(folder_path)
+    @classmethod
+    def get_selected_folder_path(cls) -> str:
+        return PoseLibraryFolders.get_folder(cls.selected_folder).path
         
     @classmethod
     def load_pose_to_rig(cls, pose_data):
-        # Iterate through every control node
-        for n in range(len(pose_data.control_nodes)):
-            # Get the control node's data and full path
-            control_node_data = pose_data.control_nodes[n]
-            control_node = control_node_data.full_path
-            
-            # Iterate through attributes and set data
-            for attr, value in control_node_data.attributes.items():
-                # Convert string into tuple
-                values = ast.literal_eval(value)
+        PoseApplyEngine.apply_pose(pose_data)
+        
+    @classmethod
+    def load_pose_to_namespaces(cls, pose_data, namespaces):
+        PoseRetarget.apply_pose_to_namespaces(pose_data, namespaces)
+        
+    # Apply and key many poses as one undoable action
+    #
+    # @param batch - List of (pose_data, namespace, frame)
+    # @param suspend_refresh - Suspend viewport refresh while the poses are applied
+    #
+    @classmethod
+    def key_pose_batch(cls, batch, suspend_refresh=True):
+        PoseBatchApply.apply_batch(batch, suspend_refresh)
+        
+    @classmethod
+    def start_pose_blend(cls, pose_data):
+        # Capture the rig's current state to blend from
+        cls.pose_blend = PoseBlend([pose_data])
+        
+    # Blend the rig towards the pose of the last blend that was started
+    #
+    # @param weight - Blend weight, 1.0 applies the pose as it was saved
+    # @param scrub - The weight is being dragged, the values are set undoably once end_blend_scrub is called
+    #
+    @classmethod
+    def blend_pose_to_rig(cls, weight, scrub=False):
+        if cls.pose_blend:
+            if scrub:
+                cls.pose_blend.scrub(weight)
+            else:
+                cls.pose_blend.apply(weight)
                 
-                try:
-                    # Check if the x, y, and z values for each attribute are settable individually
-                    if AutoRigHelpers.can_set_attr(control_node, f"{attr}X"):
-                        AutoRigHelpers.set_attr(control_node, f"{attr}X", values[0])
-                    if AutoRigHelpers.can_set_attr(control_node, f"{attr}Y"):
-                        AutoRigHelpers.set_attr(control_node, f"{attr}Y", values[1])
-                    if AutoRigHelpers.can_set_attr(control_node, f"{attr}Z"):
-                        AutoRigHelpers.set_attr(control_node, f"{attr}Z", values[2])
-                except:
-                    pass
\ No newline at end of file
+    @classmethod
+    def end_blend_scrub(cls, weight):
+        if cls.pose_blend:
+            cls.pose_blend.end_scrub(weight)
\ No newline at end of file
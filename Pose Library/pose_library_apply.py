@@ -0,0 +1,146 @@
+import os
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+from auto_rig_helpers import AutoRigHelpers
+
+class PoseApplyEngine(object):
+    
+    UNDO_CHUNK_NAME = "applyPose"
+    
+    # Plug-in command that puts a done MDGModifier on the undo queue
+    UNDO_PLUGIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pose_library_undo_plugin.py")
+    UNDO_COMMAND_NAME = "poseLibraryApplyModifier"
+    
+    undo_plugin_loaded = False
+    
+    # Modifier that was done and is waiting for the undo command to take it
+    pending_modifier = None
+    
+    @classmethod
+    def apply_pose(cls, pose_data, undo_chunk=True):
+        cls.apply_plugs(cls.get_pose_plugs(pose_data), undo_chunk)
+        
+    # Set many plugs at once
+    #
+    # @param pose_plugs - List of ("node.attr", values) pairs
+    # @param undo_chunk - Wrap the plugs in their own undo chunk, disable when the caller already opened one
+    # @param plug_states - Settable states of the plugs when the caller already queried them
+    #
+    @classmethod
+    def apply_plugs(cls, pose_plugs, undo_chunk=True, plug_states=None):
+        if plug_states == None:
+            plug_states = AutoRigHelpers.get_plug_states([plug for plug, values in pose_plugs])
+        
+        # Apply the whole pose as one undoable action
+        if undo_chunk:
+            cmds.undoInfo(openChunk=True, chunkName=cls.UNDO_CHUNK_NAME)
+        try:
+            if not cls.apply_modifier(pose_plugs, plug_states):
+                for plug, values in pose_plugs:
+                    cls.set_plug(plug, values, plug_states[plug])
+        finally:
+            if undo_chunk:
+                cmds.undoInfo(closeChunk=True)
+                
+    # Set every settable child plug with one MDGModifier instead of a setAttr per plug
+    #
+    # @return - False when the modifier failed, e.g. a plug was locked since it was cached, nothing is set then
+    #
+    @classmethod
+    def apply_modifier(cls, pose_plugs, plug_states) -> bool:
+        cls.load_undo_plugin()
+        
+        modifier = om2.MDGModifier()
+        for plug, values in pose_plugs:
+            for (attr, settable), child_plug, value in zip(plug_states[plug], AutoRigHelpers.get_child_plugs(plug), values):
+                if settable:
+                    AutoRigHelpers.add_plug_ui_value(modifier, child_plug, value)
+                    
+        try:
+            modifier.doIt()
+        except RuntimeError:
+            modifier.undoIt()
+            AutoRigHelpers.clear_settable_cache()
+            return False
+            
+        # Hand the modifier to the undo queue
+        cls.pending_modifier = modifier
+        getattr(cmds, cls.UNDO_COMMAND_NAME)()
+        return True
+        
+    @classmethod
+    def take_pending_modifier(cls):
+        modifier = cls.pending_modifier
+        cls.pending_modifier = None
+        return modifier
+        
+    @classmethod
+    def load_undo_plugin(cls):
+        if cls.undo_plugin_loaded:
+            return
+            
+        if not cmds.pluginInfo(cls.UNDO_PLUGIN_PATH, query=True, loaded=True):
+            cmds.loadPlugin(cls.UNDO_PLUGIN_PATH, quiet=True)
+        cls.undo_plugin_loaded = True
+        
+    # Get the plugs of a pose on the control nodes as they are in the scene now
+    #
+    # @param pose_data - The pose
+    # @param namespace - Namespace to prefer when a control node has to be found by name
+    # @return - List of ("node.attr", values) pairs, control nodes that were not found are left out
+    #
+    @classmethod
+    def get_pose_plugs(cls, pose_data, namespace=None) -> list:
+        pose_plugs = []
+        
+        control_values = cls.get_control_values(pose_data)
+        dag_paths = AutoRigHelpers.resolve_dag_paths([control_node for control_node, attr_values in control_values], namespace)
+        
+        for (uuid, name, full_path), attr_values in control_values:
+            dag_path = dag_paths.get(uuid)
+            if dag_path != None:
+                pose_plugs.extend((f"{dag_path}.{attr}", values) for attr, values in attr_values)
+                
+        return pose_plugs
+        
+    # Get the values of a pose per control node
+    #
+    # @param pose_data - The pose
+    # @return - List of ((uuid, name, full_path), [(attr, values)]) with a tuple of values for every attribute
+    #
+    @classmethod
+    def get_control_values(cls, pose_data) -> list:
+        control_values = []
+        
+        for control_node_data in pose_data.control_nodes:
+            attr_values = []
+            for attr, value in control_node_data.attributes.items():
+                # Pose files store numbers as floats, any other value can not be set
+                if isinstance(value, str):
+                    continue
+                    
+                attr_values.append((attr, tuple(value) if isinstance(value, (tuple, list)) else (value,)))
+                
+            control_values.append(((control_node_data.uuid, control_node_data.name, control_node_data.full_path), attr_values))
+            
+        return control_values
+        
+    @classmethod
+    def set_plug(cls, plug, values, plug_state):
+        node = plug.rsplit(".", 1)[0]
+        
+        try:
+            # Set every child of the attribute with one call when they are all settable
+            if plug_state and len(plug_state) == len(values) and all(settable for attr, settable in plug_state):
+                cmds.setAttr(plug, *values)
+                return
+                
+            # Otherwise set the settable children individually
+            for (attr, settable), value in zip(plug_state, values):
+                if settable:
+                    cmds.setAttr(f"{node}.{attr}", value)
+        except RuntimeError:
+            # The plug was locked since it was cached, query it again next time
+            AutoRigHelpers.invalidate_settable_cache(node)
\ No newline at end of file
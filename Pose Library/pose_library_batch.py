@@ -0,0 +1,96 @@
+import maya.cmds as cmds
+
+from auto_rig_helpers import AutoRigHelpers
+
+from pose_library_apply import PoseApplyEngine
+from pose_library_retarget import PoseRetarget
+
+class PoseBatchApply(object):
+    
+    UNDO_CHUNK_NAME = "applyPoseBatch"
+    
+    # Apply and key many poses on many rigs as one undoable action. Control nodes are resolved once
+    # per pose and rig, and the settable state of every plug is queried once for the whole batch
+    #
+    # @param batch - List of (pose_data, namespace, frame). A namespace of None applies the pose to the rig
+    #                it was saved from, a frame of None sets the pose without keying it
+    # @param suspend_refresh - Suspend viewport refresh while the batch is applied
+    #
+    @classmethod
+    def apply_batch(cls, batch, suspend_refresh=True):
+        batch_plugs = cls.get_batch_plugs(batch)
+        plug_states = AutoRigHelpers.get_plug_states({plug for pose_plugs, frame in batch_plugs for plug, values in pose_plugs})
+        
+        # Items on the same frame, e.g. several rigs, are keyed together
+        frame_plugs = {}
+        for pose_plugs, frame in batch_plugs:
+            if frame != None:
+                frame_plugs.setdefault(frame, []).extend(pose_plugs)
+                
+        cmds.undoInfo(openChunk=True, chunkName=cls.UNDO_CHUNK_NAME)
+        if suspend_refresh:
+            cmds.refresh(suspend=True)
+        try:
+            if frame_plugs:
+                current_time = cmds.currentTime(query=True)
+                try:
+                    for frame, pose_plugs in frame_plugs.items():
+                        cls.key_plugs(pose_plugs, frame, plug_states)
+                finally:
+                    cmds.currentTime(current_time, update=True)
+                    
+            # Poses without a frame are set once the time is back, so the animation does not overwrite them
+            for pose_plugs, frame in batch_plugs:
+                if frame == None:
+                    PoseApplyEngine.apply_plugs(pose_plugs, undo_chunk=False, plug_states=plug_states)
+        finally:
+            if suspend_refresh:
+                cmds.refresh(suspend=False)
+            cmds.undoInfo(closeChunk=True)
+            
+    # Get the plugs of every batch item, poses that are applied to the same rig more than once,
+    # e.g. on several frames, are only resolved once
+    #
+    # @param batch - List of (pose_data, namespace, frame)
+    # @return - List of (pose plugs, frame) in the order of the batch
+    #
+    @classmethod
+    def get_batch_plugs(cls, batch) -> list:
+        # Build the control mappings of all namespaces a pose is applied in together
+        pose_namespaces = {}
+        for pose_data, namespace, frame in batch:
+            if namespace != None:
+                pose_namespaces.setdefault(id(pose_data), (pose_data, []))[1].append(namespace)
+        for pose_data, namespaces in pose_namespaces.values():
+            control_values = PoseApplyEngine.get_control_values(pose_data)
+            PoseRetarget.get_control_mappings([control_node for control_node, attr_values in control_values], namespaces)
+            
+        target_plugs = {}
+        batch_plugs = []
+        for pose_data, namespace, frame in batch:
+            key = (id(pose_data), namespace)
+            if key not in target_plugs:
+                if namespace == None:
+                    target_plugs[key] = PoseApplyEngine.get_pose_plugs(pose_data)
+                else:
+                    target_plugs[key] = PoseRetarget.get_namespace_plugs(pose_data, [namespace])
+            batch_plugs.append((target_plugs[key], frame))
+            
+        return batch_plugs
+        
+    @classmethod
+    def key_plugs(cls, pose_plugs, frame, plug_states):
+        # Move to the frame without evaluating the scene, so plugs keyed by an earlier item of the batch
+        # keep the values that are set instead of the value of their curve at the frame
+        cmds.currentTime(frame, update=False)
+        PoseApplyEngine.apply_plugs(pose_plugs, undo_chunk=False, plug_states=plug_states)
+        
+        # Key every settable child plug with one call
+        key_plugs = []
+        for plug, values in pose_plugs:
+            node = plug.rsplit(".", 1)[0]
+            key_plugs.extend(f"{node}.{attr}" for attr, settable in plug_states[plug] if settable)
+            
+        if key_plugs:
+            cmds.setKeyframe(key_plugs, time=frame)
+            
\ No newline at end of file
@@ -0,0 +1,267 @@
+import sys
+import mmap
+import struct
+import math
+
+from array import array
+
+from pose_library_data import PoseData
+
+# Binary '.pose' layout (all values little-endian)
+#
+#   Header          - magic, version, flags, control count, channel count, string table offset, channel table offset
+#   String table    - string count, (count + 1) uint32 offsets into the blob, utf-8 blob
+#                     index 0 is the pose name, then uuid/name/full_path for every control node,
+#                     then the name of every channel, then the attributes and values of the other values
+#   Channel table   - one entry per channel: name string index, value width, data offset
+#   Other table     - version 2, value count, then one entry per value that is not a number:
+#                     control index, attribute string index, value string index
+#   Channel data    - one packed float64 array per channel (control count * width values), 8 byte aligned
+#                     values that a control node does not have are stored as NaN
+#
+class PoseBinaryFormat(object):
+    
+    MAGIC = b"POSB"
+    VERSION = 2
+    
+    HEADER = struct.Struct("<4sHHIIQQ")
+    STRING_COUNT = struct.Struct("<I")
+    CHANNEL_ENTRY = struct.Struct("<IIQ")
+    OTHER_COUNT = struct.Struct("<I")
+    OTHER_ENTRY = struct.Struct("<III")
+    
+    CN_STRING_START = 1
+    CN_STRING_COUNT = 3
+    
+    @classmethod
+    def is_binary_pose_file(cls, pose_path) -> bool:
+        with open(pose_path, 'rb') as pose_file:
+            return pose_file.read(len(cls.MAGIC)) == cls.MAGIC
+            
+    @classmethod
+    def write_pose_data(cls, pose_data : PoseData, pose_file_path, pose_name):
+        control_count = pose_data.control_count
+        stride = pose_data.channel_count
+        channels = {channel: width for channel, (column, width) in pose_data.channels.items()}
+        
+        # Build string table
+        strings = [pose_name]
+        for n in range(control_count):
+            strings.extend([pose_data.uuids[n], pose_data.names[n], pose_data.full_paths[n]])
+        channel_string_start = len(strings)
+        strings.extend(channels.keys())
+        
+        # Values that are not numbers are stored as strings, the same as text pose files store them
+        other_table = bytearray(cls.OTHER_COUNT.pack(sum(len(attributes) for attributes in pose_data.other_values.values())))
+        for index, attributes in sorted(pose_data.other_values.items()):
+            for attribute, value in attributes.items():
+                other_table += cls.OTHER_ENTRY.pack(index, len(strings), len(strings) + 1)
+                strings.extend([attribute, str(value)])
+        string_table = cls.pack_string_table(strings)
+        
+        # Build one packed float64 array per channel from the pose's (controls x channels) array
+        channel_arrays = []
+        for channel, (column, width) in pose_data.channels.items():
+            values = array('d', [math.nan]) * (control_count * width)
+            for c in range(width):
+                values[c::width] = pose_data.values[column+c::stride]
+            if sys.byteorder != "little":
+                values.byteswap()
+            channel_arrays.append(values)
+            
+        # Compute offsets
+        string_table_offset = cls.HEADER.size
+        channel_table_offset = string_table_offset + len(string_table)
+        other_table_offset = channel_table_offset + cls.CHANNEL_ENTRY.size * len(channels)
+        data_offset = cls.align(other_table_offset + len(other_table))
+        
+        channel_table = bytearray()
+        channel_offsets = []
+        for c, (attribute, width) in enumerate(channels.items()):
+            channel_offsets.append(data_offset)
+            channel_table += cls.CHANNEL_ENTRY.pack(channel_string_start + c, width, data_offset)
+            data_offset += channel_arrays[c].itemsize * len(channel_arrays[c])
+            
+        with open(pose_file_path, 'wb') as pose_file:
+            pose_file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, 0, control_count, len(channels), string_table_offset, channel_table_offset))
+            pose_file.write(string_table)
+            pose_file.write(channel_table)
+            pose_file.write(other_table)
+            
+            # Write channel data at its aligned offset
+            for c, values in enumerate(channel_arrays):
+                pose_file.write(b"\0" * (channel_offsets[c] - pose_file.tell()))
+                values.tofile(pose_file)
+                
+    @classmethod
+    def read_pose_data(cls, pose_path) -> PoseData:
+        with MappedPoseFile(pose_path) as mapped_pose:
+            return mapped_pose.to_pose_data()
+            
+    @classmethod
+    def pack_string_table(cls, strings):
+        encoded = [string.encode("utf-8") for string in strings]
+        
+        # Offsets of every string into the blob, plus the end of the blob
+        offsets = array('I', [0])
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        if sys.byteorder != "little":
+            offsets.byteswap()
+            
+        return cls.STRING_COUNT.pack(len(strings)) + offsets.tobytes() + b"".join(encoded)
+        
+    @classmethod
+    def align(cls, offset, alignment=8):
+        return (offset + alignment - 1) // alignment * alignment
+        
+class MappedPoseFile(object):
+    
+    # Memory-maps a binary pose file. Only the header is decoded up front,
+    # strings and channels are decoded the first time they are requested.
+    #
+    # @param pose_path - Path to the binary '.pose' file
+    #
+    def __init__(self, pose_path):
+        self.pose_path = pose_path
+        self.buffer = None
+        
+        with open(pose_path, 'rb') as pose_file:
+            try:
+                self.buffer = mmap.mmap(pose_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can not be mapped
+                raise ValueError(f"corrupt pose file: {pose_path}")
+                
+        try:
+            self.validate()
+        except ValueError:
+            self.close()
+            raise
+            
+        self.strings = {}
+        self.channel_values = {}
+        
+    # Check the header and that every table and channel array lies inside the file, so a truncated or
+    # half-written file fails here instead of somewhere in a later read
+    def validate(self):
+        size = len(self.buffer)
+        self.check(size >= PoseBinaryFormat.HEADER.size)
+        
+        magic, self.version, flags, self.control_count, self.channel_count, self.string_table_offset, self.channel_table_offset = PoseBinaryFormat.HEADER.unpack_from(self.buffer, 0)
+        self.check(magic == PoseBinaryFormat.MAGIC and self.version >= 1)
+        if self.version > PoseBinaryFormat.VERSION:
+            raise ValueError(f"{self.pose_path} uses pose format version {self.version}, newest supported is {PoseBinaryFormat.VERSION}")
+            
+        # String table, the pose name, 3 strings per control node and the channel names
+        offsets_start = self.string_table_offset + PoseBinaryFormat.STRING_COUNT.size
+        self.check(offsets_start <= size)
+        self.string_count = PoseBinaryFormat.STRING_COUNT.unpack_from(self.buffer, self.string_table_offset)[0]
+        self.check(self.string_count >= PoseBinaryFormat.CN_STRING_START + self.control_count * PoseBinaryFormat.CN_STRING_COUNT + self.channel_count)
+        self.check(offsets_start + 4 * (self.string_count + 1) <= size)
+        
+        self.string_offsets = self.read_array('I', offsets_start, self.string_count + 1)
+        self.blob_start = offsets_start + self.string_offsets.itemsize * len(self.string_offsets)
+        self.check(self.string_offsets[0] == 0 and self.blob_start + self.string_offsets[-1] <= size)
+        self.check(all(start <= end for start, end in zip(self.string_offsets, self.string_offsets[1:])))
+        
+        # Channel table and the channel arrays it points to
+        self.check(self.channel_table_offset + self.channel_count * PoseBinaryFormat.CHANNEL_ENTRY.size <= size)
+        self.channel_entries = []
+        for c in range(self.channel_count):
+            name_index, width, data_offset = PoseBinaryFormat.CHANNEL_ENTRY.unpack_from(self.buffer, self.channel_table_offset + c * PoseBinaryFormat.CHANNEL_ENTRY.size)
+            self.check(name_index < self.string_count and data_offset + 8 * self.control_count * width <= size)
+            self.channel_entries.append((name_index, width, data_offset))
+        self.channels = None
+        
+        # Other table, version 1 files have none
+        self.other_entries = []
+        if self.version >= 2:
+            other_table_offset = self.channel_table_offset + self.channel_count * PoseBinaryFormat.CHANNEL_ENTRY.size
+            self.check(other_table_offset + PoseBinaryFormat.OTHER_COUNT.size <= size)
+            other_count = PoseBinaryFormat.OTHER_COUNT.unpack_from(self.buffer, other_table_offset)[0]
+            entries_start = other_table_offset + PoseBinaryFormat.OTHER_COUNT.size
+            self.check(entries_start + other_count * PoseBinaryFormat.OTHER_ENTRY.size <= size)
+            for o in range(other_count):
+                index, attribute_index, value_index = PoseBinaryFormat.OTHER_ENTRY.unpack_from(self.buffer, entries_start + o * PoseBinaryFormat.OTHER_ENTRY.size)
+                self.check(index < self.control_count and attribute_index < self.string_count and value_index < self.string_count)
+                self.other_entries.append((index, attribute_index, value_index))
+                
+    def check(self, condition):
+        if not condition:
+            raise ValueError(f"corrupt pose file: {self.pose_path}")
+            
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+            
+    @property
+    def pose_name(self) -> str:
+        return self.get_string(0)
+        
+    def get_string(self, index) -> str:
+        if index not in self.strings:
+            start = self.blob_start + self.string_offsets[index]
+            end = self.blob_start + self.string_offsets[index + 1]
+            try:
+                self.strings[index] = self.buffer[start:end].decode("utf-8")
+            except UnicodeDecodeError:
+                raise ValueError(f"corrupt pose file: {self.pose_path}")
+        return self.strings[index]
+        
+    def get_control_strings(self, control_index):
+        start = PoseBinaryFormat.CN_STRING_START + control_index * PoseBinaryFormat.CN_STRING_COUNT
+        return tuple(self.get_string(start + i) for i in range(PoseBinaryFormat.CN_STRING_COUNT))
+        
+    def get_channels(self) -> dict:
+        # Read the channel table, maps channel name -> (width, data offset)
+        if self.channels is None:
+            self.channels = {}
+            for name_index, width, data_offset in self.channel_entries:
+                self.channels[self.get_string(name_index)] = (width, data_offset)
+        return self.channels
+        
+    def get_channel(self, channel) -> array:
+        if channel not in self.channel_values:
+            width, data_offset = self.get_channels()[channel]
+            self.channel_values[channel] = self.read_array('d', data_offset, self.control_count * width)
+        return self.channel_values[channel]
+        
+    def read_array(self, typecode, offset, count) -> array:
+        values = array(typecode)
+        values.frombytes(self.buffer[offset:offset + values.itemsize * count])
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+        
+    def get_other_values(self) -> dict:
+        # Values that are not numbers, control index -> {attr -> value}. Version 1 files have none
+        other_values = {}
+        for index, attribute_index, value_index in self.other_entries:
+            other_values.setdefault(index, {})[self.get_string(attribute_index)] = self.get_string(value_index)
+        return other_values
+        
+    # Decode the whole pose, e.g. to apply it. Reads of the header or of single channels, e.g. by the
+    # library index or a PoseHandle, only decode what they need and skip the rest of the file
+    def to_pose_data(self) -> PoseData:
+        pose_data = PoseData()
+        
+        for n in range(self.control_count):
+            pose_data.add_control_node_strings(*self.get_control_strings(n))
+            
+        # Channels are copied into the pose's array as a whole, missing values stay NaN
+        for channel, (width, data_offset) in self.get_channels().items():
+            pose_data.set_channel(channel, width, self.get_channel(channel))
+            
+        for index, attributes in self.get_other_values().items():
+            for attribute, value in attributes.items():
+                pose_data.set_attribute(index, attribute, value)
+                
+        return pose_data
\ No newline at end of file
@@ -0,0 +1,147 @@
+import sys
+
+from collections import OrderedDict
+
+from pose_library_io_utility import PoseLibraryIOUtility
+from pose_library_binary_format import PoseBinaryFormat, MappedPoseFile
+from pose_library_data import PoseData
+
+class PoseHandle(object):
+    
+    # Lightweight stand-in for a PoseData. The name, path and thumbnail are available
+    # immediately, the control nodes are loaded through the PoseDataCache on first access.
+    # Binary poses stay memory-mapped once they are read, single channels are decoded from the map on demand.
+    #
+    # @param name - The pose's name
+    # @param pose_path - Path to the '.pose' file
+    # @param thumbnail_path - Path to the rig capture, empty if there is none
+    # @param control_count - Number of control nodes in the pose
+    # @param content_hash - Hash of the '.pose' file, a new hash invalidates the cached pose data
+    # @param thumbnail_mtime - st_mtime_ns of the rig capture, a new mtime invalidates the cached thumbnail
+    #
+    def __init__(self, name, pose_path, thumbnail_path="", control_count=0, content_hash="", thumbnail_mtime=0):
+        self.name = name
+        self.pose_path = pose_path
+        self.thumbnail_path = thumbnail_path
+        self.control_count = control_count
+        self.content_hash = content_hash
+        self.thumbnail_mtime = thumbnail_mtime
+        
+        self.mapped_pose = None
+        
+    @property
+    def pose_data(self) -> PoseData:
+        return PoseDataCache.get(self.pose_path, self.content_hash, self.load_pose_data)
+        
+    @property
+    def control_nodes(self):
+        return self.pose_data.control_nodes
+        
+    # Get the map of a binary pose, it is opened on first access and kept open until the handle is closed
+    #
+    # @return - The MappedPoseFile, None for text poses
+    #
+    def get_mapped_pose(self) -> MappedPoseFile:
+        if self.mapped_pose == None and PoseBinaryFormat.is_binary_pose_file(self.pose_path):
+            self.mapped_pose = MappedPoseFile(self.pose_path)
+        return self.mapped_pose
+        
+    # Get the values of one channel of every control node, only this channel is decoded from a binary pose
+    #
+    # @param channel - Name of the channel
+    # @return - (controls * width) values, control node by control node, missing values are NaN
+    #
+    def get_channel(self, channel):
+        mapped_pose = self.get_mapped_pose()
+        if mapped_pose != None:
+            return mapped_pose.get_channel(channel)
+            
+        pose_data = self.pose_data
+        column, width = pose_data.channels[channel]
+        values = []
+        for row_start in range(0, len(pose_data.values), pose_data.channel_count):
+            values.extend(pose_data.values[row_start+column:row_start+column+width])
+        return values
+        
+    def load_pose_data(self) -> PoseData:
+        mapped_pose = self.get_mapped_pose()
+        if mapped_pose != None:
+            return mapped_pose.to_pose_data()
+        return PoseLibraryIOUtility.load_pose_data(self.pose_path)
+        
+    # Close the map, the pose file can not be replaced on Windows while it is mapped
+    def close(self):
+        if self.mapped_pose != None:
+            self.mapped_pose.close()
+            self.mapped_pose = None
+        
+class PoseDataCache(object):
+    
+    DEFAULT_BYTE_BUDGET = 64 * 1024 * 1024
+    
+    byte_budget = DEFAULT_BYTE_BUDGET
+    byte_size = 0
+    entries = OrderedDict()
+    
+    hits = 0
+    misses = 0
+    
+    # @param loader - Function that loads the pose when it is not cached, the pose file is loaded by default
+    #
+    @classmethod
+    def get(cls, pose_path, content_hash="", loader=None) -> PoseData:
+        key = (pose_path, content_hash)
+        
+        # Move recently used poses to the end so they are evicted last
+        if key in cls.entries:
+            cls.hits += 1
+            cls.entries.move_to_end(key)
+            return cls.entries[key][0]
+            
+        cls.misses += 1
+        pose_data = loader() if loader else PoseLibraryIOUtility.load_pose_data(pose_path)
+        cls.add(key, pose_data)
+        return pose_data
+        
+    @classmethod
+    def add(cls, key, pose_data):
+        # Drop stale versions of the same pose file
+        for stale_key in [k for k in cls.entries if k[0] == key[0]]:
+            cls.remove(stale_key)
+            
+        size = cls.estimate_size(pose_data)
+        cls.entries[key] = (pose_data, size)
+        cls.byte_size += size
+        cls.evict()
+        
+    @classmethod
+    def remove(cls, key):
+        pose_data, size = cls.entries.pop(key)
+        cls.byte_size -= size
+        
+    @classmethod
+    def evict(cls):
+        # Evict the least recently used poses, always keeping the newest one
+        while cls.byte_size > cls.byte_budget and len(cls.entries) > 1:
+            cls.remove(next(iter(cls.entries)))
+            
+    @classmethod
+    def set_byte_budget(cls, byte_budget):
+        cls.byte_budget = byte_budget
+        cls.evict()
+        
+    @classmethod
+    def clear(cls):
+        cls.entries.clear()
+        cls.byte_size = 0
+        
+    @classmethod
+    def estimate_size(cls, pose_data) -> int:
+        # Interned strings are shared with other poses of the same rig and only counted by their references
+        size = sys.getsizeof(pose_data) + sys.getsizeof(pose_data.values) + sys.getsizeof(pose_data.channels)
+        size += sys.getsizeof(pose_data.uuids) + sys.getsizeof(pose_data.names) + sys.getsizeof(pose_data.full_paths)
+        
+        for attributes in pose_data.other_values.values():
+            size += sys.getsizeof(attributes) + sum(sys.getsizeof(value) for value in attributes.values())
+            
+        return size
\ No newline at end of file
@@ -0,0 +1,215 @@
+from PySide6 import QtCore
+from PySide6 import QtWidgets
+
+from pose_library_thumbnails import ThumbnailCache
+
+class PoseContentModel(QtCore.QAbstractListModel):
+    
+    PoseHandleRole = QtCore.Qt.UserRole + 1
+    
+    # List model of the poses in the selected folder. Thumbnails are only requested
+    # when the view asks for them, so only visible poses are ever decoded
+    #
+    # @param thumbnail_loader - ThumbnailLoader that decodes the rig captures
+    # @param thumbnail_scalar - Scale of the thumbnails shown in the grid
+    #
+    def __init__(self, thumbnail_loader, thumbnail_scalar, parent=None):
+        super(PoseContentModel, self).__init__(parent)
+        
+        self.thumbnail_loader = thumbnail_loader
+        self.thumbnail_scalar = thumbnail_scalar
+        self.thumbnail_loader.thumbnail_loaded.connect(self.update_thumbnail)
+        self.thumbnail_loader.thumbnail_written.connect(self.update_written_thumbnail)
+        
+        self.pose_names = []
+        self.poses = {}
+        self.rows = {}
+        
+        # Grid thumbnail of every pose, and the pose each thumbnail belongs to
+        self.thumbnail_paths = {}
+        self.thumbnail_poses = {}
+        
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.pose_names)
+        
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+            
+        pose_name = self.pose_names[index.row()]
+        pose_handle = self.poses[pose_name]
+        
+        if role == QtCore.Qt.DisplayRole:
+            return pose_handle.name
+        if role == QtCore.Qt.ToolTipRole:
+            return f"{pose_handle.name} ({pose_handle.control_count} controls)"
+        if role == QtCore.Qt.DecorationRole:
+            thumbnail_path = self.thumbnail_paths[pose_name]
+            return self.thumbnail_loader.request(thumbnail_path, pose_handle.thumbnail_mtime) if thumbnail_path else None
+        if role == self.PoseHandleRole:
+            return pose_handle
+        return None
+        
+    # Update the model to the given poses
+    #
+    # @param poses - Dict of pose name -> PoseHandle
+    # @param reset - Replace every pose, e.g. when another folder is selected. Otherwise only
+    #                the poses that were added, removed or changed are updated
+    #
+    def set_poses(self, poses, reset=False):
+        if reset:
+            self.beginResetModel()
+            self.pose_names = list(poses.keys())
+            self.poses = {}
+            self.thumbnail_paths = {}
+            self.thumbnail_poses = {}
+            thumbnail_paths = self.get_thumbnail_paths(poses.values())
+            for pose_name, pose_handle in poses.items():
+                self.add_pose(pose_name, pose_handle, thumbnail_paths)
+            self.endResetModel()
+            self.update_rows()
+            return
+            
+        # Remove poses from the back so the rows of the remaining poses stay valid
+        removed_rows = [self.rows[pose_name] for pose_name in self.pose_names if pose_name not in poses]
+        for row in reversed(removed_rows):
+            self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+            self.remove_pose(self.pose_names[row])
+            del self.pose_names[row]
+            self.endRemoveRows()
+        if removed_rows:
+            self.update_rows()
+            
+        # Find the poses that were saved or captured again and the new poses, their thumbnails are looked up together
+        changed_pose_names = [pose_name for pose_name, pose_handle in poses.items() if pose_name in self.poses
+                              and (pose_handle.content_hash != self.poses[pose_name].content_hash
+                                   or pose_handle.thumbnail_path != self.poses[pose_name].thumbnail_path
+                                   or pose_handle.thumbnail_mtime != self.poses[pose_name].thumbnail_mtime)]
+        new_pose_names = [pose_name for pose_name in poses if pose_name not in self.poses]
+        thumbnail_paths = self.get_thumbnail_paths([poses[pose_name] for pose_name in changed_pose_names + new_pose_names])
+        
+        # Unchanged poses use the library's new handles too, so closing the library's handles closes every map
+        for pose_name in self.poses:
+            if pose_name not in changed_pose_names:
+                self.poses[pose_name] = poses[pose_name]
+                
+        # Update poses that were saved again
+        for pose_name in changed_pose_names:
+            self.remove_pose(pose_name)
+            self.add_pose(pose_name, poses[pose_name], thumbnail_paths)
+            index = self.index(self.rows[pose_name])
+            self.dataChanged.emit(index, index)
+            
+        # Append new poses
+        if new_pose_names:
+            self.beginInsertRows(QtCore.QModelIndex(), len(self.pose_names), len(self.pose_names) + len(new_pose_names) - 1)
+            for pose_name in new_pose_names:
+                self.pose_names.append(pose_name)
+                self.add_pose(pose_name, poses[pose_name], thumbnail_paths)
+            self.endInsertRows()
+            self.update_rows()
+            
+    def get_thumbnail_paths(self, pose_handles) -> dict:
+        # Grid thumbnails of many poses, rig capture path -> thumbnail path
+        return ThumbnailCache.get_existing_thumbnail_paths([pose_handle.thumbnail_path for pose_handle in pose_handles if pose_handle.thumbnail_path],
+                                                           self.thumbnail_scalar)
+                                                           
+    def add_pose(self, pose_name, pose_handle, thumbnail_paths):
+        self.poses[pose_name] = pose_handle
+        
+        thumbnail_path = ""
+        if pose_handle.thumbnail_path:
+            thumbnail_path = thumbnail_paths[pose_handle.thumbnail_path]
+            self.thumbnail_poses[thumbnail_path] = pose_name
+        self.thumbnail_paths[pose_name] = thumbnail_path
+        
+    def remove_pose(self, pose_name):
+        del self.poses[pose_name]
+        self.thumbnail_poses.pop(self.thumbnail_paths.pop(pose_name), None)
+        
+    def update_rows(self):
+        self.rows = {pose_name: row for row, pose_name in enumerate(self.pose_names)}
+        
+    def update_thumbnail(self, thumbnail_path, pixmap):
+        # Only repaint the pose the loaded thumbnail belongs to
+        pose_name = self.thumbnail_poses.get(thumbnail_path)
+        if pose_name != None:
+            index = self.index(self.rows[pose_name])
+            self.dataChanged.emit(index, index, [QtCore.Qt.DecorationRole])
+            
+    # Switch a pose to the thumbnail the backfill wrote for its rig capture
+    #
+    # @param capture_path - The rig capture the thumbnails were written for
+    #
+    def update_written_thumbnail(self, capture_path):
+        thumbnail_path = ThumbnailCache.get_thumbnail_path(capture_path, self.thumbnail_scalar)
+        
+        # Poses without a thumbnail show their rig capture, outdated thumbnails were already shown
+        pose_name = self.thumbnail_poses.pop(capture_path, None) or self.thumbnail_poses.pop(thumbnail_path, None)
+        if pose_name == None:
+            return
+            
+        self.thumbnail_paths[pose_name] = thumbnail_path
+        self.thumbnail_poses[thumbnail_path] = pose_name
+        self.thumbnail_loader.discard(thumbnail_path)
+        
+        index = self.index(self.rows[pose_name])
+        self.dataChanged.emit(index, index, [QtCore.Qt.DecorationRole])
+            
+class PoseContentDelegate(QtWidgets.QStyledItemDelegate):
+    
+    LABEL_HEIGHT = 20
+    PADDING = 8
+    
+    # Paints a pose as its thumbnail with the pose name underneath
+    #
+    # @param thumbnail_width - Width of the thumbnails
+    # @param thumbnail_height - Height of the thumbnails
+    #
+    def __init__(self, thumbnail_width, thumbnail_height, parent=None):
+        super(PoseContentDelegate, self).__init__(parent)
+        
+        self.thumbnail_size = QtCore.QSize(int(thumbnail_width), int(thumbnail_height))
+        
+    def sizeHint(self, option, index):
+        return QtCore.QSize(self.thumbnail_size.width() + self.PADDING * 2, self.thumbnail_size.height() + self.LABEL_HEIGHT + self.PADDING * 2)
+        
+    def paint(self, painter, option, index):
+        painter.save()
+        
+        # Draw hover/selection background
+        if option.state & QtWidgets.QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        elif option.state & QtWidgets.QStyle.State_MouseOver:
+            painter.fillRect(option.rect, option.palette.midlight())
+            
+        # Draw thumbnail centered in its area
+        thumbnail_rect = QtCore.QRect(option.rect.x() + self.PADDING, option.rect.y() + self.PADDING, self.thumbnail_size.width(), self.thumbnail_size.height())
+        pixmap = index.data(QtCore.Qt.DecorationRole)
+        if pixmap:
+            pixmap_size = pixmap.size().scaled(self.thumbnail_size, QtCore.Qt.KeepAspectRatio)
+            pixmap_rect = QtCore.QRect(QtCore.QPoint(0, 0), pixmap_size)
+            pixmap_rect.moveCenter(thumbnail_rect.center())
+            painter.drawPixmap(pixmap_rect, pixmap)
+            
+        # Draw pose name
+        label_rect = QtCore.QRect(thumbnail_rect.x(), thumbnail_rect.bottom(), thumbnail_rect.width(), self.LABEL_HEIGHT)
+        label = option.fontMetrics.elidedText(index.data(QtCore.Qt.DisplayRole), QtCore.Qt.ElideRight, label_rect.width())
+        painter.setPen(option.palette.highlightedText().color() if option.state & QtWidgets.QStyle.State_Selected else option.palette.text().color())
+        painter.drawText(label_rect, QtCore.Qt.AlignCenter, label)
+        
+        painter.restore()
+        
+class PoseContentView(QtWidgets.QListView):
+    
+    # Icon mode list view that lays out the poses in a grid, only visible poses are painted
+    def __init__(self, parent=None):
+        super(PoseContentView, self).__init__(parent)
+        
+        self.setViewMode(QtWidgets.QListView.IconMode)
+        self.setResizeMode(QtWidgets.QListView.Adjust)
+        self.setMovement(QtWidgets.QListView.Static)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.setUniformItemSizes(True)
+        self.setMouseTracking(True)
+        self.setSpacing(4)
\ No newline at end of file
@@ -0,0 +1,64 @@
+import os
+
+class FolderScan(object):
+    
+    # Contents of one library folder, gathered with a single os.scandir
+    #
+    # @param folder_path - Path to the folder
+    # @param mtime - The folder's mtime in nanoseconds when it was scanned
+    #
+    def __init__(self, folder_path, mtime):
+        self.folder_path = folder_path
+        self.mtime = mtime
+        
+        # Child folder path -> inode, hidden folders such as thumbnail folders are skipped
+        self.folders = {}
+        
+        # Pose name -> path of its '.pose' file. Files are not stat'ed here, overwriting a pose
+        # keeps the folder's mtime, so their stats would go stale while the scan is reused
+        self.poses = {}
+        
+        # Rig capture name -> path of its '.png' file
+        self.thumbnails = {}
+        
+        # Rig capture name -> st_mtime_ns of its '.png' file, savers invalidate the folder after
+        # writing a capture so the scan is not reused with a stale mtime
+        self.thumbnail_mtimes = {}
+        
+class PoseLibraryCrawler(object):
+    
+    # Folder path -> FolderScan, reused while the folder's mtime is unchanged
+    folder_scans = {}
+    
+    @classmethod
+    def scan_folder(cls, folder_path) -> FolderScan:
+        # Adding, removing or renaming an entry changes the folder's mtime, so an
+        # unchanged mtime means the folder does not need to be listed again
+        mtime = os.stat(folder_path).st_mtime_ns
+        folder_scan = cls.folder_scans.get(folder_path)
+        if folder_scan != None and folder_scan.mtime == mtime:
+            return folder_scan
+            
+        folder_scan = FolderScan(folder_path, mtime)
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.name.startswith("."):
+                        folder_scan.folders[entry.path] = entry.inode()
+                elif entry.name.endswith(".pose"):
+                    folder_scan.poses[entry.name[:-len(".pose")]] = entry.path
+                elif entry.name.endswith(".png"):
+                    folder_scan.thumbnails[entry.name[:-len(".png")]] = entry.path
+                    folder_scan.thumbnail_mtimes[entry.name[:-len(".png")]] = entry.stat().st_mtime_ns
+                    
+        cls.folder_scans[folder_path] = folder_scan
+        return folder_scan
+        
+    @classmethod
+    def invalidate_folder(cls, folder_path):
+        # Folder mtimes can be coarse on some file systems, savers invalidate the folder themselves
+        cls.folder_scans.pop(folder_path, None)
+        
+    @classmethod
+    def clear(cls):
+        cls.folder_scans = {}
\ No newline at end of file
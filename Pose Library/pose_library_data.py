@@ -1,43 +1,202 @@
+import sys
+import math
+
+from array import array
+
 import maya.cmds as cmds
 
 from auto_rig_helpers import AutoRigHelpers
 
 class PoseData(object):
     
+    # Control node names and paths are kept in tables of interned strings, and the values of every
+    # channel in one contiguous (controls x channels) float array. Values a control node does not have are NaN
+    __slots__ = ("uuids", "names", "full_paths", "channels", "channel_count", "values", "other_values")
+    
     # Constructor that initializes the pose's data
     #
     # @param control_nodes - Contains a list of all the control nodes and its data
     #
     def __init__(self, control_nodes=None):
-        self.control_nodes = []
+        self.uuids = []
+        self.names = []
+        self.full_paths = []
+        
+        # Channel name -> (column, width)
+        self.channels = {}
+        self.channel_count = 0
+        self.values = array('d')
+        
+        # Values that are not numbers, control node index -> {attr -> value}
+        self.other_values = {}
+        
         # If no control nodes were given, return
         if control_nodes == None:
             return
             
-        for control_node in range(len(control_nodes)):
-            self.add_control_node(ControlNodeData(control_nodes[control_node]))
-            
+        # Capture the whole selection in one pass
+        node_values = AutoRigHelpers.get_keyable_attr_values(control_nodes)
+        for control_node in control_nodes:
+            if control_node in node_values:
+                name, full_path, attributes = node_values[control_node]
+                index = self.add_control_node_strings(control_node, name, full_path)
+                for attribute, value in attributes.items():
+                    self.set_attribute(index, attribute, value)
+                    
+    @property
+    def control_nodes(self) -> list:
+        return [ControlNodeData.create_view(self, index) for index in range(len(self.uuids))]
+        
+    @property
+    def control_count(self) -> int:
+        return len(self.uuids)
+        
     def add_control_node(self, control_node):
-        self.control_nodes.append(control_node)
+        # Copy the control node's row into this pose, the ControlNodeData becomes a view of it
+        source, row = control_node.pose_data, control_node.index
+        index = self.add_control_node_strings(source.uuids[row], source.names[row], source.full_paths[row])
+        
+        row_start = row * source.channel_count
+        for channel, (column, width) in source.channels.items():
+            self.set_channel_values(index, channel, source.values[row_start+column:row_start+column+width])
+        for attribute, value in source.other_values.get(row, {}).items():
+            self.set_attribute(index, attribute, value)
+            
+        control_node.pose_data = self
+        control_node.index = index
+        
+    def add_control_node_strings(self, uuid, name, full_path) -> int:
+        # The same control nodes appear in many poses, interning shares their strings
+        self.uuids.append(sys.intern(uuid))
+        self.names.append(sys.intern(name))
+        self.full_paths.append(sys.intern(full_path))
+        
+        self.values.extend(array('d', [math.nan]) * self.channel_count)
+        return len(self.uuids) - 1
+        
+    def add_channel(self, channel, width):
+        # Widen every row, the existing columns keep their values
+        old_count = self.channel_count
+        self.channel_count += width
+        values = array('d', [math.nan]) * (len(self.uuids) * self.channel_count)
+        for column in range(old_count):
+            values[column::self.channel_count] = self.values[column::old_count]
+            
+        self.channels[sys.intern(channel)] = (old_count, width)
+        self.values = values
+        
+    # Set a channel of every control node at once
+    #
+    # @param channel - Name of the channel
+    # @param width - Number of values per control node
+    # @param channel_values - (controls * width) values, control node by control node
+    #
+    def set_channel(self, channel, width, channel_values):
+        if channel not in self.channels:
+            self.add_channel(channel, width)
+            
+        column, width = self.channels[channel]
+        for c in range(width):
+            self.values[column+c::self.channel_count] = channel_values[c::width]
+            
+    def set_channel_values(self, index, channel, values):
+        if channel not in self.channels:
+            self.add_channel(channel, len(values))
+            
+        # Values beyond the channel's width are dropped, missing ones stay NaN
+        column, width = self.channels[channel]
+        start = index * self.channel_count + column
+        count = min(width, len(values))
+        self.values[start:start+count] = array('d', values[:count])
+        
+    def set_attribute(self, index, attribute, value):
+        if isinstance(value, (tuple, list)):
+            self.set_channel_values(index, attribute, [float(v) for v in value])
+        elif isinstance(value, (int, float)):
+            self.set_channel_values(index, attribute, [float(value)])
+        else:
+            self.other_values.setdefault(index, {})[attribute] = value
+            
+    def get_attributes(self, index) -> dict:
+        attributes = {}
+        
+        # Skip channels that this control node does not have
+        row_start = index * self.channel_count
+        for channel, (column, width) in self.channels.items():
+            values = self.values[row_start+column:row_start+column+width]
+            if any(math.isnan(value) for value in values):
+                continue
+            attributes[channel] = tuple(values) if width > 1 else values[0]
+            
+        attributes.update(self.other_values.get(index, {}))
+        return attributes
         
 class ControlNodeData(object):
     
-    # Constructor that is used to initialize the control node's data
+    # Light view of one control node of a PoseData
+    __slots__ = ("pose_data", "index")
+    
+    # Constructor that is used to initialize the control node's data. The control node is stored in
+    # its own PoseData until it is added to a pose
     #
     # @param control_node_uuid - The control node's UUID
-    def __init__(self, control_node_uuid=None):
-        self.attributes = {}
+    # @param name - The control node's short name
+    # @param full_path - The control node's full path
+    # @param attributes - Dict of attr -> value, the control node's keyable attributes are captured when not given
+    #
+    def __init__(self, control_node_uuid=None, name=None, full_path=None, attributes=None):
+        self.pose_data = PoseData()
+        self.index = self.pose_data.add_control_node_strings(control_node_uuid or "", name or "", full_path or "")
         
         # If no control node was given, return
         if control_node_uuid == None:
             return
+            
+        # Capture the control node when PoseData did not capture it with the rest of the selection
+        if attributes == None:
+            name, full_path, attributes = AutoRigHelpers.get_keyable_attr_values([control_node_uuid])[control_node_uuid]
+            self.name = name
+            self.full_path = full_path
+            
+        for attribute, value in attributes.items():
+            self.add_attribute(attribute, value)
+            
+    @classmethod
+    def create_view(cls, pose_data, index):
+        control_node = cls.__new__(cls)
+        control_node.pose_data = pose_data
+        control_node.index = index
+        return control_node
+        
+    @property
+    def uuid(self) -> str:
+        return self.pose_data.uuids[self.index]
+        
+    @uuid.setter
+    def uuid(self, uuid):
+        self.pose_data.uuids[self.index] = sys.intern(uuid)
+        
+    @property
+    def name(self) -> str:
+        return self.pose_data.names[self.index]
+        
+    @name.setter
+    def name(self, name):
+        self.pose_data.names[self.index] = sys.intern(name)
+        
+    @property
+    def full_path(self) -> str:
+        return self.pose_data.full_paths[self.index]
+        
+    @full_path.setter
+    def full_path(self, full_path):
+        self.pose_data.full_paths[self.index] = sys.intern(full_path)
         
-        self.uuid = control_node_uuid
-        self.name = AutoRigHelpers.uuid_to_name(self.uuid)
-        self.full_path = AutoRigHelpers.uuid_to_full_path(self.uuid)
+    # Dict of attr -> value built from the pose's arrays. Changing the dict does not change the pose,
+    # use add_attribute instead
+    @property
+    def attributes(self) -> dict:
+        return self.pose_data.get_attributes(self.index)
         
-        self.attributes["translate"] = AutoRigHelpers.get_attr(self.full_path, "translate")[0]
-        self.attributes["rotate"] = AutoRigHelpers.get_attr(self.full_path, "rotate")[0]
-        self.attributes["scale"] = AutoRigHelpers.get_attr(self.full_path, "scale")[0]
     def add_attribute(self, attribute, value):
-        self.attributes[attribute] = value
\ No newline at end of file
+        self.pose_data.set_attribute(self.index, attribute, value)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import os
+
+class FolderNode(object):
+    
+    # A folder of the pose library. The id stays the same when the folder or one of its
+    # parents is renamed, so it is what the hierarchy items and the selection refer to
+    #
+    # @param folder_id - Unique id of the folder
+    # @param folder_path - Path to the folder
+    # @param inode - The folder's inode, used to recognize renamed folders
+    # @param parent - The parent FolderNode, None for the library's root folder
+    #
+    def __init__(self, folder_id, folder_path, inode=0, parent=None):
+        self.id = folder_id
+        self.path = folder_path
+        self.inode = inode
+        self.parent = parent
+        
+        # Child folder path -> FolderNode
+        self.children = {}
+        
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+        
+    def get_descendants(self) -> list:
+        # The folder itself and every folder below it, parents before their children
+        descendants = [self]
+        index = 0
+        while index < len(descendants):
+            descendants.extend(descendants[index].children.values())
+            index += 1
+        return descendants
+        
+class PoseLibraryFolders(object):
+    
+    root = None
+    
+    # Folder id -> FolderNode and folder path -> FolderNode
+    nodes = {}
+    paths = {}
+    
+    next_id = 1
+    
+    @classmethod
+    def clear(cls):
+        cls.root = None
+        cls.nodes = {}
+        cls.paths = {}
+        
+    @classmethod
+    def set_root_folder(cls, root_path) -> FolderNode:
+        cls.clear()
+        cls.root = cls.add_folder(root_path)
+        return cls.root
+        
+    @classmethod
+    def add_folder(cls, folder_path, inode=None, parent=None) -> FolderNode:
+        if inode == None:
+            inode = os.stat(folder_path).st_ino
+            
+        folder_node = FolderNode(cls.next_id, folder_path, inode, parent)
+        cls.next_id += 1
+        
+        cls.nodes[folder_node.id] = folder_node
+        cls.paths[folder_path] = folder_node
+        if parent != None:
+            parent.children[folder_path] = folder_node
+        return folder_node
+        
+    @classmethod
+    def remove_folder(cls, folder_node):
+        for descendant in folder_node.get_descendants():
+            cls.nodes.pop(descendant.id, None)
+            if cls.paths.get(descendant.path) is descendant:
+                del cls.paths[descendant.path]
+                
+        if folder_node.parent != None:
+            folder_node.parent.children.pop(folder_node.path, None)
+            
+    @classmethod
+    def move_folder(cls, folder_node, new_path):
+        old_path = folder_node.path
+        if folder_node.parent != None:
+            folder_node.parent.children.pop(old_path, None)
+            folder_node.parent.children[new_path] = folder_node
+            
+        # Descendants keep their ids, only their paths change
+        for descendant in folder_node.get_descendants():
+            if cls.paths.get(descendant.path) is descendant:
+                del cls.paths[descendant.path]
+            descendant.path = new_path + descendant.path[len(old_path):]
+            cls.paths[descendant.path] = descendant
+            
+        for descendant in folder_node.get_descendants():
+            descendant.children = {child.path: child for child in descendant.children.values()}
+            
+    @classmethod
+    def get_folder(cls, folder_id) -> FolderNode:
+        return cls.nodes.get(folder_id)
+        
+    @classmethod
+    def get_folder_at_path(cls, folder_path) -> FolderNode:
+        return cls.paths.get(folder_path)
\ No newline at end of file
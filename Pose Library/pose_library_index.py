@@ -0,0 +1,183 @@
+import os
+import json
+import hashlib
+
+import maya.api.OpenMaya as om2
+
+from pose_library_io_utility import PoseLibraryIOUtility
+from pose_library_binary_format import PoseBinaryFormat
+from pose_library_binary_format import MappedPoseFile
+from pose_library_crawler import PoseLibraryCrawler
+
+class PoseLibraryIndex(object):
+    
+    INDEX_FILE_NAME = ".pose_index.json"
+    INDEX_VERSION = 2
+    
+    HASH_CHUNK_SIZE = 1 << 20
+    
+    root_path = ""
+    entries = {}
+    dirty = False
+    
+    # Entries are keyed by the pose path relative to the library root and hold
+    #
+    #   path            - pose path relative to the library root, same as the key
+    #   mtime, size     - stat of the '.pose' file when the entry was made
+    #   name            - pose name
+    #   control_count   - number of control nodes in the pose
+    #   thumbnail       - rig capture path relative to the library root, empty if there is none
+    #   thumbnail_mtime - st_mtime_ns of the rig capture, 0 if there is none
+    #   hash            - sha1 of the '.pose' file contents
+    #   invalid         - the '.pose' file could not be read, e.g. it is still being copied. Only
+    #                     path, mtime and size are set, the file is read again once its stat changes
+    #
+    @classmethod
+    def load(cls, root_path=None):
+        if root_path == None:
+            root_path = PoseLibraryIOUtility.root_folder_path
+            
+        cls.root_path = root_path
+        cls.entries = {}
+        cls.dirty = False
+        
+        # Start with an empty index if it is missing, unreadable or from another version
+        try:
+            with open(cls.get_index_path(), 'r') as index_file:
+                index = json.load(index_file)
+            if index.get("version") == cls.INDEX_VERSION:
+                cls.entries = index.get("poses", {})
+        except (OSError, ValueError):
+            pass
+            
+    @classmethod
+    def save(cls):
+        if not cls.dirty:
+            return
+            
+        # Write to a temporary file and swap it in so a crash never leaves a half written index
+        index_path = cls.get_index_path()
+        temp_path = index_path + ".tmp"
+        with open(temp_path, 'w') as index_file:
+            json.dump({"version": cls.INDEX_VERSION, "poses": cls.entries}, index_file, separators=(",", ":"))
+        os.replace(temp_path, index_path)
+        
+        cls.dirty = False
+        
+    @classmethod
+    def get_index_path(cls) -> str:
+        return os.path.join(cls.root_path, cls.INDEX_FILE_NAME)
+        
+    @classmethod
+    def ensure_loaded(cls):
+        # Reload the index if the library root has changed, e.g. a new workspace was set
+        if cls.root_path != PoseLibraryIOUtility.root_folder_path:
+            cls.load()
+            
+    @classmethod
+    def get_poses_at_path(cls, folder_path) -> dict:
+        cls.ensure_loaded()
+        
+        poses = {}
+        seen = set()
+        
+        folder_scan = PoseLibraryCrawler.scan_folder(folder_path)
+        for pose_name, pose_path in folder_scan.poses.items():
+            # The scan only lists the folder, stat the pose so poses overwritten in place are read again
+            try:
+                stat = os.stat(pose_path)
+            except FileNotFoundError:
+                continue
+                
+            key = cls.get_key(pose_path)
+            seen.add(key)
+            
+            # Only re-read poses whose stat changed since they were indexed
+            entry = cls.entries.get(key)
+            if entry == None or entry["mtime"] != stat.st_mtime or entry["size"] != stat.st_size:
+                entry = cls.create_entry(pose_path, stat)
+                cls.entries[key] = entry
+                cls.dirty = True
+                
+            if entry.get("invalid"):
+                continue
+                
+            # Rig captures can be added or removed without the pose changing
+            thumbnail_path = folder_scan.thumbnails.get(pose_name, "")
+            thumbnail = cls.get_key(thumbnail_path) if thumbnail_path else ""
+            thumbnail_mtime = folder_scan.thumbnail_mtimes.get(pose_name, 0)
+            if entry["thumbnail"] != thumbnail or entry.get("thumbnail_mtime") != thumbnail_mtime:
+                entry["thumbnail"] = thumbnail
+                entry["thumbnail_mtime"] = thumbnail_mtime
+                cls.dirty = True
+                
+            poses[entry["name"]] = entry
+            
+        # Forget poses that were removed from this folder
+        folder_key = cls.get_key(folder_path)
+        for key in list(cls.entries.keys()):
+            if os.path.dirname(key) == folder_key and key not in seen:
+                del cls.entries[key]
+                cls.dirty = True
+                
+        cls.save()
+        return poses
+        
+    @classmethod
+    def create_entry(cls, pose_path, stat) -> dict:
+        pose_name = os.path.splitext(os.path.basename(pose_path))[0]
+        
+        # Binary poses only need their header read, text poses have to be parsed
+        try:
+            if PoseBinaryFormat.is_binary_pose_file(pose_path):
+                with MappedPoseFile(pose_path) as mapped_pose:
+                    control_count = mapped_pose.control_count
+            else:
+                with open(pose_path, 'r') as pose_file:
+                    control_count = sum(1 for control_node_data in PoseLibraryIOUtility.read_text_control_nodes(pose_file))
+            file_hash = cls.hash_file(pose_path)
+        except (OSError, ValueError) as error:
+            # A bad pose must not stop the rest of the folder from browsing
+            om2.MGlobal.displayWarning(f"Skipping pose {pose_path}: {error}")
+            return {
+                "path": cls.get_key(pose_path),
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "invalid": True
+            }
+            
+        return {
+            "path": cls.get_key(pose_path),
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "name": pose_name,
+            "control_count": control_count,
+            "thumbnail": "",
+            "thumbnail_mtime": 0,
+            "hash": file_hash
+        }
+        
+    @classmethod
+    def hash_file(cls, file_path) -> str:
+        file_hash = hashlib.sha1()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(cls.HASH_CHUNK_SIZE), b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+        
+    @classmethod
+    def get_key(cls, path) -> str:
+        key = os.path.relpath(path, cls.root_path).replace(os.sep, "/")
+        return "" if key == "." else key
+        
+    @classmethod
+    def get_path(cls, key) -> str:
+        return os.path.join(cls.root_path, *key.split("/"))
+        
+    @classmethod
+    def get_pose_path(cls, entry) -> str:
+        return cls.get_path(entry["path"])
+        
+    @classmethod
+    def get_thumbnail_path(cls, entry) -> str:
+        return cls.get_path(entry["thumbnail"]) if entry["thumbnail"] else ""
\ No newline at end of file
@@ -6,18 +6,19 @@ import maya.cmds as cmds
 from pose_library_data import PoseData
 from pose_library_data import ControlNodeData
 
+from pose_library_binary_format import PoseBinaryFormat
+from pose_library_crawler import PoseLibraryCrawler
+from pose_library_folders import PoseLibraryFolders
+
 class PoseLibraryIOUtility(object):
 
-    CN_START = 1
-    CN_ATTR_START = 5
-    CN_ATTR_COUNT = 3
-    CN_ATTR_INC = 7
+    # Properties of a control node that are not attributes
+    CN_PROPERTIES = ["uuid", "name", "full_path"]
 
     RIG_CAPTURE_WIDTH = 500
     RIG_CAPTURE_HEIGHT = 400
 
     root_folder_path = ""
-    folders = {}
     
     @classmethod
     def create_static_folders(cls):
@@ -33,9 +34,22 @@ class PoseLibraryIOUtility(object):
         os.makedirs(folder_path, exist_ok=exists_ok)    
         
     @classmethod
-    def save_pose_data(cls, pose_data : PoseData, save_path, pose_name):
+    def save_pose_data(cls, pose_data : PoseData, save_path, pose_name, binary=True):
         pose_file_path = os.path.join(save_path, f"{pose_name}.pose")
         
+        # Write next to the pose file, then swap it in, so a failed save can not leave a truncated pose
+        temp_path = pose_file_path + ".tmp"
+        if binary:
+            PoseBinaryFormat.write_pose_data(pose_data, temp_path, pose_name)
+        else:
+            cls.save_text_pose_data(pose_data, temp_path, pose_name)
+        os.replace(temp_path, pose_file_path)
+        
+        # Folder mtimes can be coarse on some file systems, scan it again next time
+        PoseLibraryCrawler.invalidate_folder(save_path)
+            
+    @classmethod
+    def save_text_pose_data(cls, pose_data : PoseData, pose_file_path, pose_name):
         with open(pose_file_path, 'w') as pose_file:
             # Write pose name to file
             cls.write_line_to_file(pose_file, "pose_name", pose_name)
@@ -55,33 +69,79 @@ class PoseLibraryIOUtility(object):
             
     @classmethod
     def load_pose_data(cls, pose_path):
+        # Binary pose files are memory-mapped, older text pose files are still readable
+        if PoseBinaryFormat.is_binary_pose_file(pose_path):
+            return PoseBinaryFormat.read_pose_data(pose_path)
+        return cls.load_text_pose_data(pose_path)
+        
+    @classmethod
+    def load_text_pose_data(cls, pose_path):
         # Create Pose Data
         pose_data = PoseData()
         
-        # Read lines in PoseData
+        # Read the control nodes one record at a time
         with open(pose_path, 'r') as pose_file:
-            lines = pose_file.readlines()
-            
-        # Read poses name
-        pose_name = cls.read_value_from_property(lines[0])
+            for control_node_data in cls.read_text_control_nodes(pose_file):
+                pose_data.add_control_node(control_node_data)
+                
+        return pose_data
         
-        # Iterate through all control nodes
-        for n in range(cls.CN_START, len(lines), cls.CN_ATTR_INC):
-            # Create Control Node Data
-            control_node_data = ControlNodeData()
-            pose_data.add_control_node(control_node_data)
+    # Stream the control nodes of a text pose file. Every control node is a block of
+    # 'property: value' lines that starts with its uuid, any number of attributes may follow
+    #
+    # @param pose_file - The open text pose file
+    # @return - Generator that yields one ControlNodeData per block
+    #
+    @classmethod
+    def read_text_control_nodes(cls, pose_file):
+        control_node_data = None
+        
+        for line in pose_file:
+            property, separator, value = line.rstrip("\n").partition(": ")
             
-            # Read control node properties
-            control_node_data.uuid = cls.read_value_from_property(lines[n+1])
-            control_node_data.name = cls.read_value_from_property(lines[n+2])
-            control_node_data.full_path = cls.read_value_from_property(lines[n+3])
+            # A blank line ends the current block
+            if not separator:
+                if control_node_data != None:
+                    yield control_node_data
+                    control_node_data = None
+                continue
+                
+            if property == "pose_name":
+                continue
+                
+            # A uuid always starts a new block, even without a blank line in between
+            if property == "uuid" and control_node_data != None:
+                yield control_node_data
+                control_node_data = None
+            if control_node_data == None:
+                control_node_data = ControlNodeData()
+                
+            if property in cls.CN_PROPERTIES:
+                setattr(control_node_data, property, value.strip())
+            else:
+                control_node_data.add_attribute(property, cls.parse_value(value))
+                
+        if control_node_data != None:
+            yield control_node_data
+            
+    @classmethod
+    def read_text_pose_name(cls, pose_path):
+        with open(pose_path, 'r') as pose_file:
+            return cls.read_value_from_property(pose_file.readline())
             
-            # Read control node attributes
-            for attr_num in range(cls.CN_ATTR_COUNT):
-                line = lines[cls.CN_ATTR_START+attr_num]
-                control_node_data.add_attribute(cls.read_property(line), cls.read_value_from_property(line))
+    @classmethod
+    def parse_value(cls, value):
+        value = value.strip()
         
-        return pose_data
+        # Numeric tuples such as '(0.0, 1.5, 0.0)' are parsed straight to floats
+        try:
+            if value.startswith("(") or value.startswith("["):
+                return tuple(float(v) for v in value[1:-1].split(",") if v.strip())
+            if value in ("True", "False"):
+                return float(value == "True")
+            return float(value)
+        except ValueError:
+            return value
             
     @classmethod
     def read_value_from_property(cls, line):
@@ -96,43 +156,56 @@ class PoseLibraryIOUtility(object):
         file.write(f"{property}: {value}\n")
     
     @classmethod
-    def get_poses_at_path(cls, folder_path):
-        poses = {}
-        
-        # Get items at folder path
-        items = os.listdir(folder_path)
+    def convert_library_to_binary(cls, root_path=None) -> int:
+        converted = 0
         
-        for item in items:
-            # Get pose path
-            pose_path = os.path.join(folder_path, item)
+        # Default to the whole pose library
+        if root_path == None:
+            root_path = cls.root_folder_path
             
-            # Check if item is a ".pose" file
-            if os.path.isfile(pose_path) and item.endswith(".pose"):
-                pose_data = cls.load_pose_data(pose_path)
-                poses[item.split(".pose")[0]] = pose_data
-        return poses
+        for folder_path, folder_names, file_names in os.walk(root_path):
+            for file_name in file_names:
+                pose_path = os.path.join(folder_path, file_name)
+                if not file_name.endswith(".pose") or PoseBinaryFormat.is_binary_pose_file(pose_path):
+                    continue
+                    
+                # Write the binary pose next to the text pose, then swap it in
+                pose_data = cls.load_text_pose_data(pose_path)
+                pose_name = cls.read_text_pose_name(pose_path)
+                temp_path = pose_path + ".tmp"
+                PoseBinaryFormat.write_pose_data(pose_data, temp_path, pose_name)
+                os.replace(temp_path, pose_path)
+                converted += 1
+                
+        return converted
         
     @classmethod
-    def load_folders_to_hierarchy(cls, pose_library_window, hierarchy_parent, root_path, reset_folders):
-        if reset_folders:
-            cls.folders = {}
-            cls.folders[os.path.basename(root_path)] = root_path
-        
-        items = os.listdir(root_path)
+    def get_poses_at_path(cls, folder_path):
+        poses = {}
         
-        for item in items:
-            # Check if item is a directory
-            folder_path = os.path.join(root_path, item)
-            if os.path.isdir(folder_path):
-                # Save folder name and folder path to dictionary
-                cls.folders[item] = folder_path
-                
-                folder_hierarchy_item = pose_library_window.create_hierarchy_item(item)
-                pose_library_window.add_to_hierarchy(hierarchy_parent, folder_hierarchy_item)
-                
-                # Recursively call function on this folder
-                cls.load_folders_to_hierarchy(pose_library_window, folder_hierarchy_item, folder_path, False)
+        # Get poses at folder path
+        for pose_name, pose_path in PoseLibraryCrawler.scan_folder(folder_path).poses.items():
+            poses[pose_name] = cls.load_pose_data(pose_path)
+        return poses
         
+    # Add the folders below a folder to the hierarchy and the folder registry
+    #
+    # @param pose_library_window - The PoseLibraryWindow the hierarchy belongs to
+    # @param hierarchy_parent - The hierarchy item of the parent folder
+    # @param parent_folder - The parent folder's FolderNode
+    #
+    @classmethod
+    def load_folders_to_hierarchy(cls, pose_library_window, hierarchy_parent, parent_folder):
+        # Folders are listed in one pass and only listed again once they changed
+        for folder_path, inode in PoseLibraryCrawler.scan_folder(parent_folder.path).folders.items():
+            folder_node = PoseLibraryFolders.add_folder(folder_path, inode, parent_folder)
+            
+            folder_hierarchy_item = pose_library_window.create_hierarchy_item(folder_node.name, folder_node=folder_node)
+            pose_library_window.add_to_hierarchy(hierarchy_parent, folder_hierarchy_item)
+            
+            # Recursively call function on this folder
+            cls.load_folders_to_hierarchy(pose_library_window, folder_hierarchy_item, folder_node)
+            
     @classmethod
     def capture_rig_image(cls, rig_capture_path, capture_width=RIG_CAPTURE_HEIGHT, capture_height=RIG_CAPTURE_HEIGHT):
         # Capture image of rig
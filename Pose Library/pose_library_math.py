@@ -0,0 +1,274 @@
+import numpy as np
+
+from auto_rig_helpers import AutoRigHelpers
+
+from pose_library_apply import PoseApplyEngine
+
+class PoseLayout(object):
+    
+    # Maps control nodes and attributes to the rows and columns of a (controls x channels) pose array.
+    # Every attribute takes one column per value, e.g. translate takes three
+    #
+    # @param controls - List of control node full paths, one per row
+    # @param attributes - List of (attribute, width) pairs
+    #
+    def __init__(self, controls, attributes):
+        self.controls = list(controls)
+        self.attributes = list(attributes)
+        
+        self.rows = {control: row for row, control in enumerate(self.controls)}
+        self.columns = {}
+        column = 0
+        for attr, width in self.attributes:
+            self.columns[attr] = (column, width)
+            column += width
+        self.channel_count = column
+        
+    @property
+    def shape(self):
+        return (len(self.controls), self.channel_count)
+        
+    @classmethod
+    def from_poses(cls, pose_datas):
+        return cls.from_pose_plugs([PoseApplyEngine.get_pose_plugs(pose_data) for pose_data in pose_datas])
+        
+    # @param pose_plugs_list - List of the ("node.attr", values) pairs of every pose
+    #
+    @classmethod
+    def from_pose_plugs(cls, pose_plugs_list):
+        controls = {}
+        attributes = {}
+        
+        # Union of every control node and attribute in the poses, in the order they first appear
+        for pose_plugs in pose_plugs_list:
+            for plug, values in pose_plugs:
+                control, attr = plug.rsplit(".", 1)
+                controls.setdefault(control, None)
+                attributes.setdefault(attr, len(values))
+                
+        return cls(controls.keys(), attributes.items())
+        
+class PoseMath(object):
+    
+    # Channels that flip sign when a pose is mirrored across the YZ plane
+    MIRROR_CHANNEL_SIGNS = {
+        ("translate", 0): -1.0,
+        ("rotate", 1): -1.0,
+        ("rotate", 2): -1.0
+    }
+    
+    MIRROR_SIDES = [("L_", "R_"), ("left", "right"), ("Left", "Right")]
+    
+    @classmethod
+    def pose_to_array(cls, pose_data, layout : PoseLayout) -> np.ndarray:
+        return cls.pose_plugs_to_array(PoseApplyEngine.get_pose_plugs(pose_data), layout)
+        
+    @classmethod
+    def pose_plugs_to_array(cls, pose_plugs, layout : PoseLayout) -> np.ndarray:
+        # Channels the pose does not have are NaN
+        values = np.full(layout.shape, np.nan)
+        
+        for plug, plug_values in pose_plugs:
+            control, attr = plug.rsplit(".", 1)
+            if control in layout.rows and attr in layout.columns:
+                column, width = layout.columns[attr]
+                values[layout.rows[control], column:column+width] = plug_values[:width]
+                
+        return values
+        
+    @classmethod
+    def rig_to_array(cls, layout : PoseLayout) -> np.ndarray:
+        values = np.full(layout.shape, np.nan)
+        
+        # Read every plug of the layout from the rig in one pass
+        plugs = [f"{control}.{attr}" for control in layout.controls for attr, width in layout.attributes]
+        plug_values = AutoRigHelpers.get_plug_values(plugs)
+        
+        for control in layout.controls:
+            row = layout.rows[control]
+            for attr, (column, width) in layout.columns.items():
+                current = plug_values[f"{control}.{attr}"]
+                if current and len(current) == width:
+                    values[row, column:column+width] = current
+                    
+        return values
+        
+    @classmethod
+    def array_to_plugs(cls, values, layout : PoseLayout) -> list:
+        pose_plugs = []
+        
+        # Attributes with any missing channel are left untouched
+        valid = ~np.isnan(values)
+        for control in layout.controls:
+            row = layout.rows[control]
+            for attr, (column, width) in layout.columns.items():
+                if valid[row, column:column+width].all():
+                    pose_plugs.append((f"{control}.{attr}", tuple(values[row, column:column+width].tolist())))
+                    
+        return pose_plugs
+        
+    @classmethod
+    def lerp(cls, base, targets, weights, mask=None) -> np.ndarray:
+        # base + sum(weight * (target - base)), channels missing from a target keep the base value
+        result = base.copy()
+        for target, weight in zip(targets, weights):
+            delta = target - base
+            result += weight * np.where(np.isnan(delta), 0.0, delta)
+            
+        return cls.apply_mask(base, result, mask)
+        
+    @classmethod
+    def add_offset(cls, base, offset, weight=1.0, mask=None) -> np.ndarray:
+        result = base + weight * np.where(np.isnan(offset), 0.0, offset)
+        return cls.apply_mask(base, result, mask)
+        
+    @classmethod
+    def get_offset(cls, pose, reference) -> np.ndarray:
+        # Additive offset that takes the reference pose to the pose
+        return pose - reference
+        
+    @classmethod
+    def apply_mask(cls, base, result, mask=None) -> np.ndarray:
+        if mask is None:
+            return result
+            
+        # A (controls,) mask selects whole control nodes, a (controls x channels) mask selects single channels
+        if mask.ndim == 1:
+            mask = mask[:, np.newaxis]
+        return np.where(mask, result, base)
+        
+    @classmethod
+    def get_mask(cls, layout : PoseLayout, controls=None, attributes=None) -> np.ndarray:
+        # Mask of the given control nodes (matched by full path or short name) and attributes, None selects all
+        mask = np.zeros(layout.shape, dtype=bool)
+        
+        rows = [row for control, row in layout.rows.items() if controls is None or control in controls or control.split("|")[-1] in controls]
+        columns = []
+        for attr, (column, width) in layout.columns.items():
+            if attributes is None or attr in attributes:
+                columns.extend(range(column, column+width))
+                
+        mask[np.ix_(rows, columns)] = True
+        return mask
+        
+    @classmethod
+    def mirror(cls, values, layout : PoseLayout) -> np.ndarray:
+        # Swap the values of left/right control nodes and flip the mirrored channels
+        signs = np.ones(layout.channel_count)
+        for (attr, index), sign in cls.MIRROR_CHANNEL_SIGNS.items():
+            if attr in layout.columns and index < layout.columns[attr][1]:
+                signs[layout.columns[attr][0] + index] = sign
+                
+        return values[cls.get_mirror_rows(layout)] * signs
+        
+    @classmethod
+    def get_mirror_rows(cls, layout : PoseLayout) -> np.ndarray:
+        # Row of each control node's opposite side, control nodes without one map to themselves
+        mirror_rows = np.arange(len(layout.controls))
+        
+        for control, row in layout.rows.items():
+            for left, right in cls.MIRROR_SIDES:
+                if left in control:
+                    opposite = control.replace(left, right)
+                elif right in control:
+                    opposite = control.replace(right, left)
+                else:
+                    continue
+                    
+                if opposite in layout.rows:
+                    mirror_rows[row] = layout.rows[opposite]
+                break
+                
+        return mirror_rows
+        
+class PoseBlend(object):
+    
+    # Blends the rig from its state when the blend was started towards one or more poses.
+    # The rig state and poses are converted to arrays once, so evaluating a weight is only array math
+    #
+    # @param pose_datas - List of the poses to blend towards
+    # @param mask - Optional (controls,) or (controls x channels) mask of the channels to blend
+    #
+    def __init__(self, pose_datas, mask=None):
+        self.pose_datas = list(pose_datas)
+        
+        # Resolve the poses' control nodes once for both the layout and the arrays
+        pose_plugs_list = [PoseApplyEngine.get_pose_plugs(pose_data) for pose_data in self.pose_datas]
+        self.layout = PoseLayout.from_pose_plugs(pose_plugs_list)
+        self.targets = [PoseMath.pose_plugs_to_array(pose_plugs, self.layout) for pose_plugs in pose_plugs_list]
+        self.mask = mask
+        
+        # Channels the rig could not be read for blend from the pose's value, so they are not left out
+        base = PoseMath.rig_to_array(self.layout)
+        filled_base = base
+        for target in self.targets:
+            filled_base = np.where(np.isnan(filled_base), target, filled_base)
+        self.base = PoseMath.apply_mask(base, filled_base, mask)
+        
+        # Settable states of the layout's plugs and (row, column, MPlug) of every settable channel,
+        # looked up once the first time they are needed
+        self.plug_states = None
+        self.scrub_plugs = None
+        self.scrubbed = False
+        
+    def evaluate(self, weights) -> list:
+        return PoseMath.array_to_plugs(self.evaluate_array(weights), self.layout)
+        
+    def evaluate_array(self, weights) -> np.ndarray:
+        return PoseMath.lerp(self.base, self.targets, self.get_weights(weights), self.mask)
+        
+    def get_weights(self, weights) -> list:
+        # A single weight is split equally between the poses, so a weight of 1.0 ends on their average
+        # instead of adding up every pose's offset from the base
+        if not isinstance(weights, (tuple, list)):
+            weights = [weights / len(self.targets)] * len(self.targets)
+        return list(weights)
+        
+    def apply(self, weights, undo_chunk=True):
+        self.scrubbed = False
+        
+        # A whole pose is applied as it was saved, base + (pose - base) can differ in the last bits
+        if len(self.pose_datas) == 1 and self.mask is None and self.get_weights(weights) == [1.0]:
+            PoseApplyEngine.apply_pose(self.pose_datas[0], undo_chunk)
+            return
+            
+        PoseApplyEngine.apply_plugs(self.evaluate(weights), undo_chunk, self.get_plug_states())
+        
+    # Set a weight while it is dragged. The values are written straight to the plugs through the API,
+    # which is not undoable, end_scrub sets the final weight undoably
+    def scrub(self, weights):
+        values = self.evaluate_array(weights)
+        for row, column, plug in self.get_scrub_plugs():
+            value = values[row, column]
+            if not np.isnan(value):
+                AutoRigHelpers.set_plug_ui_value(plug, float(value))
+                
+        self.scrubbed = True
+        
+    def end_scrub(self, weights):
+        if not self.scrubbed:
+            return
+            
+        # Put the rig back where the blend started so undoing the final weight returns it there
+        self.scrub(0.0)
+        self.apply(weights)
+        
+    def get_plug_states(self) -> dict:
+        if self.plug_states == None:
+            self.plug_states = AutoRigHelpers.get_plug_states([f"{control}.{attr}" for control in self.layout.controls for attr, width in self.layout.attributes])
+        return self.plug_states
+        
+    def get_scrub_plugs(self) -> list:
+        if self.scrub_plugs == None:
+            self.scrub_plugs = []
+            for plug, plug_state in self.get_plug_states().items():
+                control, attr = plug.rsplit(".", 1)
+                row = self.layout.rows[control]
+                column, width = self.layout.columns[attr]
+                
+                child_plugs = AutoRigHelpers.get_child_plugs(plug)
+                for c, ((child_attr, settable), child_plug) in enumerate(zip(plug_state[:width], child_plugs)):
+                    if settable:
+                        self.scrub_plugs.append((row, column + c, child_plug))
+                        
+        return self.scrub_plugs
\ No newline at end of file
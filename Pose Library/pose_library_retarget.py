@@ -0,0 +1,126 @@
+import maya.cmds as cmds
+
+from auto_rig_helpers import AutoRigHelpers
+
+from pose_library_apply import PoseApplyEngine
+
+class PoseRetarget(object):
+    
+    # Control mapping of a set of saved control nodes in a namespace,
+    # (saved full paths, namespace) -> {saved full path -> full path in the namespace}
+    mapping_cache = {}
+    mapping_generation = -1
+    
+    # Apply a pose to the same rig referenced under several namespaces as one batch
+    #
+    # @param pose_data - The pose
+    # @param namespaces - List of namespaces to apply the pose in, e.g. ["charA", "charA1"]
+    # @param undo_chunk - Wrap the whole batch in one undo chunk
+    #
+    @classmethod
+    def apply_pose_to_namespaces(cls, pose_data, namespaces, undo_chunk=True):
+        PoseApplyEngine.apply_plugs(cls.get_namespace_plugs(pose_data, namespaces), undo_chunk)
+        
+    @classmethod
+    def get_namespace_plugs(cls, pose_data, namespaces) -> list:
+        pose_plugs = []
+        
+        control_values = PoseApplyEngine.get_control_values(pose_data)
+        mappings = cls.get_control_mappings([control_node for control_node, attr_values in control_values], namespaces)
+        
+        for namespace in namespaces:
+            mapping = mappings[cls.normalize_namespace(namespace)]
+            for (uuid, name, full_path), attr_values in control_values:
+                target_path = mapping.get(full_path)
+                if target_path != None:
+                    pose_plugs.extend((f"{target_path}.{attr}", values) for attr, values in attr_values)
+                    
+        return pose_plugs
+        
+    # Get the control mapping of saved control nodes in each namespace, mappings that are
+    # not cached yet are built together
+    #
+    # @param control_nodes - List of (uuid, name, full_path) of the control nodes as they were saved
+    # @param namespaces - List of namespaces
+    # @return - Dict of namespace -> {saved full path -> full path in the namespace}
+    #
+    @classmethod
+    def get_control_mappings(cls, control_nodes, namespaces) -> dict:
+        # Renaming or reparenting any node can change the mapped paths
+        AutoRigHelpers.register_dag_path_cache_callbacks()
+        if cls.mapping_generation != AutoRigHelpers.dag_path_generation:
+            cls.mapping_cache = {}
+            cls.mapping_generation = AutoRigHelpers.dag_path_generation
+            
+        saved_paths = tuple(full_path for uuid, name, full_path in control_nodes)
+        namespaces = [cls.normalize_namespace(namespace) for namespace in namespaces]
+        
+        missing = [namespace for namespace in dict.fromkeys(namespaces) if (saved_paths, namespace) not in cls.mapping_cache]
+        if missing:
+            for namespace, mapping in cls.build_control_mappings(control_nodes, missing).items():
+                cls.mapping_cache[(saved_paths, namespace)] = mapping
+                
+        return {namespace: cls.mapping_cache[(saved_paths, namespace)] for namespace in namespaces}
+        
+    @classmethod
+    def build_control_mappings(cls, control_nodes, namespaces) -> dict:
+        mappings = {namespace: {} for namespace in namespaces}
+        
+        # Look for the saved hierarchy inside every namespace with one ls
+        candidates = {}
+        for namespace in namespaces:
+            for uuid, name, full_path in control_nodes:
+                candidates[cls.add_namespace(AutoRigHelpers.strip_namespaces(full_path), namespace)] = (namespace, full_path)
+        for match in cmds.ls(list(candidates), long=True) or []:
+            if match in candidates:
+                namespace, full_path = candidates[match]
+                mappings[namespace][full_path] = match
+                
+        # Control nodes whose hierarchy differs are matched by short name inside the namespace
+        unmatched = {}
+        for namespace in namespaces:
+            for uuid, name, full_path in control_nodes:
+                if full_path not in mappings[namespace]:
+                    leaf_name = AutoRigHelpers.strip_namespaces(name.split("|")[-1])
+                    unmatched.setdefault((namespace, leaf_name), []).append(full_path)
+        if not unmatched:
+            return mappings
+            
+        name_matches = {}
+        patterns = [f"{namespace}:{leaf_name}" for namespace, leaf_name in unmatched]
+        for match in cmds.ls(patterns, long=True, recursive=True) or []:
+            match_namespace, separator, leaf_name = match.split("|")[-1].rpartition(":")
+            for namespace in namespaces:
+                if match_namespace == namespace or match_namespace.startswith(namespace + ":"):
+                    name_matches.setdefault((namespace, leaf_name), []).append(match)
+                    
+        for (namespace, leaf_name), full_paths in unmatched.items():
+            matches = name_matches.get((namespace, leaf_name))
+            if matches:
+                for full_path in full_paths:
+                    mappings[namespace][full_path] = AutoRigHelpers.pick_dag_path(matches, full_path, namespace)
+                    
+        return mappings
+        
+    @classmethod
+    def get_selected_namespaces(cls) -> list:
+        # Namespaces of the selected nodes, in the order they were selected
+        namespaces = {}
+        for node in cmds.ls(selection=True, long=True) or []:
+            namespace = node.split("|")[-1].rpartition(":")[0]
+            if namespace:
+                namespaces[namespace] = None
+        return list(namespaces)
+        
+    @classmethod
+    def add_namespace(cls, path, namespace) -> str:
+        return "|".join(f"{namespace}:{part}" if part else part for part in path.split("|"))
+        
+    @classmethod
+    def normalize_namespace(cls, namespace) -> str:
+        return namespace.strip(":")
+        
+    @classmethod
+    def clear(cls):
+        cls.mapping_cache = {}
+        
\ No newline at end of file
@@ -0,0 +1,218 @@
+import os
+
+from collections import OrderedDict
+
+from PySide6 import QtCore
+from PySide6 import QtGui
+
+from pose_library_io_utility import PoseLibraryIOUtility
+from pose_library_crawler import PoseLibraryCrawler
+
+class ThumbnailCache(object):
+    
+    THUMBNAIL_FOLDER_NAME = ".thumbnails"
+    
+    # Thumbnails are written at these scales of the rig capture size, the content grid shows the 0.5 scale
+    THUMBNAIL_SCALARS = [0.5]
+    
+    @classmethod
+    def get_thumbnail_size(cls, scalar) -> QtCore.QSize:
+        return QtCore.QSize(int(PoseLibraryIOUtility.RIG_CAPTURE_WIDTH * scalar), int(PoseLibraryIOUtility.RIG_CAPTURE_HEIGHT * scalar))
+        
+    @classmethod
+    def get_thumbnail_path(cls, capture_path, scalar) -> str:
+        size = cls.get_thumbnail_size(scalar)
+        capture_dir, capture_name = os.path.split(capture_path)
+        capture_name = os.path.splitext(capture_name)[0]
+        return os.path.join(capture_dir, cls.THUMBNAIL_FOLDER_NAME, f"{capture_name}_{size.width()}x{size.height()}.png")
+        
+    # Get the thumbnails of many rig captures, every thumbnail folder is listed once instead of
+    # checking each thumbnail. Captures fall back to themselves until their thumbnail was written
+    #
+    # @param capture_paths - List of rig capture paths
+    # @param scalar - Scale of the thumbnails
+    # @return - Dict of capture path -> thumbnail path, or the capture path if it has no thumbnail
+    #
+    @classmethod
+    def get_existing_thumbnail_paths(cls, capture_paths, scalar) -> dict:
+        thumbnail_paths = {}
+        folder_thumbnails = {}
+        
+        for capture_path in capture_paths:
+            thumbnail_path = cls.get_thumbnail_path(capture_path, scalar)
+            thumbnail_folder, thumbnail_name = os.path.split(thumbnail_path)
+            
+            if thumbnail_folder not in folder_thumbnails:
+                try:
+                    folder_thumbnails[thumbnail_folder] = PoseLibraryCrawler.scan_folder(thumbnail_folder).thumbnails
+                except FileNotFoundError:
+                    folder_thumbnails[thumbnail_folder] = {}
+                    
+            thumbnail_paths[capture_path] = thumbnail_path if thumbnail_name[:-len(".png")] in folder_thumbnails[thumbnail_folder] else capture_path
+            
+        return thumbnail_paths
+        
+    @classmethod
+    def is_thumbnail_outdated(cls, capture_path) -> bool:
+        capture_mtime = os.path.getmtime(capture_path)
+        for scalar in cls.THUMBNAIL_SCALARS:
+            thumbnail_path = cls.get_thumbnail_path(capture_path, scalar)
+            if not os.path.exists(thumbnail_path) or os.path.getmtime(thumbnail_path) < capture_mtime:
+                return True
+        return False
+        
+    @classmethod
+    def write_thumbnails(cls, capture_path) -> bool:
+        image = QtGui.QImage(capture_path)
+        if image.isNull():
+            return False
+            
+        # Write every size from the full size capture
+        os.makedirs(os.path.join(os.path.dirname(capture_path), cls.THUMBNAIL_FOLDER_NAME), exist_ok=True)
+        for scalar in cls.THUMBNAIL_SCALARS:
+            thumbnail = image.scaled(cls.get_thumbnail_size(scalar), QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+            thumbnail.save(cls.get_thumbnail_path(capture_path, scalar))
+        return True
+        
+    @classmethod
+    def get_captures_missing_thumbnails(cls, root_path) -> list:
+        capture_paths = []
+        
+        for folder_path, folder_names, file_names in os.walk(root_path):
+            # Do not look for rig captures in thumbnail folders
+            if cls.THUMBNAIL_FOLDER_NAME in folder_names:
+                folder_names.remove(cls.THUMBNAIL_FOLDER_NAME)
+                
+            for file_name in file_names:
+                capture_path = os.path.join(folder_path, file_name)
+                if file_name.endswith(".png") and cls.is_thumbnail_outdated(capture_path):
+                    capture_paths.append(capture_path)
+                    
+        return capture_paths
+        
+class ThumbnailBackfillTask(QtCore.QRunnable):
+    
+    # Writes the missing thumbnails of a whole pose library on a worker thread
+    #
+    # @param loader - The ThumbnailLoader that is told about every written thumbnail
+    # @param root_path - The pose library's root folder
+    #
+    def __init__(self, loader, root_path):
+        super(ThumbnailBackfillTask, self).__init__()
+        
+        self.loader = loader
+        self.root_path = root_path
+        
+    def run(self):
+        for capture_path in ThumbnailCache.get_captures_missing_thumbnails(self.root_path):
+            if ThumbnailCache.write_thumbnails(capture_path):
+                self.loader.thumbnail_written.emit(capture_path)
+
+class ThumbnailLoadTask(QtCore.QRunnable):
+    
+    # Decodes one rig capture on a worker thread, downscaled while decoding
+    #
+    # @param loader - The ThumbnailLoader that receives the decoded image
+    # @param key - (path, version) cache key of the rig capture
+    # @param thumbnail_size - QSize the image is scaled to fit in
+    #
+    def __init__(self, loader, key, thumbnail_size):
+        super(ThumbnailLoadTask, self).__init__()
+        
+        self.loader = loader
+        self.key = key
+        self.thumbnail_size = thumbnail_size
+        
+    def run(self):
+        reader = QtGui.QImageReader(self.key[0])
+        
+        # Let the image reader decode at the thumbnail size when the format supports it
+        if reader.size().isValid():
+            reader.setScaledSize(reader.size().scaled(self.thumbnail_size, QtCore.Qt.KeepAspectRatio))
+        image = reader.read()
+        
+        if not image.isNull() and (image.width() > self.thumbnail_size.width() or image.height() > self.thumbnail_size.height()):
+            image = image.scaled(self.thumbnail_size, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+            
+        # QImages can cross threads, the pixmap is made on the UI thread
+        self.loader.image_decoded.emit(self.key, image)
+        
+class ThumbnailLoader(QtCore.QObject):
+    
+    MAX_THREAD_COUNT = 4
+    MAX_CACHED_THUMBNAILS = 1000
+    
+    PLACEHOLDER_COLOR = "#3C3C3C"
+    
+    thumbnail_loaded = QtCore.Signal(str, QtGui.QPixmap)
+    image_decoded = QtCore.Signal(object, QtGui.QImage)
+    
+    # Emitted with the rig capture path once the backfill wrote its thumbnails
+    thumbnail_written = QtCore.Signal(str)
+    
+    def __init__(self, thumbnail_width, thumbnail_height, parent=None):
+        super(ThumbnailLoader, self).__init__(parent)
+        
+        self.thumbnail_size = QtCore.QSize(int(thumbnail_width), int(thumbnail_height))
+        
+        self.thread_pool = QtCore.QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(self.MAX_THREAD_COUNT)
+        
+        # Decoded pixmaps, (path, version) -> QPixmap, least recently used first
+        self.pixmaps = OrderedDict()
+        self.pending = set()
+        
+        self.placeholder = QtGui.QPixmap(self.thumbnail_size)
+        self.placeholder.fill(QtGui.QColor(self.PLACEHOLDER_COLOR))
+        
+        self.image_decoded.connect(self.on_image_decoded)
+        
+    # Get the thumbnail of a rig capture. Requests are made on every repaint, so the file is not
+    # touched here, the caller passes a version that changes whenever the capture is written again
+    #
+    # @param path - Path to the rig capture
+    # @param version - Version of the capture, e.g. its st_mtime_ns
+    # @return - The cached pixmap, or the placeholder while the thumbnail is loaded in the background.
+    #           thumbnail_loaded is emitted with the path once it is ready
+    #
+    def request(self, path, version="") -> QtGui.QPixmap:
+        key = (path, version)
+        if key in self.pixmaps:
+            self.pixmaps.move_to_end(key)
+            return self.pixmaps[key]
+            
+        if key not in self.pending:
+            self.pending.add(key)
+            self.thread_pool.start(ThumbnailLoadTask(self, key, self.thumbnail_size))
+            
+        return self.placeholder
+        
+    def start_backfill(self, root_path):
+        # The backfill runs on the global pool so cancelling pending thumbnails does not cancel it
+        QtCore.QThreadPool.globalInstance().start(ThumbnailBackfillTask(self, root_path))
+        
+    def cancel_pending(self):
+        # Drop thumbnails that have not started loading, e.g. when another folder is selected
+        self.thread_pool.clear()
+        self.pending.clear()
+        
+    def discard(self, path):
+        # Drop the cached pixmaps of a file that was written again
+        for key in [key for key in self.pixmaps if key[0] == path]:
+            del self.pixmaps[key]
+            
+    def on_image_decoded(self, key, image):
+        self.pending.discard(key)
+        
+        # Keep the placeholder for captures that could not be read, so repaints do not decode them again
+        if image.isNull():
+            self.add_pixmap(key, self.placeholder)
+            return
+            
+        self.add_pixmap(key, QtGui.QPixmap.fromImage(image))
+        self.thumbnail_loaded.emit(key[0], self.pixmaps[key])
+        
+    def add_pixmap(self, key, pixmap):
+        self.pixmaps[key] = pixmap
+        while len(self.pixmaps) > self.MAX_CACHED_THUMBNAILS:
+            self.pixmaps.popitem(last=False)
\ No newline at end of file
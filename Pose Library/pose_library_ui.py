@@ -1,8 +1,6 @@
 import sys
 import os
 
-from functools import partial
-
 import maya.cmds as cmds
 import maya.OpenMayaUI as omui
 import maya.OpenMaya as om
@@ -17,6 +15,15 @@ from PySide6 import QtWidgets
 from pose_library import PoseLibrary
 from pose_library_io_utility import PoseLibraryIOUtility
 from pose_library_data import PoseData
+from pose_library_thumbnails import ThumbnailLoader
+from pose_library_thumbnails import ThumbnailCache
+from pose_library_content_view import PoseContentModel
+from pose_library_content_view import PoseContentDelegate
+from pose_library_content_view import PoseContentView
+from pose_library_watcher import PoseLibraryWatcher
+from pose_library_crawler import PoseLibraryCrawler
+from pose_library_folders import PoseLibraryFolders
+from pose_library_retarget import PoseRetarget
 
 def maya_main_window():
     main_window_ptr = omui.MQtUtil.mainWindow()
@@ -80,7 +87,7 @@ class NewFolderDialog(QtWidgets.QDialog):
         new_folder_name = self.folder_name_line_edit.text()
         folder_path = os.path.join(PoseLibraryIOUtility.root_folder_path, new_folder_name)
         PoseLibraryIOUtility.create_folder(folder_path)
-        self.pose_library_window.refresh_hierarchy()
+        self.pose_library_window.apply_folder_changes([PoseLibraryIOUtility.root_folder_path])
         
         self.close()
         
@@ -156,6 +163,69 @@ class SavePoseDialog(QtWidgets.QDialog):
         rig_capture = os.path.join(rig_capture_dir_path, rig_capture_name + ".png")
         PoseLibraryIOUtility.capture_rig_image(rig_capture)
         
+class BatchKeyDialog(QtWidgets.QDialog):
+    
+    X_SIZE = 300
+    Y_SIZE = 175
+    
+    def __init__(self, pose_library_window, parent=maya_main_window()):
+        super(BatchKeyDialog, self).__init__(parent)
+        
+        # Cache pose library window
+        self.pose_library_window = pose_library_window
+        
+        # Set window properties
+        self.setWindowTitle("Batch Key Poses")
+        self.setMinimumSize(self.X_SIZE, self.Y_SIZE)
+        self.setMaximumSize(self.X_SIZE, self.Y_SIZE)
+        
+        # Create widgets and layouts
+        self.create_widgets()
+        self.create_layouts()
+        
+    def create_widgets(self):
+        # Frame widgets - The selected poses are keyed one after another, starting at the start frame
+        self.start_frame_label = QtWidgets.QLabel("Start Frame")
+        self.start_frame_spin_box = QtWidgets.QSpinBox()
+        self.start_frame_spin_box.setRange(-1000000, 1000000)
+        self.start_frame_spin_box.setValue(int(cmds.currentTime(query=True)))
+        
+        self.frame_step_label = QtWidgets.QLabel("Frame Step")
+        self.frame_step_spin_box = QtWidgets.QSpinBox()
+        self.frame_step_spin_box.setRange(1, 10000)
+        self.frame_step_spin_box.setValue(1)
+        
+        self.suspend_refresh_check_box = QtWidgets.QCheckBox("Suspend Viewport Refresh")
+        self.suspend_refresh_check_box.setChecked(True)
+        
+        # Button widgets
+        self.confirm_btn = QtWidgets.QPushButton("Confirm")
+        self.confirm_btn.clicked.connect(self.key_poses)
+        self.cancel_btn = QtWidgets.QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.close)
+        
+    def create_layouts(self):
+        main_layout = QtWidgets.QVBoxLayout(self)
+        main_layout.setContentsMargins(10, 10, 10, 10)
+        
+        frame_layout = QtWidgets.QFormLayout()
+        frame_layout.addRow(self.start_frame_label, self.start_frame_spin_box)
+        frame_layout.addRow(self.frame_step_label, self.frame_step_spin_box)
+        
+        btn_layout = QtWidgets.QHBoxLayout()
+        btn_layout.stretch(True)
+        btn_layout.addWidget(self.confirm_btn)
+        btn_layout.addWidget(self.cancel_btn)
+        
+        main_layout.addLayout(frame_layout)
+        main_layout.addWidget(self.suspend_refresh_check_box)
+        main_layout.addLayout(btn_layout)
+        
+    def key_poses(self):
+        self.pose_library_window.batch_key_poses(self.start_frame_spin_box.value(), self.frame_step_spin_box.value(), self.suspend_refresh_check_box.isChecked())
+        
+        self.close()
+        
 class PoseLibraryWindow(MayaQWidgetDockableMixin, QtWidgets.QMainWindow):
     
     HIERARCHY_WIDGET_WIDTH = 225
@@ -163,6 +233,11 @@ class PoseLibraryWindow(MayaQWidgetDockableMixin, QtWidgets.QMainWindow):
     
     RIG_CAPTURE_SCALAR = 0.5
     
+    BLEND_SLIDER_WIDTH = 150
+    
+    # Hierarchy items store the id of the FolderNode they show
+    FOLDER_ID_ROLE = QtCore.Qt.UserRole
+    
     @property
     def CONTENT_BUTTON_WIDTH(self):
         return PoseLibraryIOUtility.RIG_CAPTURE_WIDTH * self.RIG_CAPTURE_SCALAR
@@ -185,6 +260,9 @@ class PoseLibraryWindow(MayaQWidgetDockableMixin, QtWidgets.QMainWindow):
         
         self.refresh_hierarchy()
         
+        # Write thumbnails that are missing from existing libraries
+        self.thumbnail_loader.start_backfill(PoseLibraryIOUtility.root_folder_path)
+        
     def create_widgets(self):
         self.create_toolbar()
         self.create_hierarchy_widgets()
@@ -203,9 +281,39 @@ class PoseLibraryWindow(MayaQWidgetDockableMixin, QtWidgets.QMainWindow):
         self.save_pose_action = QtGui.QAction(QtGui.QIcon(), "Save Pose", self)
         self.save_pose_action.triggered.connect(self.open_save_pose_dialog)
         
+        # Create 'Convert Library' action - Migrates text '.pose' files to the binary format
+        self.convert_library_action = QtGui.QAction(QtGui.QIcon(), "Convert Library", self)
+        self.convert_library_action.triggered.connect(self.convert_library)
+        
+        # Create 'Apply To Namespaces' action - Applies the selected pose to every rig that has a node selected
+        self.apply_to_namespaces_action = QtGui.QAction(QtGui.QIcon(), "Apply To Namespaces", self)
+        self.apply_to_namespaces_action.triggered.connect(self.apply_pose_to_namespaces)
+        
+        # Create 'Batch Key Poses' action - Keys the selected poses on every rig that has a node selected
+        self.batch_key_action = QtGui.QAction(QtGui.QIcon(), "Batch Key Poses", self)
+        self.batch_key_action.triggered.connect(self.open_batch_key_dialog)
+        
         # Add actions
         self.toolbar.addAction(self.new_folder_action)
         self.toolbar.addAction(self.save_pose_action)   
+        self.toolbar.addAction(self.convert_library_action)
+        self.toolbar.addAction(self.apply_to_namespaces_action)
+        self.toolbar.addAction(self.batch_key_action)
+        
+        # Create 'Blend' slider - Blends the rig from its state when the slider is pressed towards the selected pose
+        self.blend_label = QtWidgets.QLabel("Blend")
+        self.blend_slider = QtWidgets.QSlider(QtCore.Qt.Horizontal)
+        self.blend_slider.setRange(0, 100)
+        self.blend_slider.setValue(100)
+        self.blend_slider.setMaximumWidth(self.BLEND_SLIDER_WIDTH)
+        self.blend_slider.sliderPressed.connect(self.start_pose_blend)
+        self.blend_slider.sliderReleased.connect(self.end_pose_blend_scrub)
+        self.blend_slider.valueChanged.connect(self.update_pose_blend)
+        
+        # Add blend slider
+        self.toolbar.addSeparator()
+        self.toolbar.addWidget(self.blend_label)
+        self.toolbar.addWidget(self.blend_slider)
         
     # Create Tree Hierarchy Widgets
     def create_hierarchy_widgets(self):
@@ -219,12 +327,24 @@ class PoseLibraryWindow(MayaQWidgetDockableMixin, QtWidgets.QMainWindow):
         
         self.hierarchy_tree.selectionModel().selectionChanged.connect(self.update_selected_folder)
         
+        # Watch the library's folders, changes are applied to the hierarchy and content incrementally.
+        # Folder id -> hierarchy item
+        self.hierarchy_items = {}
+        self.folder_watcher = PoseLibraryWatcher(self)
+        self.folder_watcher.folders_changed.connect(self.apply_folder_changes)
+        
     def create_content_widgets(self):
-        self.content_widget = QtWidgets.QWidget()
+        # Load rig captures in the background, poses show a placeholder until they arrive
+        self.thumbnail_loader = ThumbnailLoader(self.CONTENT_BUTTON_WIDTH, self.CONTENT_BUTTON_HEIGHT, self)
+        
+        # Create Content ListView & PoseContentModel - Only the visible poses are painted
+        self.content_model = PoseContentModel(self.thumbnail_loader, self.RIG_CAPTURE_SCALAR, self)
+        self.content_view = PoseContentView()
+        self.content_view.setModel(self.content_model)
+        self.content_view.setItemDelegate(PoseContentDelegate(self.CONTENT_BUTTON_WIDTH, self.CONTENT_BUTTON_HEIGHT, self.content_view))
+        self.content_view.clicked.connect(self.load_content_pose)
         
-        self.content_area = QtWidgets.QScrollArea()
-        self.content_area.setWidget(self.content_widget)
-        self.content_area.setWidgetResizable(True)    
+        self.content_folder = None
         
     def create_layouts(self):
         splitter = QtWidgets.QSplitter(QtCore.Qt.Horizontal)
@@ -236,12 +356,9 @@ class PoseLibraryWindow(MayaQWidgetDockableMixin, QtWidgets.QMainWindow):
         
         hierarchy_layout.addWidget(self.hierarchy_tree)        
         
-        # Create the Content Area for Splitter - Contains Folder Content
-        self.content_layout = QtWidgets.QGridLayout()
-        self.content_widget.setLayout(self.content_layout)
-        
+        # Add the Content View to Splitter - Contains Folder Content
         splitter.addWidget(self.hierarchy_area)
-        splitter.addWidget(self.content_area)
+        splitter.addWidget(self.content_view)
         splitter.setSizes([self.HIERARCHY_WIDGET_WIDTH, self.CONTENT_WIDGET_WIDTH])
     
     def open_new_folder_dialog(self):
@@ -263,25 +380,41 @@ class PoseLibraryWindow(MayaQWidgetDockableMixin, QtWidgets.QMainWindow):
             
         self.save_pose_dialog = SavePoseDialog(self)
         self.save_pose_dialog.show()
+        
+    def open_batch_key_dialog(self):
+        try:
+            self.batch_key_dialog.close()
+            self.batch_key_dialog.deleteLater()
+        except:
+            pass
+            
+        self.batch_key_dialog = BatchKeyDialog(self)
+        self.batch_key_dialog.show()
     
     def add_to_hierarchy(self, hierarchy_parent, hierarchy_item):
         hierarchy_parent.appendRow(hierarchy_item)
         
-    def create_hierarchy_item(self, text, editable=False):
+    def create_hierarchy_item(self, text, editable=False, folder_node=None):
         # Create Hierarchy Item
         hierarchy_item = QtGui.QStandardItem(text)
         hierarchy_item.setEditable(editable)
         
+        # Remember and watch the folder the item shows
+        if folder_node:
+            hierarchy_item.setData(folder_node.id, self.FOLDER_ID_ROLE)
+            self.hierarchy_items[folder_node.id] = hierarchy_item
+            self.folder_watcher.watch_folders([folder_node.path])
+            
         return hierarchy_item
         
     def update_selected_folder(self, selected, deselected):
-        # Get the data of the first selected item
+        # Get the folder id of the first selected item
         selected_indexes = selected.indexes()
         if selected_indexes:
-            selected_item = selected_indexes[0].data()
+            folder_id = selected_indexes[0].data(self.FOLDER_ID_ROLE)
             
             # Update the PoseLibrary's selected_folder
-            PoseLibrary.update_selected_folder(selected_item)
+            PoseLibrary.update_selected_folder(folder_id)
             
         # Update the content UI
         self.refresh_content_layout()
@@ -289,81 +422,195 @@ class PoseLibraryWindow(MayaQWidgetDockableMixin, QtWidgets.QMainWindow):
     def refresh_hierarchy(self):
         self.hierarchy_model.clear()
         self.hierarchy_model.setHorizontalHeaderLabels(["Workspace/PoseLibrary"])
+        self.hierarchy_items = {}
+        self.folder_watcher.clear()
         
         # Add root folder to hierarchy
-        self.hierarchy_root = self.create_hierarchy_item("PoseLibrary")
+        root_folder = PoseLibraryFolders.set_root_folder(PoseLibraryIOUtility.root_folder_path)
+        self.hierarchy_root = self.create_hierarchy_item("PoseLibrary", folder_node=root_folder)
         self.add_to_hierarchy(self.hierarchy_model, self.hierarchy_root)
         
-        PoseLibraryIOUtility.load_folders_to_hierarchy(self, self.hierarchy_root, PoseLibraryIOUtility.root_folder_path, True)
+        PoseLibraryIOUtility.load_folders_to_hierarchy(self, self.hierarchy_root, root_folder)
         
         selection_model = self.hierarchy_tree.selectionModel()
         index = self.hierarchy_model.indexFromItem(self.hierarchy_model.invisibleRootItem().child(0))
         selection_model.select(index, QtCore.QItemSelectionModel.Select | QtCore.QItemSelectionModel.Rows)
         
-        
+    # Is called when the folder watcher detects changes
+    #
+    # @param folder_paths - Folders whose folders or poses were added, removed or renamed
+    #
+    def apply_folder_changes(self, folder_paths):
+        for folder_path in folder_paths:
+            folder_node = PoseLibraryFolders.get_folder_at_path(folder_path)
+            if folder_node != None and os.path.isdir(folder_path):
+                self.update_hierarchy_children(folder_node)
+                
+        selected_folder = PoseLibraryFolders.get_folder(PoseLibrary.selected_folder)
+        
+        # Select the root folder if the selected folder was removed
+        if selected_folder == None:
+            selection_model = self.hierarchy_tree.selectionModel()
+            selection_model.select(self.hierarchy_root.index(), QtCore.QItemSelectionModel.ClearAndSelect | QtCore.QItemSelectionModel.Rows)
+            
+        # Only the selected folder's poses are shown
+        elif selected_folder.path in folder_paths:
+            PoseLibrary.update_selected_folder(PoseLibrary.selected_folder)
+            self.refresh_content_layout()
+            
+    def update_hierarchy_children(self, folder_node):
+        # The watcher reported a change, do not trust the cached scan of this folder
+        PoseLibraryCrawler.invalidate_folder(folder_node.path)
+        listed_folders = PoseLibraryCrawler.scan_folder(folder_node.path).folders
+        
+        removed_folders = [child for path, child in folder_node.children.items() if path not in listed_folders]
+        added_folders = [path for path in listed_folders if path not in folder_node.children]
+        
+        # Renamed folders keep their inode, rename their item instead of rebuilding it
+        removed_inodes = {child.inode: child for child in removed_folders}
+        for added_path in list(added_folders):
+            renamed_folder = removed_inodes.get(listed_folders[added_path])
+            if renamed_folder:
+                self.rename_hierarchy_item(renamed_folder, added_path)
+                removed_folders.remove(renamed_folder)
+                added_folders.remove(added_path)
+                
+        for removed_folder in removed_folders:
+            self.remove_hierarchy_item(removed_folder)
+            
+        hierarchy_item = self.hierarchy_items[folder_node.id]
+        for added_path in added_folders:
+            added_folder = PoseLibraryFolders.add_folder(added_path, listed_folders[added_path], folder_node)
+            
+            folder_hierarchy_item = self.create_hierarchy_item(added_folder.name, folder_node=added_folder)
+            self.add_to_hierarchy(hierarchy_item, folder_hierarchy_item)
+            PoseLibraryIOUtility.load_folders_to_hierarchy(self, folder_hierarchy_item, added_folder)
+            
+    def remove_hierarchy_item(self, folder_node):
+        hierarchy_item = self.hierarchy_items[folder_node.id]
+        for descendant in folder_node.get_descendants():
+            self.hierarchy_items.pop(descendant.id, None)
+            self.folder_watcher.unwatch_folders([descendant.path])
+            
+        PoseLibraryFolders.remove_folder(folder_node)
+        hierarchy_item.parent().removeRow(hierarchy_item.row())
+        
+    def rename_hierarchy_item(self, folder_node, new_path):
+        self.hierarchy_items[folder_node.id].setText(os.path.basename(new_path))
+        
+        # The folder ids do not change, only the watched paths
+        descendants = folder_node.get_descendants()
+        self.folder_watcher.unwatch_folders([descendant.path for descendant in descendants])
+        PoseLibraryFolders.move_folder(folder_node, new_path)
+        self.folder_watcher.watch_folders([descendant.path for descendant in descendants])
+        
+        # The selected folder's poses moved, reload them from their new paths
+        if PoseLibrary.selected_folder in [descendant.id for descendant in descendants]:
+            PoseLibrary.update_selected_folder(PoseLibrary.selected_folder)
+            self.content_folder = None
+            self.refresh_content_layout()
+            
     def refresh_content_layout(self):
-        # Clear Content Layout
-        while self.content_layout.count():
-            item = self.content_layout.takeAt(0)
-            if item is not None:
-                item.widget().deleteLater()
-            item = None
-        
-        for i in range(5):
-            self.content_layout.setRowStretch(i, 1)  # Equal stretch for all rows
-            self.content_layout.setColumnStretch(i, 1)  # Equal stretch for all columns
-        
-        # Add new poses to content layout
-        for pose_name, pose_data in PoseLibrary.poses.items():
-            self.create_content_button(pose_name, pose_data)
-        
-        
-    # Create the buttons that load rig poses in the pose library content window
-    def create_content_button(self, pose_name="", pose_data=PoseData()):
-        
-        # Create button container and layout
-        button_container = QtWidgets.QWidget()
-        button_container.setFixedSize(self.CONTENT_BUTTON_WIDTH + 50, self.CONTENT_BUTTON_HEIGHT + 50)
-        button_layout = QtWidgets.QVBoxLayout()
-        button_container.setLayout(button_layout)
-        
-        # Create button
-        button = QtWidgets.QPushButton()
-        button.setFixedSize(self.CONTENT_BUTTON_WIDTH, self.CONTENT_BUTTON_HEIGHT)
-        
-        # Connect loading the rig pose to the button
-        button.clicked.connect(partial(PoseLibrary.load_pose_to_rig, pose_data))
-        
-        # Add rig capture to button
-        selected_folder = PoseLibraryIOUtility.folders[PoseLibrary.selected_folder]
-        pose_capture = os.path.join(selected_folder, pose_name + ".png")
-        if os.path.exists(pose_capture):
-            pose_icon = QtGui.QIcon(pose_capture)
-            button.setIcon(pose_icon)
-            button.setIconSize(button.size())
+        # Selecting another folder replaces every pose, otherwise only the changed poses are updated
+        folder_changed = self.content_folder != PoseLibrary.selected_folder
+        if folder_changed:
+            # Stop loading thumbnails of the previous folder
+            self.thumbnail_loader.cancel_pending()
+            self.content_folder = PoseLibrary.selected_folder
+            
+        self.content_model.set_poses(PoseLibrary.poses, reset=folder_changed)
+        
+    # Is called when a pose in the content window is clicked
+    def load_content_pose(self, index):
+        # Ctrl/Shift clicks only change the selection, e.g. to pick the poses of a batch
+        if QtWidgets.QApplication.keyboardModifiers() & (QtCore.Qt.ControlModifier | QtCore.Qt.ShiftModifier):
+            return
+        self.load_pose(index.data(PoseContentModel.PoseHandleRole))
+        
+    def load_pose(self, pose_data):
+        PoseLibrary.load_pose_to_rig(pose_data)
+        
+    # Is called when the "Apply To Namespaces" button in the tool bar is pressed
+    def apply_pose_to_namespaces(self):
+        index = self.content_view.currentIndex()
+        namespaces = PoseRetarget.get_selected_namespaces()
+        if not index.isValid() or not namespaces:
+            om.MGlobal.displayWarning("Select a pose and a node of every rig to apply it to")
+            return
             
-        # Create Label
-        button_label = QtWidgets.QLabel(pose_name)
+        PoseLibrary.load_pose_to_namespaces(index.data(PoseContentModel.PoseHandleRole).pose_data, namespaces)
+        
+    # Is called when the "Batch Key Poses" dialog is confirmed
+    #
+    # @param start_frame - Frame the first selected pose is keyed on
+    # @param frame_step - Frames between the selected poses
+    # @param suspend_refresh - Suspend viewport refresh while the poses are keyed
+    #
+    def batch_key_poses(self, start_frame, frame_step, suspend_refresh=True):
+        indexes = sorted(self.content_view.selectionModel().selectedIndexes(), key=lambda index: index.row())
+        if not indexes:
+            om.MGlobal.displayWarning("Select the poses to key")
+            return
+            
+        # Without selected references the poses are keyed on the rigs they were saved from
+        namespaces = PoseRetarget.get_selected_namespaces() or [None]
+        
+        batch = []
+        for n, index in enumerate(indexes):
+            pose_data = index.data(PoseContentModel.PoseHandleRole).pose_data
+            batch.extend((pose_data, namespace, start_frame + n * frame_step) for namespace in namespaces)
+        PoseLibrary.key_pose_batch(batch, suspend_refresh)
+        
+    # Is called when the blend slider in the tool bar is pressed
+    def start_pose_blend(self):
+        # The rig is only read when a blend starts, clicking a pose applies it as it was saved
+        index = self.content_view.currentIndex()
+        if not index.isValid():
+            PoseLibrary.pose_blend = None
+            return
+            
+        PoseLibrary.start_pose_blend(index.data(PoseContentModel.PoseHandleRole))
+        
+    # Is called when the blend slider in the tool bar changes
+    def update_pose_blend(self, value):
+        # While the slider is dragged the rig is only updated, the weight it is released at is set undoably
+        if self.blend_slider.isSliderDown():
+            PoseLibrary.blend_pose_to_rig(self.get_blend_weight(), scrub=True)
         
-        # Add widgets to button layout
-        button_layout.addWidget(button)
-        button_layout.addWidget(button_label)
+    # Is called when the blend slider in the tool bar is released
+    def end_pose_blend_scrub(self):
+        PoseLibrary.end_blend_scrub(self.get_blend_weight())
         
-        # Add button to content_layout
-        self.content_layout.addWidget(button_container)
+    def get_blend_weight(self) -> float:
+        return self.blend_slider.value() / 100.0
         
     # Is called when the "Save Pose" button in the tool bar is pressed
     def save_pose(self, pose_name):
         selection = cmds.ls(selection=True, uuid=True)
         pose_path = self.get_save_folder_path()
+        PoseLibrary.close_poses()
         PoseLibraryIOUtility.save_pose_data(PoseData(selection), pose_path, pose_name)
         
+        # Write the small thumbnails next to the rig capture
+        rig_capture = os.path.join(pose_path, pose_name + ".png")
+        if os.path.exists(rig_capture):
+            ThumbnailCache.write_thumbnails(rig_capture)
+            
+        # Refresh the selected folder's contents
+        PoseLibrary.update_selected_folder(PoseLibrary.selected_folder)
+        self.refresh_content_layout()
+        
+    # Is called when the "Convert Library" button in the tool bar is pressed
+    def convert_library(self):
+        PoseLibrary.close_poses()
+        PoseLibraryIOUtility.convert_library_to_binary()
+        
         # Refresh the selected folder's contents
         PoseLibrary.update_selected_folder(PoseLibrary.selected_folder)
         self.refresh_content_layout()
         
     def get_save_folder_path(self) -> str:
-        return PoseLibraryIOUtility.folders[PoseLibrary.selected_folder]
+        return PoseLibrary.get_selected_folder_path()
         
 if __name__ == "__main__":
     try:
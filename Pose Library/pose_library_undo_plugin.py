@@ -0,0 +1,39 @@
+import maya.api.OpenMaya as om2
+
+# Maya plug-in that puts the MDGModifiers of the pose apply engine on the undo queue. The engine
+# does the modifier through the API, then calls the command, which only keeps it to undo and redo it
+def maya_useNewAPI():
+    pass
+    
+class ApplyModifierCommand(om2.MPxCommand):
+    
+    COMMAND_NAME = "poseLibraryApplyModifier"
+    
+    def __init__(self):
+        super(ApplyModifierCommand, self).__init__()
+        
+        self.modifier = None
+        
+    @staticmethod
+    def creator():
+        return ApplyModifierCommand()
+        
+    def doIt(self, args):
+        # The engine is imported through sys.path, the same module the tool uses
+        from pose_library_apply import PoseApplyEngine
+        self.modifier = PoseApplyEngine.take_pending_modifier()
+        
+    def isUndoable(self):
+        return self.modifier is not None
+        
+    def undoIt(self):
+        self.modifier.undoIt()
+        
+    def redoIt(self):
+        self.modifier.doIt()
+        
+def initializePlugin(plugin):
+    om2.MFnPlugin(plugin).registerCommand(ApplyModifierCommand.COMMAND_NAME, ApplyModifierCommand.creator)
+    
+def uninitializePlugin(plugin):
+    om2.MFnPlugin(plugin).deregisterCommand(ApplyModifierCommand.COMMAND_NAME)
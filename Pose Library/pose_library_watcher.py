@@ -0,0 +1,64 @@
+from PySide6 import QtCore
+
+class PoseLibraryWatcher(QtCore.QObject):
+    
+    # Changes are collected until no folder changed for this long, so a bulk copy
+    # of many poses results in a single update
+    DEBOUNCE_MSEC = 500
+    
+    # Changes are emitted at the latest this long after the first queued change, so a copy that
+    # keeps changing folders still updates the library while it runs
+    MAX_WAIT_MSEC = 2000
+    
+    folders_changed = QtCore.Signal(list)
+    
+    def __init__(self, parent=None):
+        super(PoseLibraryWatcher, self).__init__(parent)
+        
+        self.file_system_watcher = QtCore.QFileSystemWatcher(self)
+        self.file_system_watcher.directoryChanged.connect(self.queue_folder_change)
+        
+        self.debounce_timer = QtCore.QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.DEBOUNCE_MSEC)
+        self.debounce_timer.timeout.connect(self.emit_folder_changes)
+        
+        # Time since the first change that has not been emitted yet
+        self.first_change_timer = QtCore.QElapsedTimer()
+        
+        self.changed_folders = set()
+        self.watched_folders = set()
+        
+    def watch_folders(self, folder_paths):
+        new_folders = [folder_path for folder_path in folder_paths if folder_path not in self.watched_folders]
+        if new_folders:
+            self.file_system_watcher.addPaths(new_folders)
+            self.watched_folders.update(new_folders)
+            
+    def unwatch_folders(self, folder_paths):
+        old_folders = [folder_path for folder_path in folder_paths if folder_path in self.watched_folders]
+        if old_folders:
+            self.file_system_watcher.removePaths(old_folders)
+            self.watched_folders.difference_update(old_folders)
+            
+    def clear(self):
+        self.unwatch_folders(list(self.watched_folders))
+        self.changed_folders.clear()
+        self.debounce_timer.stop()
+        self.first_change_timer.invalidate()
+        
+    def queue_folder_change(self, folder_path):
+        # Restart the timer on every change, but never past the maximum wait of the first queued change
+        if not self.first_change_timer.isValid():
+            self.first_change_timer.start()
+        self.changed_folders.add(folder_path)
+        
+        remaining_msec = self.MAX_WAIT_MSEC - self.first_change_timer.elapsed()
+        self.debounce_timer.start(max(0, min(self.DEBOUNCE_MSEC, remaining_msec)))
+        
+    def emit_folder_changes(self):
+        # Parent folders are emitted before their children
+        changed_folders = sorted(self.changed_folders, key=len)
+        self.changed_folders.clear()
+        self.first_change_timer.invalidate()
+        self.folders_changed.emit(changed_folders)
\ No newline at end of file
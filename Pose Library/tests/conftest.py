@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# The pose library modules import maya.cmds, install the fake maya modules before the tests import them
+POSE_LIBRARY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, POSE_LIBRARY_PATH)
+sys.path.insert(0, os.path.join(POSE_LIBRARY_PATH, "benchmark"))
+
+import fake_maya
+
+fake_scene = fake_maya.FakeScene()
+fake_counter = fake_maya.CallCounter()
+fake_maya.install(fake_scene, fake_counter)
+
+from auto_rig_helpers import AutoRigHelpers
+
+@pytest.fixture
+def scene():
+    # Every test starts with an empty scene, the caches of the previous test's nodes are cleared as a new scene would
+    fake_scene.reset()
+    fake_counter.reset()
+    AutoRigHelpers.clear_settable_cache()
+    AutoRigHelpers.clear_dag_path_cache()
+    return fake_scene
+    
+@pytest.fixture
+def counter(scene):
+    return fake_counter
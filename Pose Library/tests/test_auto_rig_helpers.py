@@ -0,0 +1,24 @@
+from auto_rig_helpers import AutoRigHelpers
+
+def test_referenced_copies_keep_their_own_plug_states(scene):
+    scene.create_rig(1, "charA")
+    scene.create_rig(1, "charA1")
+    
+    # Referenced copies of a rig share their UUIDs
+    node_a = scene.nodes["|charA:rig|charA:ctl_0000"]
+    node_b = scene.nodes["|charA1:rig|charA1:ctl_0000"]
+    node_b.uuid = node_a.uuid
+    node_a.attribute_names["translateX"].locked = True
+    
+    plug_states = AutoRigHelpers.get_plug_states([f"{node_a.full_path}.translate", f"{node_b.full_path}.translate"])
+    assert plug_states[f"{node_a.full_path}.translate"][0] == ("translateX", False)
+    assert plug_states[f"{node_b.full_path}.translate"][0] == ("translateX", True)
+    
+def test_lock_queries_use_the_plug_states(scene):
+    node = scene.nodes[scene.uuids[scene.create_rig(1)[0]].full_path]
+    node.attribute_names["rotate"].locked = True
+    
+    assert AutoRigHelpers.is_attr_locked(node.full_path, "rotate")
+    assert not AutoRigHelpers.is_attr_locked(node.full_path, "translate")
+    assert not AutoRigHelpers.is_attr_connected(node.full_path, "translate")
+    assert not AutoRigHelpers.can_set_attr(node.full_path, "rotate")
@@ -0,0 +1,25 @@
+from pose_library_data import PoseData
+from pose_library_apply import PoseApplyEngine
+
+def test_apply_pose_sets_settable_channels_with_one_command(scene, counter):
+    uuids = scene.create_rig(3)
+    for uuid in uuids:
+        scene.uuids[uuid].values["translateY"] = 2.0
+    pose_data = PoseData(uuids)
+    
+    for uuid in uuids:
+        scene.uuids[uuid].values["translateY"] = 0.0
+        scene.uuids[uuid].values["rotateX"] = 5.0
+    scene.uuids[uuids[0]].attribute_names["rotateX"].locked = True
+    
+    PoseApplyEngine.apply_pose(pose_data)
+    
+    assert [scene.uuids[uuid].values["translateY"] for uuid in uuids] == [2.0, 2.0, 2.0]
+    assert [scene.uuids[uuid].values["rotateX"] for uuid in uuids] == [5.0, 0.0, 0.0]
+    assert "setAttr" not in counter.commands
+    assert counter.commands[PoseApplyEngine.UNDO_COMMAND_NAME] == 1
+    
+    # The command takes the modifier so it can undo it
+    assert PoseApplyEngine.pending_modifier is not None
+    PoseApplyEngine.take_pending_modifier().undoIt()
+    assert [scene.uuids[uuid].values["translateY"] for uuid in uuids] == [0.0, 0.0, 0.0]
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from pose_library_data import PoseData
+from pose_library_io_utility import PoseLibraryIOUtility
+from pose_library_binary_format import PoseBinaryFormat, MappedPoseFile
+from pose_library_cache import PoseHandle, PoseDataCache
+
+def save_pose(scene, folder_path, control_count=50) -> str:
+    pose_data = PoseData(scene.create_rig(control_count))
+    pose_data.set_attribute(0, "rotateOrder", "xyz")
+    PoseLibraryIOUtility.save_pose_data(pose_data, str(folder_path), "pose")
+    return os.path.join(str(folder_path), "pose.pose")
+    
+def test_saved_pose_round_trips(scene, tmp_path):
+    pose_path = save_pose(scene, tmp_path)
+    
+    pose_data = PoseBinaryFormat.read_pose_data(pose_path)
+    assert pose_data.control_count == 50
+    assert pose_data.control_nodes[0].attributes["rotateOrder"] == "xyz"
+    assert not os.path.exists(pose_path + ".tmp")
+    
+@pytest.mark.parametrize("size", [0, 20, 40, 200, None])
+def test_truncated_pose_file_is_corrupt(scene, tmp_path, size):
+    pose_path = save_pose(scene, tmp_path)
+    with open(pose_path, 'rb') as pose_file:
+        data = pose_file.read()
+        
+    # None truncates the file half way, e.g. a pose that is still being copied
+    with open(pose_path, 'wb') as pose_file:
+        pose_file.write(data[:len(data) // 2 if size == None else size])
+        
+    with pytest.raises(ValueError, match="corrupt pose file"):
+        MappedPoseFile(pose_path)
+        
+def test_bad_magic_is_corrupt(scene, tmp_path):
+    pose_path = save_pose(scene, tmp_path)
+    with open(pose_path, 'r+b') as pose_file:
+        pose_file.write(b"XXXX")
+        
+    with pytest.raises(ValueError, match="corrupt pose file"):
+        MappedPoseFile(pose_path)
+    
+def test_pose_handle_decodes_channels_on_demand(scene, tmp_path):
+    pose_path = save_pose(scene, tmp_path)
+    pose_handle = PoseHandle("pose", pose_path)
+    
+    # Only the requested channel is decoded, the map stays open for the next read
+    translate = pose_handle.get_channel("translate")
+    mapped_pose = pose_handle.get_mapped_pose()
+    assert len(translate) == 50 * 3
+    assert list(mapped_pose.channel_values) == ["translate"]
+    
+    PoseDataCache.clear()
+    assert pose_handle.pose_data.control_count == 50
+    assert pose_handle.get_mapped_pose() is mapped_pose
+    
+    pose_handle.close()
+    assert mapped_pose.buffer == None
@@ -0,0 +1,39 @@
+import os
+
+from pose_library_data import PoseData
+from pose_library_io_utility import PoseLibraryIOUtility
+from pose_library_index import PoseLibraryIndex
+
+def load_index(monkeypatch, root_path):
+    monkeypatch.setattr(PoseLibraryIOUtility, "root_folder_path", root_path)
+    PoseLibraryIndex.load(root_path)
+    
+def save_pose(scene, folder_path, pose_name):
+    PoseLibraryIOUtility.save_pose_data(PoseData(scene.create_rig(5)), folder_path, pose_name)
+    
+def test_corrupt_pose_is_skipped_until_it_changes(scene, tmp_path, monkeypatch):
+    load_index(monkeypatch, str(tmp_path))
+    save_pose(scene, str(tmp_path), "good")
+    with open(tmp_path / "copying.pose", 'wb') as pose_file:
+        pose_file.write(b"POSB" + b"\0" * 36)
+        
+    assert list(PoseLibraryIndex.get_poses_at_path(str(tmp_path))) == ["good"]
+    assert PoseLibraryIndex.entries["copying.pose"]["invalid"]
+    
+    # The copy finishes
+    os.replace(tmp_path / "good.pose", tmp_path / "copying.pose")
+    save_pose(scene, str(tmp_path), "good")
+    assert sorted(PoseLibraryIndex.get_poses_at_path(str(tmp_path))) == ["copying", "good"]
+    
+def test_thumbnail_is_refreshed_without_the_pose_changing(scene, tmp_path, monkeypatch):
+    load_index(monkeypatch, str(tmp_path))
+    save_pose(scene, str(tmp_path), "pose")
+    assert PoseLibraryIndex.get_poses_at_path(str(tmp_path))["pose"]["thumbnail"] == ""
+    
+    (tmp_path / "pose.png").write_bytes(b"")
+    entry = PoseLibraryIndex.get_poses_at_path(str(tmp_path))["pose"]
+    assert entry["thumbnail"] == "pose.png"
+    assert entry["thumbnail_mtime"] == os.stat(tmp_path / "pose.png").st_mtime_ns
+    
+    os.remove(tmp_path / "pose.png")
+    assert PoseLibraryIndex.get_poses_at_path(str(tmp_path))["pose"]["thumbnail"] == ""
@@ -0,0 +1,34 @@
+import os
+
+from pose_library_data import PoseData
+from pose_library_io_utility import PoseLibraryIOUtility
+
+# The old parser read every control node's attributes at the first control node's line offsets
+def test_text_pose_round_trips_every_control_node(scene, tmp_path):
+    uuids = scene.create_rig(3)
+    for n, uuid in enumerate(uuids):
+        scene.uuids[uuid].values["translateX"] = float(n + 1)
+        scene.uuids[uuid].values["rotateY"] = 10.0 * (n + 1)
+    pose_data = PoseData(uuids)
+    
+    # Attribute counts differ between the control nodes, so fixed offsets would drift
+    pose_data.set_attribute(1, "rotateOrder", "xyz")
+    PoseLibraryIOUtility.save_pose_data(pose_data, str(tmp_path), "pose", binary=False)
+    
+    loaded = PoseLibraryIOUtility.load_pose_data(os.path.join(str(tmp_path), "pose.pose"))
+    assert [control_node.uuid for control_node in loaded.control_nodes] == uuids
+    assert [control_node.attributes["translate"] for control_node in loaded.control_nodes] == [(1.0, 0.0, 0.0), (2.0, 0.0, 0.0), (3.0, 0.0, 0.0)]
+    assert [control_node.attributes["rotate"] for control_node in loaded.control_nodes] == [(0.0, 10.0, 0.0), (0.0, 20.0, 0.0), (0.0, 30.0, 0.0)]
+    assert [control_node.attributes.get("rotateOrder") for control_node in loaded.control_nodes] == [None, "xyz", None]
+    
+def test_text_pose_blocks_without_blank_lines(tmp_path):
+    pose_path = os.path.join(str(tmp_path), "pose.pose")
+    with open(pose_path, 'w') as pose_file:
+        pose_file.write("pose_name: pose\n"
+                        "uuid: A\nname: a\nfull_path: |a\ntranslate: (1.0, 2.0, 3.0)\n"
+                        "uuid: B\nname: b\nfull_path: |b\ntranslate: (4.0, 5.0, 6.0)\nvisibility: True\n")
+                        
+    loaded = PoseLibraryIOUtility.load_pose_data(pose_path)
+    assert [control_node.name for control_node in loaded.control_nodes] == ["a", "b"]
+    assert loaded.control_nodes[0].attributes == {"translate": (1.0, 2.0, 3.0)}
+    assert loaded.control_nodes[1].attributes == {"translate": (4.0, 5.0, 6.0), "visibility": 1.0}
@@ -0,0 +1,41 @@
+import numpy as np
+
+from pose_library_data import PoseData
+from pose_library_math import PoseBlend
+
+# Set every control node's translateX to the given value and capture it as a pose
+def create_pose(scene, uuids, translate_x) -> PoseData:
+    for uuid in uuids:
+        scene.uuids[uuid].values["translateX"] = translate_x
+    return PoseData(uuids)
+    
+def get_translate_x(blend, weights) -> list:
+    values = dict(blend.evaluate(weights))
+    return [values[f"{control}.translate"][0] for control in blend.layout.controls]
+    
+def test_blend_several_poses_at_full_weight_ends_on_their_average(scene):
+    uuids = scene.create_rig(3)
+    
+    poses = [create_pose(scene, uuids, 10.0), create_pose(scene, uuids, 10.0), create_pose(scene, uuids, 20.0)]
+    create_pose(scene, uuids, 5.0)
+    blend = PoseBlend(poses)
+    
+    assert np.allclose(get_translate_x(blend, 1.0), [40.0 / 3.0] * 3)
+    assert np.allclose(get_translate_x(blend, 0.5), [5.0 + (40.0 / 3.0 - 5.0) / 2.0] * 3)
+    assert np.allclose(get_translate_x(blend, 0.0), [5.0] * 3)
+    
+def test_blend_towards_equal_poses_does_not_overshoot(scene):
+    uuids = scene.create_rig(2)
+    
+    poses = [create_pose(scene, uuids, 10.0), create_pose(scene, uuids, 10.0)]
+    create_pose(scene, uuids, 5.0)
+    
+    assert np.allclose(get_translate_x(PoseBlend(poses), 1.0), [10.0, 10.0])
+    
+def test_blend_per_pose_weights(scene):
+    uuids = scene.create_rig(2)
+    
+    poses = [create_pose(scene, uuids, 10.0), create_pose(scene, uuids, 20.0)]
+    create_pose(scene, uuids, 0.0)
+    
+    assert np.allclose(get_translate_x(PoseBlend(poses), [0.25, 0.5]), [12.5, 12.5])